@@ -19,7 +19,7 @@ if config.config_file_name is not None:
 
 # Import your models here for autogenerate support
 from app.database import Base
-from app.models import User, Activity, CV, Interview, Payment, Persona, Role, Screening, Transaction, UserProfile, UserRoleSelection, Wallet
+from app.models import User, Activity, CreditPack, CV, Interview, Payment, Persona, RefreshSession, Role, Screening, Transaction, UserProfile, UserRoleSelection, Wallet, WebhookEvent
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -0,0 +1,55 @@
+"""add refresh_sessions table, drop users.refresh_token
+
+Revision ID: 9e4b7f1c3a58
+Revises: 7c1e5a9d2b40
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7f1c3a58'
+down_revision: Union[str, Sequence[str], None] = '7c1e5a9d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'refresh_sessions',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.String(length=32), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('user_agent', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('replaced_by', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_refresh_sessions_token_hash', 'refresh_sessions', ['token_hash'], unique=True,
+        postgresql_include=['user_id', 'family_id', 'expires_at', 'revoked_at']
+    )
+    op.create_index(op.f('ix_refresh_sessions_user_id'), 'refresh_sessions', ['user_id'], unique=False)
+    op.create_index(op.f('ix_refresh_sessions_family_id'), 'refresh_sessions', ['family_id'], unique=False)
+    op.create_index(op.f('ix_refresh_sessions_expires_at'), 'refresh_sessions', ['expires_at'], unique=False)
+    # Stored plaintext tokens are not carried over; those sessions sign in again
+    op.drop_column('users', 'refresh_token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('users', sa.Column('refresh_token', sa.String(length=255), nullable=True))
+    op.drop_index(op.f('ix_refresh_sessions_expires_at'), table_name='refresh_sessions')
+    op.drop_index(op.f('ix_refresh_sessions_family_id'), table_name='refresh_sessions')
+    op.drop_index(op.f('ix_refresh_sessions_user_id'), table_name='refresh_sessions')
+    op.drop_index('ix_refresh_sessions_token_hash', table_name='refresh_sessions')
+    op.drop_table('refresh_sessions')
@@ -0,0 +1,40 @@
+"""one persona per user, with per-source contributions for incremental recomputes
+
+Revision ID: a6d2f8c4e935
+Revises: f3c7a9e2b614
+Create Date: 2026-10-19 01:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2f8c4e935'
+down_revision: Union[str, Sequence[str], None] = 'f3c7a9e2b614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('personas', sa.Column('sources', sa.JSON(), nullable=True))
+    # Keep the newest persona of any user that has several
+    op.execute("""
+        DELETE FROM personas p USING personas newer
+        WHERE newer.user_id = p.user_id AND newer.id > p.id
+    """)
+    op.execute("""
+        UPDATE user_profiles up SET persona_id = p.id
+        FROM personas p
+        WHERE p.user_id = up.user_id AND up.persona_id IS DISTINCT FROM p.id
+    """)
+    op.create_index('ix_personas_user_id', 'personas', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_personas_user_id', table_name='personas')
+    op.drop_column('personas', 'sources')
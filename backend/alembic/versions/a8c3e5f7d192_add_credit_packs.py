@@ -0,0 +1,56 @@
+"""add credit_packs catalog seeded with the current packs
+
+Revision ID: a8c3e5f7d192
+Revises: f1b6d3e8a240
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e5f7d192'
+down_revision: Union[str, Sequence[str], None] = 'f1b6d3e8a240'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The packs previously hardcoded in payment_routes.CREDIT_PACKS; existing payments reference these ids
+PACKS = [
+    {"id": 1, "credits": 10, "amount_inr": Decimal("100.00"), "description": "10 Credits Pack", "sort_order": 1},
+    {"id": 2, "credits": 25, "amount_inr": Decimal("225.00"), "description": "25 Credits Pack", "sort_order": 2},
+    {"id": 3, "credits": 50, "amount_inr": Decimal("400.00"), "description": "50 Credits Pack", "sort_order": 3},
+    {"id": 4, "credits": 100, "amount_inr": Decimal("750.00"), "description": "100 Credits Pack", "sort_order": 4},
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    credit_packs = op.create_table(
+        'credit_packs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('credits', sa.Integer(), nullable=False),
+        sa.Column('amount_inr', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), server_default='true', nullable=False),
+        sa.Column('sort_order', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(credit_packs, PACKS)
+    op.execute("SELECT setval('credit_packs_id_seq', (SELECT max(id) FROM credit_packs))")
+    # notify_catalog_changed() was created with the roles trigger (b3d8e6a2f417)
+    op.execute("""
+        CREATE TRIGGER credit_packs_catalog_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON credit_packs
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS credit_packs_catalog_changed ON credit_packs")
+    op.drop_table('credit_packs')
@@ -0,0 +1,41 @@
+"""notify API processes when the roles catalog changes
+
+Revision ID: b3d8e6a2f417
+Revises: 9e4b7f1c3a58
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8e6a2f417'
+down_revision: Union[str, Sequence[str], None] = '9e4b7f1c3a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER roles_catalog_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON roles
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS roles_catalog_changed ON roles")
+    op.execute("DROP FUNCTION IF EXISTS notify_catalog_changed()")
@@ -0,0 +1,41 @@
+"""add storage_orphans queue for batched object deletes
+
+Revision ID: c2e9a4f6b378
+Revises: a8c3e5f7d192
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e9a4f6b378'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e5f7d192'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'storage_orphans',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('key', sa.String(length=500), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('enqueued_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_storage_orphans_key', 'storage_orphans', ['key'], unique=True)
+    op.create_index('ix_storage_orphans_next_attempt_at', 'storage_orphans', ['next_attempt_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_storage_orphans_next_attempt_at', table_name='storage_orphans')
+    op.drop_index('ix_storage_orphans_key', table_name='storage_orphans')
+    op.drop_table('storage_orphans')
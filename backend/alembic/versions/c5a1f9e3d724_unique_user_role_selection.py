@@ -0,0 +1,38 @@
+"""unique (user_id, role_id) on user_role_selection
+
+Revision ID: c5a1f9e3d724
+Revises: b3d8e6a2f417
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a1f9e3d724'
+down_revision: Union[str, Sequence[str], None] = 'b3d8e6a2f417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the earliest selection of any duplicated pair before enforcing uniqueness
+    op.execute("""
+        DELETE FROM user_role_selection a
+        USING user_role_selection b
+        WHERE a.user_id = b.user_id
+          AND a.role_id = b.role_id
+          AND a.id > b.id
+    """)
+    op.create_unique_constraint(
+        'uq_user_role_selection_user_role', 'user_role_selection', ['user_id', 'role_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_user_role_selection_user_role', 'user_role_selection', type_='unique')
@@ -0,0 +1,57 @@
+"""add interview session columns and interview_turns
+
+Revision ID: d4a7f2c8e591
+Revises: c2e9a4f6b378
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7f2c8e591'
+down_revision: Union[str, Sequence[str], None] = 'c2e9a4f6b378'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('interviews', sa.Column('failure_reason', sa.Text(), nullable=True))
+    op.add_column('interviews', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('interviews', sa.Column('ended_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('interviews', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_interviews_live_heartbeat', 'interviews', ['heartbeat_at'],
+        postgresql_where=sa.text("status IN ('pending', 'in_progress')")
+    )
+    op.create_table(
+        'interview_turns',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('interview_id', sa.Integer(), nullable=False),
+        sa.Column('turn_index', sa.Integer(), nullable=False),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('answer', sa.Text(), nullable=True),
+        sa.Column('feedback', sa.Text(), nullable=True),
+        sa.Column('asked_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('answered_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['interview_id'], ['interviews.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_interview_turns_interview_id_turn_index', 'interview_turns', ['interview_id', 'turn_index'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_interview_turns_interview_id_turn_index', table_name='interview_turns')
+    op.drop_table('interview_turns')
+    op.drop_index('ix_interviews_live_heartbeat', table_name='interviews')
+    op.drop_column('interviews', 'heartbeat_at')
+    op.drop_column('interviews', 'ended_at')
+    op.drop_column('interviews', 'started_at')
+    op.drop_column('interviews', 'failure_reason')
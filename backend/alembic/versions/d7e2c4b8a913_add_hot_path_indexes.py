@@ -0,0 +1,46 @@
+"""add composite indexes for per-user listings and payments.order_id
+
+Revision ID: d7e2c4b8a913
+Revises: c5a1f9e3d724
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2c4b8a913'
+down_revision: Union[str, Sequence[str], None] = 'c5a1f9e3d724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ('ix_cvs_user_id_created_at', 'cvs', ['user_id', 'created_at'], False),
+    ('ix_interviews_user_id_created_at', 'interviews', ['user_id', 'created_at'], False),
+    ('ix_transactions_user_id_created_at', 'transactions', ['user_id', 'created_at'], False),
+    ('ix_activities_user_id_created_at', 'activities', ['user_id', 'created_at'], False),
+    ('ix_payments_order_id', 'payments', ['order_id'], True),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY avoids blocking writes on live tables but cannot run inside a transaction.
+    # A failed concurrent build leaves an INVALID index behind: drop it before re-running.
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name, table, columns, unique=unique,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,37 @@
+"""add transactions.idempotency_key for the wallet ledger
+
+Revision ID: e4f2a7c9b615
+Revises: d7e2c4b8a913
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f2a7c9b615'
+down_revision: Union[str, Sequence[str], None] = 'd7e2c4b8a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A nullable column without a default is a catalog-only change
+    op.add_column('transactions', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    # Existing rows have NULL keys, which never collide; build without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_idempotency_key', 'transactions', ['idempotency_key'], unique=True,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transactions_idempotency_key', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('transactions', 'idempotency_key')
@@ -0,0 +1,58 @@
+"""add screening result and work queue columns
+
+Revision ID: e8b3c5d1f726
+Revises: d4a7f2c8e591
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c5d1f726'
+down_revision: Union[str, Sequence[str], None] = 'd4a7f2c8e591'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('screenings', sa.Column('role_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('screenings_role_id_fkey', 'screenings', 'roles', ['role_id'], ['id'])
+    op.add_column('screenings', sa.Column('score', sa.Integer(), nullable=True))
+    op.add_column('screenings', sa.Column('result', sa.JSON(), nullable=True))
+    op.add_column('screenings', sa.Column('failure_reason', sa.Text(), nullable=True))
+    op.add_column('screenings', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('screenings', sa.Column('leased_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('screenings', sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_screenings_pending', 'screenings', ['id'], unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+    # Deleting a CV keeps the screenings and interviews that used it
+    op.alter_column('screenings', 'cv_id', existing_type=sa.Integer(), nullable=True)
+    op.drop_constraint('screenings_cv_id_fkey', 'screenings', type_='foreignkey')
+    op.create_foreign_key('screenings_cv_id_fkey', 'screenings', 'cvs', ['cv_id'], ['id'], ondelete='SET NULL')
+    op.drop_constraint('interviews_cv_id_fkey', 'interviews', type_='foreignkey')
+    op.create_foreign_key('interviews_cv_id_fkey', 'interviews', 'cvs', ['cv_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('interviews_cv_id_fkey', 'interviews', type_='foreignkey')
+    op.create_foreign_key('interviews_cv_id_fkey', 'interviews', 'cvs', ['cv_id'], ['id'])
+    op.drop_constraint('screenings_cv_id_fkey', 'screenings', type_='foreignkey')
+    op.create_foreign_key('screenings_cv_id_fkey', 'screenings', 'cvs', ['cv_id'], ['id'])
+    op.execute("DELETE FROM screenings WHERE cv_id IS NULL")
+    op.alter_column('screenings', 'cv_id', existing_type=sa.Integer(), nullable=False)
+    op.drop_index('ix_screenings_pending', table_name='screenings')
+    op.drop_column('screenings', 'completed_at')
+    op.drop_column('screenings', 'leased_until')
+    op.drop_column('screenings', 'attempts')
+    op.drop_column('screenings', 'failure_reason')
+    op.drop_column('screenings', 'result')
+    op.drop_column('screenings', 'score')
+    op.drop_constraint('screenings_role_id_fkey', 'screenings', type_='foreignkey')
+    op.drop_column('screenings', 'role_id')
@@ -0,0 +1,55 @@
+"""add webhook_events inbox for queued payment webhooks
+
+Revision ID: f1b6d3e8a240
+Revises: e4f2a7c9b615
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d3e8a240'
+down_revision: Union[str, Sequence[str], None] = 'e4f2a7c9b615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('event_id', sa.String(length=255), nullable=False),
+        sa.Column('order_id', sa.String(length=255), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('signature', sa.String(length=500), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_events_provider_event_id', 'webhook_events', ['provider', 'event_id'], unique=True)
+    op.create_index(
+        'ix_webhook_events_pending', 'webhook_events', ['next_attempt_at'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index(
+        'ix_webhook_events_pending_order', 'webhook_events', ['order_id', 'id'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_events_pending_order', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_pending', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_provider_event_id', table_name='webhook_events')
+    op.drop_table('webhook_events')
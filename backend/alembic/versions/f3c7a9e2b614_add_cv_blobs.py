@@ -0,0 +1,48 @@
+"""add cv_blobs for content-addressed CV storage and cached text
+
+Revision ID: f3c7a9e2b614
+Revises: e8b3c5d1f726
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c7a9e2b614'
+down_revision: Union[str, Sequence[str], None] = 'e8b3c5d1f726'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cv_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('storage_key', sa.String(length=500), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('mime_type', sa.String(length=100), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('features', sa.JSON(), nullable=True),
+        sa.Column('extracted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    # Existing CVs stay unfingerprinted until a screening worker hashes them
+    op.add_column('cvs', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_foreign_key('cvs_content_sha256_fkey', 'cvs', 'cv_blobs', ['content_sha256'], ['sha256'])
+    op.create_index('ix_cvs_content_sha256', 'cvs', ['content_sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Deduplicated CVs keep pointing at their shared object
+    op.drop_index('ix_cvs_content_sha256', table_name='cvs')
+    op.drop_constraint('cvs_content_sha256_fkey', 'cvs', type_='foreignkey')
+    op.drop_column('cvs', 'content_sha256')
+    op.drop_table('cv_blobs')
@@ -1,6 +1,7 @@
 from datetime import datetime,timedelta,timezone
 from jose import jwt,JWTError
 from passlib.context import CryptContext
+from app.process_pool import BoundedProcessPool
 import os
 
 
@@ -40,10 +41,34 @@ def decode_refresh_token(token: str):
         return None
 
 
-pwd_context = CryptContext(schemes=["bcrypt"],deprecated="auto")
+# bcrypt work factor; existing hashes are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(2, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+
+# Stored for accounts created through OAuth; never matches any password
+UNUSABLE_PASSWORD = "!"
+
+pwd_context = CryptContext(schemes=["bcrypt"],deprecated="auto",bcrypt__rounds=BCRYPT_ROUNDS)
 
 def hash_password(password:str)->str:
     return pwd_context.hash(password)
 
 def verify_password(plain:str,hashed:str) -> bool:
     return pwd_context.verify(plain,hashed)
+
+def verify_and_update_password(plain:str,hashed:str) -> tuple[bool, str | None]:
+    """Verify, returning a replacement hash when the stored one uses an outdated work factor"""
+    if hashed.startswith(UNUSABLE_PASSWORD):
+        return False, None
+    return pwd_context.verify_and_update(plain,hashed)
+
+
+# bcrypt is pure CPU and holds the GIL, so it runs in its own bounded process pool
+password_pool = BoundedProcessPool("password_hashing", PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+async def hash_password_async(password:str)->str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain:str,hashed:str) -> tuple[bool, str | None]:
+    return await password_pool.run(verify_and_update_password, plain, hashed)
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import DDL, event
+from app.database import AsyncSessionLocal
+from app.invalidation import on_notification
+
+# Fallback expiry in case a change notification is missed
+CATALOG_CACHE_TTL_SECONDS = int(os.getenv("CATALOG_CACHE_TTL_SECONDS", 300))
+# How long browsers may reuse a catalog before revalidating with If-None-Match
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", 60))
+# Loads retried when a change arrives mid-load; the last one is served uncached
+CATALOG_RELOAD_ATTEMPTS = 3
+
+# Statement-level triggers on catalog tables publish the table name on this channel
+CATALOG_CHANNEL = "catalog_changed"
+
+NOTIFY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{CATALOG_CHANNEL}', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def notify_trigger_sql(table_name: str) -> str:
+    return (
+        f"CREATE TRIGGER {table_name}_catalog_changed "
+        f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table_name} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed()"
+    )
+
+
+def attach_change_notifications(table) -> None:
+    """Create the NOTIFY trigger whenever create_all creates this table (migrations do it for existing ones)"""
+    event.listen(table, "after_create", DDL(NOTIFY_FUNCTION_SQL).execute_if(dialect="postgresql"))
+    event.listen(table, "after_create", DDL(notify_trigger_sql(table.name)).execute_if(dialect="postgresql"))
+
+
+@dataclass
+class CachedCatalog:
+    data: list  # the loader's payload, for lookups that must not cost a query
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+class CatalogCache:
+    """
+    Per-process cache of a rarely-changing catalog, kept as ready-to-send JSON bytes.
+
+    loader(session) returns the JSON-able payload. The ETag is a digest of the
+    serialized body, so every process agrees on it without coordination.
+    """
+
+    def __init__(self, name: str, loader):
+        self.name = name
+        self.loader = loader
+        self._entry: CachedCatalog | None = None
+        # Bumped on every invalidation so a load that raced with one is not cached
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        _caches[name] = self
+
+    def _fresh(self) -> CachedCatalog | None:
+        entry = self._entry
+        if entry and time.monotonic() - entry.loaded_at < CATALOG_CACHE_TTL_SECONDS:
+            return entry
+        return None
+
+    async def get(self) -> CachedCatalog:
+        entry = self._fresh()
+        if entry is not None:
+            return entry
+        async with self._lock:
+            # Concurrent misses share one load
+            entry = self._fresh()
+            if entry is not None:
+                return entry
+            for _ in range(CATALOG_RELOAD_ATTEMPTS):
+                generation = self._generation
+                entry = await self._load()
+                if generation == self._generation:
+                    self._entry = entry
+                    break
+                # Invalidated mid-load: the payload may predate the change, so load again
+            return entry
+
+    async def _load(self) -> CachedCatalog:
+        async with AsyncSessionLocal() as session:
+            payload = await self.loader(session)
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        etag = f'"{self.name}-{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.loads += 1
+        return CachedCatalog(data=payload, body=body, etag=etag, loaded_at=time.monotonic())
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entry = None
+
+    async def response(self, request: Request) -> Response:
+        """200 with the cached body, or 304 when the client already has this version"""
+        entry = await self.get()
+        headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={CATALOG_CACHE_MAX_AGE}"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+_caches: dict = {}
+
+
+def invalidate_catalog(name: str | None = None) -> None:
+    """Drop one cached catalog, or all of them when name is None"""
+    for cache_name, cache in _caches.items():
+        if name is None or cache_name == name:
+            cache.invalidate()
+
+
+def get_catalog_cache_stats() -> list:
+    return [
+        {"name": cache.name, "loads": cache.loads, "cached": cache._fresh() is not None}
+        for cache in _caches.values()
+    ]
+
+
+# Triggers publish the changed table's name; None (after a reconnect) drops everything
+on_notification(CATALOG_CHANNEL, invalidate_catalog)
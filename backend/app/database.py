@@ -1,28 +1,140 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.metrics import Histogram
 import os
+import time
 from dotenv import load_dotenv
 
 # SQLAlchemy Base for all models
 Base = declarative_base()
 
-load_dotenv() 
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=True)  # for creating the database we need to create a engine
+# Pool / connection settings (all overridable from the environment)
+DB_ECHO = _env_bool("DB_ECHO")  # log every SQL statement, debug only
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds, -1 disables
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # 0 disables
+
+
+def _async_database_url(url: str) -> str:
+    """Point a plain postgres URL at the asyncpg driver"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+
+
+class PoolStats:
+    """Counters for the async pool, exposed on the internal stats endpoint"""
+
+    def __init__(self):
+        self.wait_ms = Histogram()
+        self.timeouts = 0
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeouts": self.timeouts,
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.wait_ms.observe((time.perf_counter() - start) * 1000)
+
+
+def _pool_kwargs() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def _sync_connect_args() -> dict:
+    if DB_STATEMENT_TIMEOUT_MS and DATABASE_URL.startswith(("postgresql", "postgres://")):
+        return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+def _async_connect_args() -> dict:
+    if DB_STATEMENT_TIMEOUT_MS and ASYNC_DATABASE_URL.startswith("postgresql+asyncpg://"):
+        return {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return {}
+
+
+# Sync engine is kept for Alembic, create_all and one-off scripts
+engine = create_engine(DATABASE_URL, echo=DB_ECHO, connect_args=_sync_connect_args(), **_pool_kwargs())  # for creating the database we need to create a engine
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API routers
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=DB_ECHO,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=_async_connect_args(),
+    **_pool_kwargs()
+)
+
+# expire_on_commit=False so attributes stay readable after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def create_db_and_tables():
     # Create all tables using SQLAlchemy
     Base.metadata.create_all(engine)
 
+def get_pool_stats() -> dict:
+    return pool_stats.snapshot(async_engine.pool)
+
 def get_session():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_session():
+    async with AsyncSessionLocal() as db:
+        yield db
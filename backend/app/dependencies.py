@@ -1,21 +1,53 @@
-from fastapi import Depends,HTTPException
+from fastapi import Depends,HTTPException,Header
 from typing import Annotated # To connect session and dependecy function we need Annotated
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_session
+from app.database import get_async_session, get_session
 from fastapi.security import OAuth2PasswordBearer
 from app.auth import decode_token
 from app.models.user_model import User
+from app.user_cache import cache_user, get_cached_user
+import hmac
+import os
 
-SessionDep = Annotated[Session, Depends(get_session)]
+SessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+# Blocking session for scripts and code that must stay synchronous
+SyncSessionDep = Annotated[Session, Depends(get_session)]
 
 # Must match the mounted router path for token acquisition
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_curr_user(token:Annotated[str,Depends(oauth2_scheme)],session:SessionDep):
+async def get_curr_user(token:Annotated[str,Depends(oauth2_scheme)],session:SessionDep):
     payload = decode_token(token)
     if not payload:
         raise HTTPException(status_code=401,detail="User not found")
-    user = session.query(User).filter(User.email == payload.get("sub")).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
\ No newline at end of file
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Tokens issued before user ids were embedded: resolve by email
+        result = await session.execute(select(User).where(User.email == payload.get("sub")))
+        user = result.scalars().first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+    user = get_cached_user(user_id)
+    if user is None:
+        user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        # Detach so the cached row can be shared safely across requests
+        session.expunge(user)
+        cache_user(user)
+    if payload.get("ver", 0) != user.token_version:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return user
+
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+def require_internal_token(x_internal_token: Annotated[str | None, Header()] = None):
+    # Internal endpoints are disabled entirely unless a token is configured
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
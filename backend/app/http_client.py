@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import httpx
+
+# Outbound HTTP settings for OAuth providers and the payment gateway
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 5))  # wait for a free pooled connection
+OAUTH_MAX_CONNECTIONS_PER_PROVIDER = int(os.getenv("OAUTH_MAX_CONNECTIONS_PER_PROVIDER", 20))
+OAUTH_MAX_KEEPALIVE_PER_PROVIDER = int(os.getenv("OAUTH_MAX_KEEPALIVE_PER_PROVIDER", 10))
+
+# Each provider gets its own transport (and therefore its own connection limits),
+# mounted for every host that provider's login flow talks to.
+PROVIDER_HOSTS = {
+    "google": ["accounts.google.com", "oauth2.googleapis.com", "openidconnect.googleapis.com", "www.googleapis.com"],
+    "linkedin": ["www.linkedin.com", "api.linkedin.com"],
+    "microsoft": ["login.microsoftonline.com", "graph.microsoft.com"],
+    # Not OAuth, but payment order calls get their own pool the same way
+    "razorpay": ["api.razorpay.com"],
+}
+
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+_client: httpx.AsyncClient | None = None
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT)
+
+
+def build_http_client() -> httpx.AsyncClient:
+    mounts = {}
+    for hosts in PROVIDER_HOSTS.values():
+        transport = httpx.AsyncHTTPTransport(
+            http2=HTTP2_ENABLED,
+            retries=1,  # retries connection failures only
+            limits=httpx.Limits(
+                max_connections=OAUTH_MAX_CONNECTIONS_PER_PROVIDER,
+                max_keepalive_connections=OAUTH_MAX_KEEPALIVE_PER_PROVIDER,
+            ),
+        )
+        for host in hosts:
+            mounts[f"https://{host}"] = transport
+    return httpx.AsyncClient(http2=HTTP2_ENABLED, timeout=_timeout(), mounts=mounts)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared, connection-pooled client; created by the app lifespan"""
+    global _client
+    if _client is None:
+        _client = build_http_client()
+    return _client
+
+
+def set_http_client(client: httpx.AsyncClient | None) -> None:
+    """Swap the shared client (tests point it at a local fake provider)"""
+    global _client
+    _client = client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
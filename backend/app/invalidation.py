@@ -0,0 +1,68 @@
+import asyncio
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import ASYNC_DATABASE_URL
+
+# Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+# Each module registers a handler for its channel; handlers run as
+# handler(payload) for a notification and handler(None) after a reconnect,
+# when notifications may have been missed.
+
+LISTENER_PING_SECONDS = 30
+LISTENER_RETRY_SECONDS = 5
+
+_handlers: dict = {}
+
+
+def on_notification(channel: str, handler) -> None:
+    _handlers[channel] = handler
+
+
+async def notify(session: AsyncSession, channel: str, payload: str) -> None:
+    """Queue a notification in the caller's transaction; Postgres delivers it on commit, drops it on rollback"""
+    await session.execute(select(func.pg_notify(channel, payload)))
+
+
+def _listener_dsn() -> str | None:
+    url = make_url(ASYNC_DATABASE_URL)
+    if url.drivername != "postgresql+asyncpg":
+        return None
+    return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def _dispatch(_connection, _pid, channel: str, payload: str) -> None:
+    handler = _handlers.get(channel)
+    if handler is not None:
+        handler(payload)
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Background task started by the app lifespan: LISTEN on a dedicated
+    connection (not one from the pool) for every registered channel.
+    Reconnects on failure and resets every cache afterwards.
+    """
+    dsn = _listener_dsn()
+    if dsn is None:
+        return  # not Postgres: caches rely on their TTLs
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            for channel in _handlers:
+                await connection.add_listener(channel, _dispatch)
+            for handler in _handlers.values():
+                handler(None)
+            while True:
+                await asyncio.sleep(LISTENER_PING_SECONDS)
+                await connection.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Cache invalidation listener disconnected: {e}")
+            await asyncio.sleep(LISTENER_RETRY_SECONDS)
+        finally:
+            if connection is not None:
+                connection.terminate()
@@ -1,13 +1,59 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from app.database import engine, Base
-from app.routes import auth_router, profile_router, roles_router, cv_router, payment_router
+from app.auth import password_pool
+from app.http_client import close_http_client, get_http_client
+from app.process_pool import PoolSaturated, shutdown_process_pools
+from app.services.interview_engine import get_interview_engine, run_interview_maintenance, run_turn_writer
+from app.services.payment_gateway import get_payment_gateway
+from app.services.refresh_sessions import run_session_sweeper
+from app.services.persona_engine import get_persona_engine
+from app.services.screening_queue import run_screening_dispatcher
+from app.services.storage_reaper import run_storage_reaper
+from app.services.webhook_queue import WEBHOOK_WORKERS, run_webhook_worker
+from app.invalidation import listen_for_invalidations
+from app.routes import auth_router, profile_router, roles_router, cv_router, payment_router, interview_router, screening_router, persona_router, internal_router
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Student Interview App API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await password_pool.warm_up()
+    get_http_client()
+    get_payment_gateway()
+    sweeper = asyncio.create_task(run_session_sweeper())
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    webhook_workers = [asyncio.create_task(run_webhook_worker()) for _ in range(WEBHOOK_WORKERS)]
+    storage_reaper = asyncio.create_task(run_storage_reaper())
+    interview_engine = get_interview_engine()
+    interview_maintenance = asyncio.create_task(run_interview_maintenance(interview_engine))
+    turn_writer = asyncio.create_task(run_turn_writer(interview_engine))
+    screening_dispatcher = asyncio.create_task(run_screening_dispatcher())
+    yield
+    screening_dispatcher.cancel()
+    get_persona_engine().shutdown()
+    interview_maintenance.cancel()
+    turn_writer.cancel()
+    await interview_engine.shutdown()
+    storage_reaper.cancel()
+    for worker in webhook_workers:
+        worker.cancel()
+    sweeper.cancel()
+    invalidation_listener.cancel()
+    await close_http_client()
+    shutdown_process_pools()
+
+app = FastAPI(title="Student Interview App API", version="1.0.0", lifespan=lifespan)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    # Shed load quickly instead of queueing behind a saturated worker pool
+    return JSONResponse(status_code=503, content={"detail": "Server is busy, please retry shortly"}, headers={"Retry-After": "1"})
 
 # Add session middleware (required for OAuth)
 app.add_middleware(SessionMiddleware, secret_key="your-secret-key-change-in-production")
@@ -27,6 +73,10 @@ app.include_router(profile_router, prefix="/api/v1", tags=["Profile"])
 app.include_router(roles_router, prefix="/api/v1", tags=["Roles"])
 app.include_router(cv_router, prefix="/api/v1/cvs", tags=["CV Management"])
 app.include_router(payment_router, prefix="/api/v1", tags=["Payments & Wallet"])
+app.include_router(interview_router, prefix="/api/v1/interviews", tags=["Interviews"])
+app.include_router(screening_router, prefix="/api/v1/screenings", tags=["Screenings"])
+app.include_router(persona_router, prefix="/api/v1/personas", tags=["Personas"])
+app.include_router(internal_router, prefix="/api/v1/internal", tags=["Internal"], include_in_schema=False)
 
 @app.get("/")
 def read_root():
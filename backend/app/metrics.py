@@ -0,0 +1,41 @@
+import bisect
+import threading
+
+# Default latency buckets in milliseconds (upper bounds, last bucket is +Inf)
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Small cumulative latency histogram for the internal stats endpoints"""
+
+    def __init__(self, buckets_ms: tuple = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float) -> None:
+        index = bisect.bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum_ms += value_ms
+            if value_ms > self._max_ms:
+                self._max_ms = value_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            sum_ms = self._sum_ms
+            max_ms = self._max_ms
+        buckets = []
+        running = 0
+        for bound, count in zip(list(self.buckets_ms) + ["+Inf"], counts):
+            running += count
+            buckets.append({"le_ms": bound, "count": running})
+        return {
+            "count": running,
+            "sum_ms": round(sum_ms, 3),
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
@@ -1,30 +1,42 @@
 # Import all models here to make them available from app.models
 from .user_model import User
 from .activity_model import Activity
+from .credit_pack_model import CreditPack
 from .cv_model import CV
+from .cv_blob_model import CVBlob
 from .interview_model import Interview
+from .interview_turn_model import InterviewTurn
 from .payment_model import Payment
 from .persona_model import Persona
+from .refresh_session_model import RefreshSession
 from .role_model import Role
 from .screening_model import Screening
+from .storage_orphan_model import StorageOrphan
 from .transaction_model import Transaction
 from .user_profiles_model import UserProfile
 from .user_role_selection_model import UserRoleSelection
 from .wallet_model import Wallet
+from .webhook_event_model import WebhookEvent
 
 
 # Export all models for easy importing
 __all__ = [
     "User",
     "Activity",
+    "CreditPack",
     "CV",
+    "CVBlob",
     "Interview",
+    "InterviewTurn",
     "Payment",
     "Persona",
+    "RefreshSession",
     "Role",
     "Screening",
+    "StorageOrphan",
     "Transaction",
     "UserProfile",
     "UserRoleSelection",
     "Wallet",
+    "WebhookEvent",
 ]
\ No newline at end of file
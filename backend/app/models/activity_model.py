@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -12,6 +12,10 @@ class Activity(Base):
     ref_id = Column(String(255), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    
+
+    __table_args__ = (
+        Index('ix_activities_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     def __repr__(self):
-        return f"<Activity(id={self.id}, user_id={self.user_id}, kind='{self.kind}', ref_id={self.ref_id})>"
\ No newline at end of file
+        return f"<Activity(id={self.id}, user_id={self.user_id}, kind='{self.kind}', ref_id={self.ref_id})>"
@@ -0,0 +1,38 @@
+from decimal import Decimal
+from sqlalchemy import Column, Integer, String, Boolean, Numeric, DateTime, event
+from sqlalchemy.sql import func
+from app.database import Base
+from app.catalog_cache import attach_change_notifications
+
+# Initial catalog, inserted when create_all builds the table (the migration seeds the same rows)
+DEFAULT_CREDIT_PACKS = [
+    {"id": 1, "credits": 10, "amount_inr": Decimal("100.00"), "description": "10 Credits Pack", "sort_order": 1},
+    {"id": 2, "credits": 25, "amount_inr": Decimal("225.00"), "description": "25 Credits Pack", "sort_order": 2},
+    {"id": 3, "credits": 50, "amount_inr": Decimal("400.00"), "description": "50 Credits Pack", "sort_order": 3},
+    {"id": 4, "credits": 100, "amount_inr": Decimal("750.00"), "description": "100 Credits Pack", "sort_order": 4},
+]
+
+class CreditPack(Base):
+    __tablename__ = "credit_packs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    credits = Column(Integer, nullable=False)
+    amount_inr = Column(Numeric(10, 2), nullable=False)
+    description = Column(String(255), nullable=False)
+    is_active = Column(Boolean, default=True, server_default="true", nullable=False)
+    sort_order = Column(Integer, default=0, server_default="0", nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CreditPack(id={self.id}, credits={self.credits}, amount_inr={self.amount_inr}, is_active={self.is_active})>"
+
+# Price changes reach every API process's cached catalog through NOTIFY
+attach_change_notifications(CreditPack.__table__)
+
+@event.listens_for(CreditPack.__table__, "after_create")
+def _seed_credit_packs(target, connection, **kw):
+    connection.execute(target.insert(), DEFAULT_CREDIT_PACKS)
+    if connection.dialect.name == "postgresql":
+        # Explicit ids were inserted: move the sequence past them
+        connection.exec_driver_sql("SELECT setval('credit_packs_id_seq', (SELECT max(id) FROM credit_packs))")
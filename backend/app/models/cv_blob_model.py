@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+class CVBlob(Base):
+    """
+    One stored CV file per distinct content. CV rows with the same SHA-256
+    share the object; ref_count is how many CV rows point at it, and the
+    object is queued for deletion when it drops to zero. Text extracted
+    from the file is cached here, so identical uploads are parsed once.
+    """
+    __tablename__ = "cv_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    storage_key = Column(String(500), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    ref_count = Column(Integer, nullable=False, server_default="1")
+    text = Column(Text, nullable=True)
+    features = Column(JSON, nullable=True)  # sections, word_count, truncated
+    extracted_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CVBlob(sha256='{self.sha256}', ref_count={self.ref_count}, size_bytes={self.size_bytes})>"
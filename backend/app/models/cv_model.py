@@ -12,14 +12,16 @@ class CV(Base):
     mime_type = Column(String(100), nullable=False)
     size_bytes = Column(Integer, nullable=False)
     storage_url = Column(String(500), nullable=False)
+    # Set once the file is fingerprinted; CVs with the same content share one object
+    content_sha256 = Column(String(64), ForeignKey("cv_blobs.sha256"), nullable=True)
     status = Column(String(50), default="uploaded", nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    
+
+    __table_args__ = (
+        Index('ix_cvs_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_cvs_content_sha256', 'content_sha256'),
+    )
+
     def __repr__(self):
         return f"<CV(id={self.id}, filename='{self.filename}', user_id={self.user_id}, status='{self.status})>"
-
-# Add indexes
-__table_args__ = (
-    Index('ix_cvs_user_id_created_at', 'user_id', 'created_at'),
-)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -8,16 +8,21 @@ class Interview(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     role_id = Column(Integer, ForeignKey("roles.id"), nullable=False)
-    cv_id = Column(Integer, ForeignKey("cvs.id"), nullable=True)
+    cv_id = Column(Integer, ForeignKey("cvs.id", ondelete="SET NULL"), nullable=True)
     status = Column(String(50), nullable=False)  # pending|in_progress|done|failed
     credits_used = Column(Integer, default=5, nullable=False)
+    failure_reason = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
+    # Touched in batches by the node running the session; stale live sessions are failed and refunded
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    
+
+    __table_args__ = (
+        Index('ix_interviews_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_interviews_live_heartbeat', 'heartbeat_at', postgresql_where=text("status IN ('pending', 'in_progress')")),
+    )
+
     def __repr__(self):
         return f"<Interview(id={self.id}, user_id={self.user_id}, role_id={self.role_id}, status='{self.status}', credits_used={self.credits_used})>"
-
-# Add indexes  
-__table_args__ = (
-    Index('ix_interviews_user_id_created_at', 'user_id', 'created_at'),
-)
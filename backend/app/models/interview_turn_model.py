@@ -0,0 +1,22 @@
+from sqlalchemy import Column, BigInteger, Integer, Text, DateTime, ForeignKey, Index
+from app.database import Base
+
+class InterviewTurn(Base):
+    """One question/answer exchange of an interview, written when the session ends"""
+    __tablename__ = "interview_turns"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    interview_id = Column(Integer, ForeignKey("interviews.id", ondelete="CASCADE"), nullable=False)
+    turn_index = Column(Integer, nullable=False)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=True)  # None when the session ended before an answer
+    feedback = Column(Text, nullable=True)
+    asked_at = Column(DateTime(timezone=True), nullable=False)
+    answered_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_interview_turns_interview_id_turn_index', 'interview_id', 'turn_index', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<InterviewTurn(interview_id={self.interview_id}, turn_index={self.turn_index})>"
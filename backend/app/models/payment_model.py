@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, JSON, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -16,6 +16,11 @@ class Payment(Base):
     signature = Column(String(500), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    
+
+    __table_args__ = (
+        # Webhooks and verification look payments up by gateway order id
+        Index('ix_payments_order_id', 'order_id', unique=True),
+    )
+
     def __repr__(self):
-        return f"<Payment(id={self.id}, user_id={self.user_id}, order_id='{self.order_id}', amount_inr={self.amount_inr}, status='{self.status}')>"
\ No newline at end of file
+        return f"<Payment(id={self.id}, user_id={self.user_id}, order_id='{self.order_id}', amount_inr={self.amount_inr}, status='{self.status}')>"
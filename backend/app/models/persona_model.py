@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ARRAY, TEXT
 from app.database import Base
@@ -10,8 +10,15 @@ class Persona(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     summary = Column(JSON, nullable=True)  # jsonb
     skills = Column(ARRAY(TEXT), nullable=True)  # text[]
+    # What each CV, screening and interview contributed, keyed by id, so a
+    # recompute only processes the sources changed since updated_at
+    sources = Column(JSON, nullable=True)
     
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('ix_personas_user_id', 'user_id', unique=True),
+    )
     
     def __repr__(self):
-        return f"<Persona(id={self.id}, user_id={self.user_id})>"
\ No newline at end of file
+        return f"<Persona(id={self.id}, user_id={self.user_id})>"
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class RefreshSession(Base):
+    """
+    One row per issued refresh token. Rotation revokes the row and links it to
+    its successor; every token descending from one login shares a family_id.
+    """
+    __tablename__ = "refresh_sessions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    # sha256 of the token's jti; the token itself is never stored
+    token_hash = Column(String(64), nullable=False)
+    user_agent = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        # Covers the refresh lookup so it is answered from the index alone
+        Index(
+            "ix_refresh_sessions_token_hash",
+            "token_hash",
+            unique=True,
+            postgresql_include=["user_id", "family_id", "expires_at", "revoked_at"],
+        ),
+    )
+
+    def __repr__(self):
+        return f"<RefreshSession(id={self.id}, user_id={self.user_id}, family_id='{self.family_id}')>"
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, Text
 from sqlalchemy.dialects.postgresql import ARRAY
 from app.database import Base
+from app.catalog_cache import attach_change_notifications
 
 class Role(Base):
     __tablename__ = "roles"
@@ -13,4 +14,7 @@ class Role(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     
     def __repr__(self):
-        return f"<Role(id={self.id}, title='{self.title}', is_active={self.is_active})>"
\ No newline at end of file
+        return f"<Role(id={self.id}, title='{self.title}', is_active={self.is_active})>"
+
+# Lets every API process drop its cached /roles response when the catalog changes
+attach_change_notifications(Role.__table__)
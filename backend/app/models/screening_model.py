@@ -1,17 +1,31 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index, text
 from sqlalchemy.sql import func
 from app.database import Base
 
 class Screening(Base):
     __tablename__ = "screenings"
-    
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    cv_id = Column(Integer, ForeignKey("cvs.id"), nullable=False)
+    # Kept when the CV is deleted; a pending screening then fails and is refunded
+    cv_id = Column(Integer, ForeignKey("cvs.id", ondelete="SET NULL"), nullable=True)
+    role_id = Column(Integer, ForeignKey("roles.id"), nullable=True)
     status = Column(String(50), nullable=False)  # pending|done|failed
     credits_used = Column(Integer, default=1, nullable=False)
-    
+    score = Column(Integer, nullable=True)  # 0-100
+    result = Column(JSON, nullable=True)  # matched/missing skills, sections, summary
+    failure_reason = Column(Text, nullable=True)
+    # Pending screenings are the work queue: a claim leases a row until
+    # leased_until, after which another process may take it over
+    attempts = Column(Integer, nullable=False, server_default="0")
+    leased_until = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    
+
+    __table_args__ = (
+        Index('ix_screenings_pending', 'id', postgresql_where=text("status = 'pending'")),
+    )
+
     def __repr__(self):
         return f"<Screening(id={self.id}, user_id={self.user_id}, cv_id={self.cv_id}, status='{self.status}', credits_used={self.credits_used})>"
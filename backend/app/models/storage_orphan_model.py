@@ -0,0 +1,25 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class StorageOrphan(Base):
+    """
+    Object storage keys whose database rows are gone. Deleting the row only
+    records the key here; the storage reaper removes the objects in batches.
+    """
+    __tablename__ = "storage_orphans"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    key = Column(String(500), nullable=False)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text, nullable=True)
+    enqueued_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('ix_storage_orphans_key', 'key', unique=True),
+        Index('ix_storage_orphans_next_attempt_at', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<StorageOrphan(id={self.id}, key='{self.key}', attempts={self.attempts})>"
@@ -14,12 +14,14 @@ class Transaction(Base):
     payment_gateway = Column(String(50), nullable=True)
     external_ref = Column(String(255), nullable=True)
     status = Column(String(50), nullable=False)  # created|success|failed
+    idempotency_key = Column(String(255), nullable=True)  # at most one ledger entry per key
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    
+
+    __table_args__ = (
+        Index('ix_transactions_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_transactions_idempotency_key', 'idempotency_key', unique=True),
+    )
+
     def __repr__(self):
         return f"<Transaction(id={self.id}, user_id={self.user_id}, type='{self.type}', credits={self.credits}, status='{self.status}')>"
-# Add indexes
-__table_args__ = (
-    Index('ix_transactions_user_id_created_at', 'user_id', 'created_at'),
-)
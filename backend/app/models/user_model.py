@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Index
+from sqlalchemy import Column, Integer, String
 from app.database import Base
 
 class User(Base):
@@ -10,11 +10,8 @@ class User(Base):
     password = Column(String(128), nullable=False)
     phone = Column(String(20), nullable=True)
     city = Column(String(50), nullable=True)
+    # Bumped to revoke every access token issued so far (embedded as "ver")
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     
     def __repr__(self):
         return f"<User(id={self.id}, name='{self.name}', email='{self.email}')>"
-
-# Add indexes
-__table_args__ = (
-    Index('ix_users_email', 'email'),
-)
\ No newline at end of file
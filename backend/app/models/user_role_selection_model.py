@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -10,6 +10,11 @@ class UserRoleSelection(Base):
     role_id = Column(Integer, ForeignKey("roles.id"), nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Lets bulk selection rely on ON CONFLICT DO NOTHING; also serves user_id lookups
+        UniqueConstraint("user_id", "role_id", name="uq_user_role_selection_user_role"),
+    )
     
     def __repr__(self):
         return f"<UserRoleSelection(id={self.id}, user_id={self.user_id}, role_id={self.role_id})>"
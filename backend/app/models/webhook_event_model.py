@@ -0,0 +1,33 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, JSON, Index, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+class WebhookEvent(Base):
+    """
+    Durable inbox for payment gateway webhooks. The request handler only
+    records the event; workers apply pending events in id order per order_id.
+    """
+    __tablename__ = "webhook_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    provider = Column(String(50), nullable=False)
+    event_id = Column(String(255), nullable=False)  # gateway event id, the dedup key
+    order_id = Column(String(255), nullable=True)
+    payload = Column(JSON, nullable=False)
+    signature = Column(String(500), nullable=True)
+    status = Column(String(20), nullable=False, server_default="pending")  # pending|done|dead
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_webhook_events_provider_event_id', 'provider', 'event_id', unique=True),
+        # Small partial indexes: only the backlog is scanned by workers
+        Index('ix_webhook_events_pending', 'next_attempt_at', postgresql_where=text("status = 'pending'")),
+        Index('ix_webhook_events_pending_order', 'order_id', 'id', postgresql_where=text("status = 'pending'")),
+    )
+
+    def __repr__(self):
+        return f"<WebhookEvent(id={self.id}, provider='{self.provider}', event_id='{self.event_id}', status='{self.status}')>"
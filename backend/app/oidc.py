@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from jose import jwt, JWTError
+import httpx
+from app.http_client import get_http_client
+
+# Discovery documents and signing keys change rarely; refetch after this many seconds
+OIDC_METADATA_TTL_SECONDS = int(os.getenv("OIDC_METADATA_TTL_SECONDS", 3600))
+# An unknown key id triggers a JWKS refetch at most this often
+JWKS_MIN_REFRESH_SECONDS = 60
+
+MICROSOFT_TENANT_ID = os.getenv("MICROSOFT_TENANT_ID", "common")
+
+GOOGLE_DISCOVERY_URL = os.getenv("GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration")
+LINKEDIN_DISCOVERY_URL = os.getenv("LINKEDIN_DISCOVERY_URL", "https://www.linkedin.com/oauth/.well-known/openid-configuration")
+MICROSOFT_DISCOVERY_URL = os.getenv(
+    "MICROSOFT_DISCOVERY_URL",
+    f"https://login.microsoftonline.com/{MICROSOFT_TENANT_ID}/v2.0/.well-known/openid-configuration"
+)
+
+
+class JSONDocumentCache:
+    """TTL cache for JSON documents fetched over HTTP; concurrent misses share one fetch"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # url -> (fetched_at, document)
+        self._locks = {}
+        self.fetches = 0
+
+    def _fresh(self, url: str, max_age: float):
+        entry = self._entries.get(url)
+        if entry and time.monotonic() - entry[0] < max_age:
+            return entry[1]
+        return None
+
+    async def get(self, url: str, max_age: float | None = None) -> dict:
+        """max_age overrides the TTL, e.g. to refetch signing keys after a rotation"""
+        max_age = self.ttl_seconds if max_age is None else max_age
+        document = self._fresh(url, max_age)
+        if document is not None:
+            return document
+        async with self._locks.setdefault(url, asyncio.Lock()):
+            # Another caller may have fetched it while we waited
+            document = self._fresh(url, max_age)
+            if document is not None:
+                return document
+            response = await get_http_client().get(url)
+            response.raise_for_status()
+            document = response.json()
+            self.fetches += 1
+            self._entries[url] = (time.monotonic(), document)
+            return document
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+discovery_cache = JSONDocumentCache(OIDC_METADATA_TTL_SECONDS)
+jwks_cache = JSONDocumentCache(OIDC_METADATA_TTL_SECONDS)
+
+
+async def get_discovery(discovery_url: str) -> dict:
+    return await discovery_cache.get(discovery_url)
+
+
+async def verify_id_token(id_token: str, discovery_url: str, client_id: str, access_token: str | None = None) -> dict | None:
+    """
+    Validate an OIDC id_token against the provider's cached JWKS.
+    Returns the claims, or None if the token cannot be verified (callers fall back to userinfo).
+    """
+    try:
+        discovery = await get_discovery(discovery_url)
+        jwks_uri = discovery["jwks_uri"]
+        jwks = await jwks_cache.get(jwks_uri)
+        kid = jwt.get_unverified_header(id_token).get("kid")
+        if kid and not any(key.get("kid") == kid for key in jwks.get("keys", [])):
+            # Unknown key id: the provider probably rotated keys
+            jwks = await jwks_cache.get(jwks_uri, max_age=JWKS_MIN_REFRESH_SECONDS)
+        return jwt.decode(
+            id_token,
+            jwks,
+            algorithms=discovery.get("id_token_signing_alg_values_supported", ["RS256"]),
+            audience=client_id,
+            issuer=discovery.get("issuer"),
+            access_token=access_token,
+        )
+    except (JWTError, KeyError, ValueError, httpx.HTTPError):
+        return None
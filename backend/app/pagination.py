@@ -0,0 +1,52 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Newest-first keyset pagination over (created_at, id). Cursors are opaque to
+# clients: url-safe base64 of the last row's sort key.
+
+MAX_PAGE_SIZE = 100
+
+
+def page_size(limit: int) -> int:
+    """Requested page size, capped; larger limits get a full page rather than a 422"""
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(stmt, created_at_column, id_column, cursor: str | None, limit: int):
+    """
+    Order newest first and resume after the cursor. Fetches one extra row so
+    next_page() can tell whether another page exists without a COUNT.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            # The plain bound lets the (user_id, created_at) index drive the scan
+            created_at_column <= created_at,
+            or_(created_at_column < created_at, and_(created_at_column == created_at, id_column < row_id)),
+        )
+    return stmt.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def next_page(rows: list, limit: int) -> tuple[list, str | None]:
+    """Split the extra row off a keyset_page result and build the next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
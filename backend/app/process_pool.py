@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.metrics import Histogram
+
+
+class PoolSaturated(Exception):
+    """Raised when a bounded pool already has its maximum amount of queued work"""
+
+    def __init__(self, pool_name: str):
+        super().__init__(f"{pool_name} pool is saturated")
+        self.pool_name = pool_name
+
+
+class BoundedProcessPool:
+    """
+    ProcessPoolExecutor wrapper for CPU-bound work called from async handlers.
+
+    At most max_workers jobs run at once and at most max_pending more wait in
+    the queue; anything beyond that is rejected immediately with PoolSaturated
+    instead of piling up behind a busy pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self._executor = None
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.latency_ms = Histogram()
+        _pools.append(self)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        if self._in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise PoolSaturated(self.name)
+        self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died; start a fresh executor on the next call
+            self.failed += 1
+            self._executor = None
+            raise
+        finally:
+            self._in_flight -= 1
+            self.latency_ms.observe((time.perf_counter() - start) * 1000)
+
+    async def warm_up(self) -> None:
+        """Start the worker processes before the first real request needs them"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.max_workers)))
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "latency_ms": self.latency_ms.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class BoundedThreadPool(BoundedProcessPool):
+    """
+    The same admission control over a dedicated thread pool, for blocking I/O
+    clients (boto3). A slow dependency then ties up its own threads and
+    fails fast with PoolSaturated instead of draining the shared threadpool.
+    """
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+
+_pools: list = []
+
+
+def get_process_pool_stats() -> list:
+    return [pool.stats() for pool in _pools]
+
+
+def shutdown_process_pools() -> None:
+    for pool in _pools:
+        pool.shutdown()
@@ -3,13 +3,21 @@ from .profile_routes import router as profile_router
 from .roles_routes import router as roles_router
 from .cv_routes import router as cv_router
 from .payment_routes import router as payment_router
+from .interview_routes import router as interview_router
+from .screening_routes import router as screening_router
+from .persona_routes import router as persona_router
+from .internal_routes import router as internal_router
 
 __all__ = [
     "auth_router",
     "profile_router", 
     "roles_router",
     "cv_router",
-    "payment_router"
+    "payment_router",
+    "interview_router",
+    "screening_router",
+    "persona_router",
+    "internal_router"
 ]
 
 
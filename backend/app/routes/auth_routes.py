@@ -2,28 +2,31 @@ from fastapi import  Depends, HTTPException, APIRouter, Request
 from typing import Annotated, List
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user_model import User
-from app.models.user_profiles_model import UserProfile
-from app.models.wallet_model import Wallet
-from app.models.activity_model import Activity
 from app.models.role_model import Role
 from app.models.user_role_selection_model import UserRoleSelection
 from app.models.transaction_model import Transaction
-from app.auth import create_access_token, create_refresh_token, decode_refresh_token, hash_password, verify_password
+from app.auth import UNUSABLE_PASSWORD, create_access_token, decode_refresh_token, hash_password_async, verify_password_async
 from app.schemas import (
     CreateUser, Token, WalletResponse, RefreshRequest
 )
 from fastapi.responses import Response
 import json
 from app.dependencies import SessionDep, get_curr_user
+from app.user_cache import invalidate_user
+from app.services.oauth_providers import OAUTH_PROVIDERS, OAuthError
+from app.services.onboarding import onboard_user
+from app.services.refresh_sessions import (
+    REFRESH_TOKEN_EXPIRE_DAYS, RefreshTokenReused, create_session, issue_refresh_token,
+    revoke_all_sessions, revoke_session, rotate_session, session_values
+)
 from datetime import timedelta
-from google.auth.transport import requests as google_requests
 from authlib.integrations.starlette_client import OAuth
 import os
-import httpx
-import secrets
-import string
+from urllib.parse import urlencode
 
 router = APIRouter()
 
@@ -43,6 +46,11 @@ MICROSOFT_TENANT_ID = os.getenv("MICROSOFT_TENANT_ID", "common")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 
+# Scoped to the auth router so both /refresh and /logout receive the cookie
+REFRESH_COOKIE_PATH = "/api/v1/auth"
+# Unique index that makes a duplicate registration fail
+USERS_EMAIL_INDEX = "ix_users_email"
+
 oauth = OAuth()
 
 oauth.register(
@@ -79,121 +87,93 @@ oauth.register(
     }
 )
 
-def create_complete_user_setup(session: Session, user: User) -> None:
-    try:
-        user_profile = UserProfile(
-            user_id=user.id,
-            full_name=user.name,
-            phone=user.phone,
-            city=user.city
-        )
-        session.add(user_profile)
-        wallet = Wallet(user_id=user.id, balance_credits=0)
-        session.add(wallet)
-        activity = Activity(
-            user_id=user.id,
-            kind="profile_update",
-            ref_id=f"user_registration_{user.id}"
-        )
-        session.add(activity)
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to create user setup: {str(e)}")
+def _access_claims(user: User) -> dict:
+    # uid/ver let get_curr_user authenticate from its cache without a users lookup
+    return {"sub": user.email, "uid": user.id, "ver": user.token_version or 0}
 
 
-def _issue_tokens_response(session: Session, user: User) -> Response:
+def _create_access_token(user) -> str:
     expire = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access = create_access_token(data={"sub": user.email}, expires_delta=expire)
-    refresh = create_refresh_token(data={"sub": user.email})
-    # persist refresh token
-    user.refresh_token = refresh
-    session.add(user)
-    session.commit()
-    # build response
-    response_data = {"access_token": access, "token_type": "bearer"}
-    response = Response(content=json.dumps(response_data), media_type="application/json")
+    return create_access_token(data=_access_claims(user), expires_delta=expire)
+
+async def _issue_tokens_response(session: AsyncSession, user: User, request: Request) -> Response:
+    # Each login starts its own session family, so other devices stay signed in
+    issued = await create_session(session, user.id, user.email, request.headers.get("user-agent"))
+    await session.commit()
+    return _tokens_response(_create_access_token(user), issued.token)
+
+def _set_refresh_cookie(response: Response, refresh: str) -> None:
     response.set_cookie(
         key="refresh_token",
         value=refresh,
         httponly=True,
         secure=True,
         samesite="strict",
-        max_age=7 * 24 * 60 * 60,
-        path="/api/v1/auth/refresh"
+        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+        path=REFRESH_COOKIE_PATH
     )
+
+def _tokens_response(access: str, refresh: str) -> Response:
+    response_data = {"access_token": access, "token_type": "bearer"}
+    response = Response(content=json.dumps(response_data), media_type="application/json")
+    _set_refresh_cookie(response, refresh)
     return response
 
-def _issue_tokens_data(session: Session, user: User) -> dict:
-    """Helper function to get token data for OAuth redirects"""
-    expire = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access = create_access_token(data={"sub": user.email}, expires_delta=expire)
-    refresh = create_refresh_token(data={"sub": user.email})
-    # persist refresh token
-    user.refresh_token = refresh
-    session.add(user)
-    session.commit()
-    return {"access_token": access, "token_type": "bearer"}
+def _refresh_claims(request: Request) -> dict | None:
+    refresh_token_cookie = request.cookies.get("refresh_token")
+    if not refresh_token_cookie:
+        return None
+    decoded = decode_refresh_token(refresh_token_cookie)
+    if not decoded or not decoded.get("sub") or not decoded.get("jti"):
+        return None
+    return decoded
 
-@router.get("/google")
-async def login_google(request: Request):
-    return await oauth.google.authorize_redirect(request, redirect_uri=GOOGLE_REDIRECT_URI)
+def _violated_constraint(error: IntegrityError) -> str | None:
+    """Name of the constraint or unique index behind an IntegrityError (asyncpg)"""
+    return getattr(error.orig.__cause__, "constraint_name", None) or getattr(error.orig, "constraint_name", None)
 
-@router.get("/google-login")
-async def google_login(request: Request, session: SessionDep):
+async def _oauth_callback(provider_name: str, request: Request, session: AsyncSession) -> RedirectResponse:
+    """Shared callback: identify the user with the provider, then find-or-create in one statement"""
     code = request.query_params.get("code")
     if not code:
         raise HTTPException(status_code=400, detail="Authorization code not found")
+    provider = OAUTH_PROVIDERS[provider_name]
     try:
-        token_url = "https://oauth2.googleapis.com/token"
-        token_data = {
-            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-            "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
-            "code": code,
-            "grant_type": "authorization_code",
-            "redirect_uri": os.getenv("GOOGLE_REDIRECT_URI")
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=token_data)
-            tokens = response.json()
-        if "access_token" not in tokens:
-            raise HTTPException(status_code=400, detail="Failed to get access token")
-        user_info_url = "https://www.googleapis.com/oauth2/v2/userinfo"
-        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(user_info_url, headers=headers)
-            user_data = user_response.json()
-        existing_user = session.query(User).filter(User.email == user_data["email"]).first()
-        if existing_user:
-            tokens = _issue_tokens_data(session, existing_user)
-            # Redirect to frontend with token
-            frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-            return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={tokens['access_token']}&name={user_data.get('name', 'User')}"
-            )
-        else:
-            random_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-            hashed_password = hash_password(random_password)
-            new_user = User(
-                name=user_data.get("name", "Google User"),
-                email=user_data["email"],
-                password=hashed_password,
-                city=None
-            )
-            session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
-            create_complete_user_setup(session, new_user)
-            tokens = _issue_tokens_data(session, new_user)
-            # Redirect to frontend with token
-            frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-            return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={tokens['access_token']}&name={user_data.get('name', 'User')}"
-            )
-    except HTTPException:
-        raise
+        identity = await provider.authenticate(code)
+    except OAuthError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Login failed: {str(e)}")
+    issued = issue_refresh_token(identity.email)
+    try:
+        user = await onboard_user(
+            session,
+            name=identity.name[:50],
+            email=identity.email,
+            # OAuth accounts have no password; skips a bcrypt hash on first login
+            password=UNUSABLE_PASSWORD,
+            refresh_session=session_values(issued, request.headers.get("user-agent")),
+            existing_ok=True,
+        )
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail=f"Login failed: {str(e)}")
+    access = _create_access_token(user)
+    # Redirect to frontend with token
+    frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
+    query = urlencode({"token": access, "name": identity.name})
+    response = RedirectResponse(url=f"{frontend_url}/auth/callback?{query}")
+    _set_refresh_cookie(response, issued.token)
+    return response
+
+@router.get("/google")
+async def login_google(request: Request):
+    return await oauth.google.authorize_redirect(request, redirect_uri=GOOGLE_REDIRECT_URI)
+
+@router.get("/google-login")
+async def google_login(request: Request, session: SessionDep):
+    return await _oauth_callback("google", request, session)
 
 @router.get("/linkedin")
 async def login_linkedin(request: Request):
@@ -201,81 +181,7 @@ async def login_linkedin(request: Request):
 
 @router.get("/linkedin-login")
 async def linkedin_login(request: Request, session: SessionDep):
-    code = request.query_params.get("code")
-    if not code:
-        raise HTTPException(status_code=400, detail="Authorization code not found")
-    try:
-        token_url = "https://www.linkedin.com/oauth/v2/accessToken"
-        token_data = {
-            "grant_type": "authorization_code",
-            "code": code,
-            "client_id": os.getenv("LINKEDIN_CLIENT_ID"),
-            "client_secret": os.getenv("LINKEDIN_CLIENT_SECRET"),
-            "redirect_uri": os.getenv("LINKEDIN_REDIRECT_URI")
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=token_data, headers={"Content-Type": "application/x-www-form-urlencoded"})
-            if response.status_code != 200:
-                raise HTTPException(status_code=400, detail=f"Token exchange failed: {response.text}")
-            tokens = response.json()
-        if "access_token" not in tokens:
-            error_desc = tokens.get("error_description", "Unknown error")
-            raise HTTPException(status_code=400, detail=f"Failed to get access token: {error_desc}")
-        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-        user_data = None
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get("https://api.linkedin.com/v2/userinfo", headers=headers)
-            if user_response.status_code == 200:
-                user_data = user_response.json()
-            else:
-                profile_response = await client.get("https://api.linkedin.com/v2/people/~?projection=(id,firstName,lastName)", headers=headers)
-                email_response = await client.get("https://api.linkedin.com/v2/emailAddress?q=members&projection=(elements*(handle~))", headers=headers)
-                if profile_response.status_code != 200:
-                    raise HTTPException(status_code=400, detail=f"Failed to get user profile: {profile_response.text}")
-                profile_data = profile_response.json()
-                user_email = None
-                if email_response.status_code == 200:
-                    email_data = email_response.json()
-                    elements = email_data.get("elements", [])
-                    if elements:
-                        user_email = elements[0].get("handle~", {}).get("emailAddress")
-                if not user_email:
-                    raise HTTPException(status_code=400, detail="Could not retrieve email from LinkedIn")
-                first_name_data = profile_data.get("firstName", {}).get("localized", {})
-                last_name_data = profile_data.get("lastName", {}).get("localized", {})
-                first_name = list(first_name_data.values())[0] if first_name_data else ""
-                last_name = list(last_name_data.values())[0] if last_name_data else ""
-                full_name = f"{first_name} {last_name}".strip()
-                user_data = {"email": user_email, "name": full_name, "given_name": first_name, "family_name": last_name}
-        if not user_data or not user_data.get("email"):
-            raise HTTPException(status_code=400, detail="Could not retrieve user data from LinkedIn")
-        existing_user = session.query(User).filter(User.email == user_data["email"]).first()
-        if existing_user:
-            tokens = _issue_tokens_data(session, existing_user)
-            frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-            return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={tokens['access_token']}&name={user_data.get('name', 'User')}"
-            )
-        else:
-            random_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-            hashed_password = hash_password(random_password)
-            user_name = user_data.get("name") or f"{user_data.get('given_name', '')} {user_data.get('family_name', '')}".strip()
-            if not user_name:
-                user_name = "LinkedIn User"
-            new_user = User(name=user_name, email=user_data["email"], password=hashed_password, city=None)
-            session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
-            create_complete_user_setup(session, new_user)
-            tokens = _issue_tokens_data(session, new_user)
-            frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-            return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={tokens['access_token']}&name={user_name}"
-            )
-    except HTTPException:
-        raise  
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Login failed: {str(e)}")
+    return await _oauth_callback("linkedin", request, session)
 
 @router.get("/microsoft")
 async def login_microsoft(request: Request):
@@ -283,116 +189,91 @@ async def login_microsoft(request: Request):
 
 @router.get("/microsoft-login")
 async def microsoft_login(request: Request, session: SessionDep):
-    code = request.query_params.get("code")
-    if not code:
-        raise HTTPException(status_code=400, detail="Authorization code not found")
-    try:
-        token_url = f"https://login.microsoftonline.com/{MICROSOFT_TENANT_ID}/oauth2/v2.0/token"
-        token_data = {
-            "client_id": MICROSOFT_CLIENT_ID,
-            "client_secret": MICROSOFT_CLIENT_SECRET,
-            "code": code,
-            "grant_type": "authorization_code",
-            "redirect_uri": MICROSOFT_REDIRECT_URI,
-            "scope": "https://graph.microsoft.com/User.Read"
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=token_data, headers={"Content-Type": "application/x-www-form-urlencoded"})
-            if response.status_code != 200:
-                raise HTTPException(status_code=400, detail=f"Token exchange failed: {response.text}")
-            tokens = response.json()
-        if "access_token" not in tokens:
-            error_desc = tokens.get("error_description", "Unknown error")
-            raise HTTPException(status_code=400, detail=f"Failed to get access token: {error_desc}")
-        user_info_url = "https://graph.microsoft.com/v1.0/me"
-        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(user_info_url, headers=headers)
-            if user_response.status_code != 200:
-                raise HTTPException(status_code=400, detail=f"Failed to get user info: {user_response.text}")
-            user_data = user_response.json()
-        if not user_data.get("mail") and not user_data.get("userPrincipalName"):
-            raise HTTPException(status_code=400, detail="Could not retrieve email from Microsoft")
-        user_email = user_data.get("mail") or user_data.get("userPrincipalName")
-        user_name = user_data.get("displayName", "Microsoft User")
-        existing_user = session.query(User).filter(User.email == user_email).first()
-        if existing_user:
-            tokens = _issue_tokens_data(session, existing_user)
-            frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-            return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={tokens['access_token']}&name={user_name}"
-            )
-        else:
-            random_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-            hashed_password = hash_password(random_password)
-            new_user = User(name=user_name, email=user_email, password=hashed_password, city=None)
-            session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
-            create_complete_user_setup(session, new_user)
-            tokens = _issue_tokens_data(session, new_user)
-            frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
-            return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={tokens['access_token']}&name={user_name}"
-            )
-    except HTTPException:
-        raise  
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Login failed: {str(e)}")
+    return await _oauth_callback("microsoft", request, session)
 
 @router.post("/register")
-def register(session: SessionDep, user_data: CreateUser):  
-    if session.query(User).filter(User.email == user_data.email).first():     
-        raise HTTPException(status_code=400, detail="Email is already registered")
-    hash_pwd = hash_password(user_data.password)
-    user = User(name=user_data.name, email=user_data.email, password=hash_pwd, phone=user_data.phone, city=user_data.city)
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    create_complete_user_setup(session, user)
-    return _issue_tokens_response(session, user)
+async def register(request: Request, session: SessionDep, user_data: CreateUser):
+    hash_pwd = await hash_password_async(user_data.password)
+    issued = issue_refresh_token(user_data.email)
+    try:
+        # User, profile, wallet, activity and refresh session in one statement and one commit
+        user = await onboard_user(
+            session,
+            name=user_data.name,
+            email=user_data.email,
+            password=hash_pwd,
+            refresh_session=session_values(issued, request.headers.get("user-agent")),
+            phone=user_data.phone,
+            city=user_data.city,
+        )
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        # The unique index on users.email rejects duplicates; no pre-check needed.
+        # Other violations (wallet, refresh session) are server errors.
+        if _violated_constraint(e) == USERS_EMAIL_INDEX:
+            raise HTTPException(status_code=400, detail="Email is already registered")
+        raise HTTPException(status_code=500, detail="Registration failed")
+    return _tokens_response(_create_access_token(user), issued.token)
 
 @router.post("/login", response_model=Token)
-def login(session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
-    user = session.query(User).filter(User.email == form_data.username).first()
+async def login(request: Request, session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+    user = (await session.execute(select(User).where(User.email == form_data.username))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="Invalid Credentials")
-    pwd = verify_password(form_data.password, user.password)
+    pwd, upgraded_hash = await verify_password_async(form_data.password, user.password)
     if not pwd:
         raise HTTPException(status_code=404, detail="Invalid Credentials")
-    return _issue_tokens_response(session, user)
+    if upgraded_hash:
+        # Work factor changed since this hash was made; saved with the token commit below
+        user.password = upgraded_hash
+    return await _issue_tokens_response(session, user, request)
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(request: Request, session: SessionDep):
-    refresh_token_cookie = request.cookies.get("refresh_token")
-    if not refresh_token_cookie:
+async def refresh_token(request: Request, session: SessionDep):
+    if not request.cookies.get("refresh_token"):
         raise HTTPException(status_code=401, detail="Refresh token not found")
-    decoded = decode_refresh_token(refresh_token_cookie)
-    if not decoded or not decoded.get("sub"):
+    decoded = _refresh_claims(request)
+    if not decoded:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
-    user = session.query(User).filter(User.email == decoded["sub"]).first()
-    if not user or not user.refresh_token:
+    try:
+        rotated = await rotate_session(session, decoded["jti"], decoded["sub"])
+    except RefreshTokenReused:
+        # Persist the family revocation before rejecting
+        await session.commit()
+        raise HTTPException(status_code=403, detail="Refresh token reuse detected, please sign in again")
+    if rotated is None:
         raise HTTPException(status_code=403, detail="Refresh token invalid or revoked")
-    if user.refresh_token != refresh_token_cookie:
-        raise HTTPException(status_code=403, detail="Refresh token mismatch")
-    # Reuse common issuance path to rotate refresh token, persist, and set cookie
-    return _issue_tokens_response(session, user)
+    user, issued = rotated
+    await session.commit()
+    return _tokens_response(_create_access_token(user), issued.token)
 
-@router.post("/logout")
-def logout(request: Request, session: SessionDep):
-    refresh_token_cookie = request.cookies.get("refresh_token")
-    user = None
-    if refresh_token_cookie:
-        decoded = decode_refresh_token(refresh_token_cookie)
-        if decoded and decoded.get("sub"):
-            user = session.query(User).filter(User.email == decoded["sub"]).first()
-    if user:
-        user.refresh_token = None
-        session.add(user)
-        session.commit()
+def _logout_response() -> Response:
     response = Response(content=json.dumps({"message": "Logged out"}), media_type="application/json")
+    response.delete_cookie(
+        key="refresh_token",
+        path=REFRESH_COOKIE_PATH
+    )
+    # Cookies issued before the path was widened
     response.delete_cookie(
         key="refresh_token",
         path="/api/v1/auth/refresh"
     )
     return response
+
+@router.post("/logout")
+async def logout(request: Request, session: SessionDep):
+    """Sign out this device only"""
+    decoded = _refresh_claims(request)
+    if decoded:
+        await revoke_session(session, decoded["jti"])
+        await session.commit()
+    return _logout_response()
+
+@router.post("/logout-all")
+async def logout_all(session: SessionDep, current_user: User = Depends(get_curr_user)):
+    """Sign out every device: revokes all refresh sessions and outstanding access tokens"""
+    await revoke_all_sessions(session, current_user.id)
+    await session.commit()
+    invalidate_user(current_user.id)
+    return _logout_response()
@@ -1,175 +1,283 @@
-from fastapi import Depends, HTTPException, APIRouter
-from typing import Annotated, List
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, APIRouter, Query
+from typing import Annotated, List, Optional
+from sqlalchemy import select, func
 from app.models.user_model import User
 from app.models.cv_model import CV
 from app.models.role_model import Role
 from app.schemas import (
-    CVPresignRequest, CVPresignResponse, CVConfirmRequest, 
+    CVPresignRequest, CVPresignResponse, CVConfirmRequest,
+    CVMultipartStartRequest, CVMultipartStartResponse,
+    CVMultipartCompleteRequest, CVMultipartAbortRequest,
     CVResponse, CVListResponse, CVDownloadResponse
 )
 from app.dependencies import SessionDep, get_curr_user
-import os
-import boto3
+from app.pagination import MAX_PAGE_SIZE, keyset_page, next_page, page_size
+from app import storage
+from app.process_pool import PoolSaturated
+from app.services.cv_blobs import attach_blob, release_blob
+from app.services.persona_engine import persona_inputs_changed
+from app.services.storage_reaper import enqueue_orphan
 from botocore.exceptions import ClientError
-import uuid
 
 router = APIRouter()
 
-# S3/MinIO configuration
-STORAGE_ENDPOINT = os.getenv("STORAGE_ENDPOINT", "http://127.0.0.1:9000")
-STORAGE_BUCKET = os.getenv("STORAGE_BUCKET", "cvs")
-STORAGE_ACCESS_KEY = os.getenv("STORAGE_ACCESS_KEY")
-STORAGE_SECRET_KEY = os.getenv("STORAGE_SECRET_KEY")
-
-# Initialize S3 client
-s3_client = boto3.client(
-    's3',
-    endpoint_url=STORAGE_ENDPOINT,
-    aws_access_key_id=STORAGE_ACCESS_KEY,
-    aws_secret_access_key=STORAGE_SECRET_KEY,
-    region_name='us-east-1'  # Default region for MinIO
-)
+
+async def _validate_role(session, role_id: Optional[int]) -> None:
+    if role_id:
+        role = (await session.execute(select(Role).where(
+            Role.id == role_id,
+            Role.is_active == True
+        ))).scalars().first()
+        if not role:
+            raise HTTPException(status_code=404, detail="Role not found or inactive")
+
+
+def _validate_mime_type(mime_type: str) -> None:
+    if mime_type not in storage.ALLOWED_CV_MIME_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, DOC, and DOCX are allowed")
+
+
+def _owned_key(current_user: User, storage_filename: str) -> str:
+    if not storage.owns_key(current_user.id, storage_filename):
+        raise HTTPException(status_code=403, detail="Upload does not belong to the current user")
+    return storage_filename
+
+
+async def _record_uploaded_cv(session, current_user: User, key: str, filename: str, role_id: Optional[int]) -> CVResponse:
+    """
+    Verify the stored object with a single HEAD (real size and content type,
+    not what the client claims) and create the CV row. Objects that break the
+    rules are queued for the storage reaper so they do not linger in the bucket.
+
+    The object is then hashed as it streams from storage; a CV whose content
+    is already stored points at the existing object and the new upload is
+    queued for deletion.
+    """
+    head = await storage.run(storage.head_object, key)
+    if head is None:
+        raise HTTPException(status_code=400, detail="Uploaded file not found in storage")
+    problem = None
+    if head["size_bytes"] > storage.CV_MAX_UPLOAD_BYTES:
+        problem = "File size exceeds 10MB limit"
+    elif head["size_bytes"] == 0:
+        problem = "Uploaded file is empty"
+    elif head["mime_type"] not in storage.ALLOWED_CV_MIME_TYPES:
+        problem = "Invalid file type. Only PDF, DOC, and DOCX are allowed"
+    if problem:
+        await enqueue_orphan(session, key)
+        await session.commit()
+        raise HTTPException(status_code=400, detail=problem)
+
+    try:
+        sha256 = await storage.run(storage.hash_object, key)
+    except Exception as e:
+        # Not worth failing the upload over; a screening worker hashes it later
+        print(f"Could not fingerprint CV upload {key}: {e}")
+        sha256 = None
+    stored_key = key
+    if sha256:
+        stored_key = await attach_blob(session, sha256, key, head["size_bytes"], head["mime_type"])
+
+    cv = CV(
+        user_id=current_user.id,
+        role_id=role_id,
+        filename=filename,
+        mime_type=head["mime_type"],
+        size_bytes=head["size_bytes"],
+        storage_url=storage.object_url(stored_key),
+        content_sha256=sha256,
+        status="uploaded"
+    )
+    session.add(cv)
+    await session.commit()
+    await session.refresh(cv)
+    persona_inputs_changed(current_user.id)
+
+    return CVResponse(
+        id=cv.id,
+        user_id=cv.user_id,
+        role_id=cv.role_id,
+        filename=cv.filename,
+        mime_type=cv.mime_type,
+        size_bytes=cv.size_bytes,
+        storage_url=cv.storage_url,
+        status=cv.status,
+        created_at=cv.created_at
+    )
+
 
 @router.post("/presign", response_model=CVPresignResponse)
-def presign_cv_upload(
+async def presign_cv_upload(
     presign_data: CVPresignRequest,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
 ):
     """
-    Step 1: Generate presigned URL for CV upload
-    
+    Step 1: Generate a presigned POST for CV upload
+
     This endpoint:
     1. Validates file type and role
-    2. Generates a unique filename
-    3. Creates a presigned URL for direct upload to MinIO
-    4. Returns the URL and metadata for frontend to use
+    2. Generates a unique storage key
+    3. Signs a POST policy that pins the key and content type and caps the
+       size at 10MB, so storage rejects oversized uploads itself
+    4. Returns the URL and form fields for the frontend to use
     """
     try:
-        # Validate role_id if provided
-        if presign_data.role_id:
-            role = session.query(Role).filter(
-                Role.id == presign_data.role_id, 
-                Role.is_active == True
-            ).first()
-            if not role:
-                raise HTTPException(status_code=404, detail="Role not found or inactive")
-
-        # Validate file type
-        allowed_types = ['application/pdf', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
-        if presign_data.mime_type not in allowed_types:
-            raise HTTPException(status_code=400, detail="Invalid file type. Only PDF, DOC, and DOCX are allowed")
-
-        # Generate unique filename
-        file_extension = presign_data.filename.split('.')[-1]
-        unique_filename = f"{current_user.id}/{uuid.uuid4()}.{file_extension}"
-
-        # Generate presigned URL
-        presigned_url = s3_client.generate_presigned_url(
-            'put_object',
-            Params={
-                'Bucket': STORAGE_BUCKET,
-                'Key': unique_filename,
-                'ContentType': presign_data.mime_type
-            },
-            ExpiresIn=3600  # 1 hour expiry
-        )
+        await _validate_role(session, presign_data.role_id)
+        _validate_mime_type(presign_data.mime_type)
+
+        key = storage.new_cv_key(current_user.id, presign_data.filename)
+        post = storage.presign_post(key, presign_data.mime_type)
 
         return CVPresignResponse(
-            url=presigned_url,
-            fields={
-                "filename": unique_filename,
-                "mime_type": presign_data.mime_type,
-                "role_id": presign_data.role_id
-            }
+            url=post["url"],
+            fields=post["fields"],
+            storage_filename=key,
+            max_size_bytes=storage.CV_MAX_UPLOAD_BYTES
         )
 
+    except (HTTPException, PoolSaturated):
+        raise
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Storage service error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate presigned URL: {str(e)}")
 
- 
 
-@router.post("/confirm", response_model=CVResponse)
-def confirm_cv_upload(
-    confirm_data: CVConfirmRequest,
+@router.post("/multipart", response_model=CVMultipartStartResponse)
+async def start_multipart_cv_upload(
+    start_data: CVMultipartStartRequest,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
 ):
     """
-    Confirm CV upload and create CV record
+    Step 1 (large files): start a multipart upload
+
+    Returns one presigned PUT per part so the client can upload parts in
+    parallel and retry only the parts that fail. Each URL is signed for
+    its part's exact length.
     """
     try:
-        # Validate role_id if provided
-        if confirm_data.role_id:
-            role = session.query(Role).filter(
-                Role.id == confirm_data.role_id, 
-                Role.is_active == True
-            ).first()
-            if not role:
-                raise HTTPException(status_code=404, detail="Role not found or inactive")
-
-        # Validate file size (10MB limit)
-        max_size = 10 * 1024 * 1024  # 10MB in bytes
-        if confirm_data.size_bytes > max_size:
+        await _validate_role(session, start_data.role_id)
+        _validate_mime_type(start_data.mime_type)
+        if start_data.size_bytes <= 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+        if start_data.size_bytes > storage.CV_MAX_UPLOAD_BYTES:
             raise HTTPException(status_code=400, detail="File size exceeds 10MB limit")
 
-        # Use the storage filename from presign step
-        storage_url = f"{STORAGE_ENDPOINT}/{STORAGE_BUCKET}/{confirm_data.storage_filename}"
-
-        # Create CV record
-        cv = CV(
-            user_id=current_user.id,
-            role_id=confirm_data.role_id,
-            filename=confirm_data.filename,
-            mime_type=confirm_data.filename.split('.')[-1],
-            size_bytes=confirm_data.size_bytes,
-            storage_url=storage_url,
-            status="uploaded"
-        )
-        
-        session.add(cv)
-        session.commit()
-        session.refresh(cv)
-
-        return CVResponse(
-            id=cv.id,
-            user_id=cv.user_id,
-            role_id=cv.role_id,
-            filename=cv.filename,
-            mime_type=cv.mime_type,
-            size_bytes=cv.size_bytes,
-            storage_url=cv.storage_url,
-            status=cv.status,
-            created_at=cv.created_at
+        key = storage.new_cv_key(current_user.id, start_data.filename)
+        upload = await storage.run(
+            storage.start_multipart_upload, key, start_data.mime_type, start_data.size_bytes
         )
+        return CVMultipartStartResponse(storage_filename=key, **upload)
 
-    except HTTPException:
+    except (HTTPException, PoolSaturated):
         raise
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Storage service error: {str(e)}")
     except Exception as e:
-        session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to start multipart upload: {str(e)}")
+
+
+@router.post("/multipart/complete", response_model=CVResponse)
+async def complete_multipart_cv_upload(
+    complete_data: CVMultipartCompleteRequest,
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep
+):
+    """
+    Step 2 (large files): assemble the uploaded parts, verify the result and
+    create the CV record
+    """
+    key = _owned_key(current_user, complete_data.storage_filename)
+    try:
+        await _validate_role(session, complete_data.role_id)
+        parts = [{"PartNumber": p.part_number, "ETag": p.etag} for p in complete_data.parts]
+        try:
+            await storage.run(storage.complete_multipart_upload, key, complete_data.upload_id, parts)
+        except ClientError as e:
+            raise HTTPException(status_code=400, detail=f"Could not complete upload: {e.response.get('Error', {}).get('Code', str(e))}")
+
+        return await _record_uploaded_cv(session, current_user, key, complete_data.filename, complete_data.role_id)
+
+    except (HTTPException, PoolSaturated):
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to complete CV upload: {str(e)}")
+
+
+@router.post("/multipart/abort")
+async def abort_multipart_cv_upload(
+    abort_data: CVMultipartAbortRequest,
+    current_user: Annotated[User, Depends(get_curr_user)]
+):
+    """
+    Abandon a multipart upload and free its stored parts
+    """
+    key = _owned_key(current_user, abort_data.storage_filename)
+    try:
+        await storage.run(storage.abort_multipart_upload, key, abort_data.upload_id)
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Storage service error: {str(e)}")
+    return {"message": "Upload aborted"}
+
+
+@router.post("/confirm", response_model=CVResponse)
+async def confirm_cv_upload(
+    confirm_data: CVConfirmRequest,
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep
+):
+    """
+    Confirm CV upload and create CV record
+
+    Size and type come from one HEAD of the stored object; the client's
+    size_bytes is not trusted.
+    """
+    key = _owned_key(current_user, confirm_data.storage_filename)
+    try:
+        await _validate_role(session, confirm_data.role_id)
+        return await _record_uploaded_cv(session, current_user, key, confirm_data.filename, confirm_data.role_id)
+
+    except (HTTPException, PoolSaturated):
+        raise
+    except Exception as e:
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to confirm CV upload: {str(e)}")
 
 @router.get("/", response_model=CVListResponse)
-def get_user_cvs(
+async def get_user_cvs(
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep,
-    skip: int = 0,
-    limit: int = 10
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, description=f"Page size, capped at {MAX_PAGE_SIZE}"),
+    include_total: bool = False,
+    skip: Optional[int] = Query(None, ge=0, description="Deprecated offset mode; use cursor")
 ):
     """
-    Get list of user's CVs with pagination
+    Get list of user's CVs, newest first, with cursor pagination
+    (skip/limit is still accepted and always returns total)
     """
     try:
-        # Get total count
-        total = session.query(CV).filter(CV.user_id == current_user.id).count()
-        
-        # Get CVs with pagination
-        cvs = session.query(CV).filter(
-            CV.user_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        # Clients of the old skip/limit API may ask for more than a page
+        limit = page_size(limit)
+        query = select(CV).where(CV.user_id == current_user.id)
+        next_cursor = None
+        if skip is not None:
+            include_total = True
+            cvs = (await session.execute(
+                query.order_by(CV.created_at.desc(), CV.id.desc()).offset(skip).limit(limit)
+            )).scalars().all()
+        else:
+            rows = (await session.execute(keyset_page(query, CV.created_at, CV.id, cursor, limit))).scalars().all()
+            cvs, next_cursor = next_page(rows, limit)
+
+        total = None
+        if include_total:
+            total = (await session.execute(
+                select(func.count()).select_from(CV).where(CV.user_id == current_user.id)
+            )).scalar_one()
 
         cv_responses = [
             CVResponse(
@@ -186,68 +294,57 @@ def get_user_cvs(
             for cv in cvs
         ]
 
-        return CVListResponse(cvs=cv_responses, total=total)
+        return CVListResponse(cvs=cv_responses, total=total, next_cursor=next_cursor)
 
+    except (HTTPException, PoolSaturated):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get CVs: {str(e)}")
 
 @router.delete("/{cv_id}")
-def delete_cv(
+async def delete_cv(
     cv_id: int,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
 ):
     """
-    Delete a CV file from database and optionally from storage
+    Delete a CV record; its file is removed from storage in the background
     """
     try:
         # Find CV and verify ownership
-        cv = session.query(CV).filter(
+        cv = (await session.execute(select(CV).where(
             CV.id == cv_id,
             CV.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not cv:
             raise HTTPException(status_code=404, detail="CV not found")
 
-        # Try to delete from MinIO storage (optional)
-        minio_deleted = False
-        try:
-            # Extract key from storage_url
-            # storage_url format: http://127.0.0.1:9000/cvs/user_id/uuid.pdf
-            storage_url_parts = cv.storage_url.split(f"{STORAGE_BUCKET}/")
-            if len(storage_url_parts) == 2:
-                key = storage_url_parts[1]
-                s3_client.delete_object(Bucket=STORAGE_BUCKET, Key=key)
-                minio_deleted = True
-        except Exception as e:
-            # MinIO deletion failed (not running, network error, etc.)
-            # Log the error but continue with DB deletion
-            print(f"MinIO deletion failed for CV {cv_id}: {str(e)}")
-            minio_deleted = False
-
-        # Always delete from database
-        session.delete(cv)
-        session.commit()
-
-        # Return success message
-        if minio_deleted:
-            return {"message": "CV deleted successfully from database and storage"}
+        # The object is removed by the storage reaper after the commit, so
+        # a slow or unavailable storage service never holds up the request.
+        # Fingerprinted CVs share their object; it goes with the last reference.
+        await session.delete(cv)
+        if cv.content_sha256:
+            await session.flush()
+            await release_blob(session, cv.content_sha256)
         else:
-            return {
-                "message": "CV deleted from database successfully",
-                "note": "Storage cleanup was skipped (MinIO may not be running)"
-            }
+            key = storage.key_from_url(cv.storage_url)
+            if key:
+                await enqueue_orphan(session, key)
+        await session.commit()
+        persona_inputs_changed(current_user.id)
+
+        return {"message": "CV deleted successfully"}
 
-    except HTTPException:
+    except (HTTPException, PoolSaturated):
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete CV: {str(e)}")
 
 
 @router.get("/{cv_id}/download", response_model=CVDownloadResponse)
-def get_cv_download_url(
+async def get_cv_download_url(
     cv_id: int,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
@@ -264,38 +361,27 @@ def get_cv_download_url(
     """
     try:
         # Find CV and verify ownership
-        cv = session.query(CV).filter(
+        cv = (await session.execute(select(CV).where(
             CV.id == cv_id,
             CV.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not cv:
             raise HTTPException(status_code=404, detail="CV not found")
 
-        # Extract the key from storage_url
-        # storage_url format: http://127.0.0.1:9000/cvs/user_id/uuid.pdf
-        storage_url_parts = cv.storage_url.split(f"{STORAGE_BUCKET}/")
-        if len(storage_url_parts) != 2:
+        key = storage.key_from_url(cv.storage_url)
+        if not key:
             raise HTTPException(status_code=500, detail="Invalid storage URL format")
-        
-        key = storage_url_parts[1]
 
         # Generate presigned download URL
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': STORAGE_BUCKET,
-                'Key': key
-            },
-            ExpiresIn=900  # 15 minutes expiry
-        )
+        presigned_url = storage.presign_download(key)
 
         return CVDownloadResponse(
             download_url=presigned_url,
-            expires_in=900
+            expires_in=storage.DOWNLOAD_URL_EXPIRES_SECONDS
         )
 
-    except HTTPException:
+    except (HTTPException, PoolSaturated):
         raise
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Storage service error: {str(e)}")
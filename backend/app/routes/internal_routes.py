@@ -0,0 +1,104 @@
+from fastapi import Depends, APIRouter, HTTPException, Query
+from app.catalog_cache import get_catalog_cache_stats
+from app.database import get_pool_stats
+from app.dependencies import SessionDep, require_internal_token
+from app.process_pool import get_process_pool_stats
+from app.services.cv_blobs import blob_stats
+from app.services.interview_engine import get_interview_engine
+from app.services.payment_gateway import get_payment_gateway
+from app.services.persona_engine import get_persona_engine
+from app.services.screening_queue import screening_stats
+from app.services.storage_reaper import orphan_stats
+from app.services.webhook_queue import list_events, requeue_event
+
+# Operational endpoints, guarded by the X-Internal-Token header
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+@router.get("/db/pool")
+async def db_pool_stats():
+    """
+    Connection pool usage: checked-out connections, overflow in use,
+    pool timeouts and a histogram of time spent waiting for a connection
+    """
+    return get_pool_stats()
+
+@router.get("/process-pools")
+async def process_pool_stats():
+    """
+    Bounded worker pools (CPU processes and storage I/O threads): in-flight jobs, queue depth, rejections (503s) and job latency
+    """
+    return get_process_pool_stats()
+
+@router.get("/catalog-caches")
+async def catalog_cache_stats():
+    """
+    Cached public catalogs: how many times each was loaded from the database
+    """
+    return get_catalog_cache_stats()
+
+@router.get("/payment-gateway")
+async def payment_gateway_stats():
+    """
+    Active payment gateway and, for Razorpay, its circuit breaker state
+    """
+    return get_payment_gateway().stats()
+
+@router.get("/interviews")
+async def interview_engine_stats():
+    """
+    Interview sessions live on this node, outcomes so far and question model latency
+    """
+    return get_interview_engine().stats()
+
+@router.get("/screenings")
+async def screening_queue_stats(session: SessionDep):
+    """
+    Screenings per status, batches handed to the screening workers and the worker pool
+    """
+    return await screening_stats(session)
+
+@router.get("/webhook-events")
+async def webhook_events(
+    session: SessionDep,
+    status: str = "dead",
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Webhook queue depth per status and the latest events in one status;
+    the default lists dead letters (out of retries or not applicable)
+    """
+    return await list_events(session, status, limit)
+
+@router.post("/webhook-events/{event_id}/requeue")
+async def requeue_webhook_event(event_id: int, session: SessionDep):
+    """
+    Send a dead-lettered event back to the workers with fresh attempts
+    """
+    if not await requeue_event(session, event_id):
+        raise HTTPException(status_code=404, detail="No dead webhook event with this id")
+    await session.commit()
+    return {"message": "Event requeued", "id": event_id}
+
+@router.get("/storage-orphans")
+async def storage_orphans(session: SessionDep):
+    """
+    Storage reaper backlog: objects waiting to be deleted, how many are
+    retrying after a failed delete, and the oldest one's age
+    """
+    return await orphan_stats(session)
+
+@router.get("/cv-blobs")
+async def cv_blobs(session: SessionDep):
+    """
+    CV deduplication: distinct stored files against the CVs referencing
+    them, bytes saved, cached extractions and CVs not yet fingerprinted
+    """
+    return await blob_stats(session)
+
+@router.get("/personas")
+async def persona_engine_stats():
+    """
+    Persona recomputes on this node: changes seen, debounced and coalesced
+    runs, sources processed and the cached responses
+    """
+    return get_persona_engine().stats()
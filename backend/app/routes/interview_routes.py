@@ -0,0 +1,311 @@
+from fastapi import Depends, HTTPException, APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from typing import Annotated
+from datetime import datetime
+from sqlalchemy import select
+import asyncio
+import json
+from app.models.user_model import User
+from app.models.cv_model import CV
+from app.models.interview_model import Interview
+from app.models.interview_turn_model import InterviewTurn
+from app.schemas import (
+    InterviewStartRequest, InterviewAnswerRequest, InterviewResponse,
+    InterviewStateResponse, InterviewTurnResponse
+)
+from app.database import AsyncSessionLocal
+from app.dependencies import SessionDep, get_curr_user
+from app.process_pool import PoolSaturated
+from app.routes.roles_routes import roles_catalog
+from app.services.interview_engine import (
+    INTERVIEW_STREAM_KEEPALIVE_SECONDS, INTERVIEW_STREAM_MAX_MESSAGE_BYTES, INTERVIEW_STREAM_MAX_PER_SESSION,
+    INTERVIEW_STREAM_MESSAGES_PER_SECOND, INTERVIEW_STREAM_SEND_TIMEOUT_SECONDS,
+    AnswerRejected, InterviewSession, Subscription, TooManyStreams,
+    get_interview_engine, reserve_interview
+)
+from app.services.question_model import InterviewContext
+from app.services.wallet_ledger import InsufficientCredits
+from app.user_cache import invalidate_user
+
+router = APIRouter()
+
+# Browsers cannot set headers on WebSocket or EventSource requests, so the
+# streaming endpoints also take the access token as ?token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+
+def _interview_response(interview: Interview) -> dict:
+    return {
+        "id": interview.id,
+        "user_id": interview.user_id,
+        "role_id": interview.role_id,
+        "cv_id": interview.cv_id,
+        "status": interview.status,
+        "credits_used": interview.credits_used,
+        "failure_reason": interview.failure_reason,
+        "started_at": interview.started_at,
+        "ended_at": interview.ended_at,
+        "created_at": interview.created_at,
+    }
+
+
+async def _owned_interview(session, interview_id: int, user_id: int) -> Interview:
+    interview = (await session.execute(select(Interview).where(
+        Interview.id == interview_id,
+        Interview.user_id == user_id
+    ))).scalars().first()
+    if not interview:
+        raise HTTPException(status_code=404, detail="Interview not found")
+    return interview
+
+
+@router.post("/start", response_model=InterviewResponse)
+async def start_interview(
+    start_data: InterviewStartRequest,
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep
+):
+    """
+    Reserve the interview's credits, create it and hand it to the interview engine
+
+    The credits are debited in the same transaction that creates the
+    interview, and refunded automatically if the session fails.
+    """
+    engine = get_interview_engine()
+    # 503 before any credits move when this node already runs its maximum sessions
+    engine.admit()
+    try:
+        # Active roles come from the cached catalog; no query
+        role = next((r for r in (await roles_catalog.get()).data if r["id"] == start_data.role_id), None)
+        if role is None:
+            raise HTTPException(status_code=404, detail="Role not found or inactive")
+        if start_data.cv_id is not None:
+            cv_id = (await session.execute(select(CV.id).where(
+                CV.id == start_data.cv_id,
+                CV.user_id == current_user.id
+            ))).scalar()
+            if cv_id is None:
+                raise HTTPException(status_code=404, detail="CV not found")
+
+        try:
+            interview = await reserve_interview(session, current_user.id, role["id"], start_data.cv_id)
+        except InsufficientCredits:
+            await session.rollback()
+            raise HTTPException(status_code=402, detail="Insufficient credits. You need at least 5 credits to start an interview.")
+        await session.commit()
+    except (HTTPException, PoolSaturated):
+        engine.release()
+        raise
+    except Exception as e:
+        engine.release()
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to start interview: {str(e)}")
+
+    invalidate_user(current_user.id)
+    engine.start(
+        interview.id,
+        current_user.id,
+        InterviewContext(role_title=role["title"], role_description=role["description"] or ""),
+    )
+    return _interview_response(interview)
+
+
+@router.get("/{interview_id}", response_model=InterviewStateResponse)
+async def get_interview(
+    interview_id: int,
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep
+):
+    """
+    Interview status, the question waiting for an answer (if any) and the
+    turns so far. Live sessions are read from memory on the node running them.
+    """
+    live = get_interview_engine().get(interview_id)
+    if live is not None and live.user_id == current_user.id:
+        interview = await _owned_interview(session, interview_id, current_user.id)
+        return {
+            **_interview_response(interview),
+            "status": live.status,
+            "current_question": live.current_question,
+            "turns": [turn.as_dict() for turn in live.turns],
+        }
+
+    interview = await _owned_interview(session, interview_id, current_user.id)
+    turns = (await session.execute(
+        select(InterviewTurn).where(InterviewTurn.interview_id == interview_id).order_by(InterviewTurn.turn_index)
+    )).scalars().all()
+    return {
+        **_interview_response(interview),
+        "current_question": None,
+        "turns": [
+            InterviewTurnResponse(
+                turn_index=turn.turn_index,
+                question=turn.question,
+                answer=turn.answer,
+                feedback=turn.feedback,
+                asked_at=turn.asked_at,
+                answered_at=turn.answered_at
+            )
+            for turn in turns
+        ],
+    }
+
+
+@router.post("/{interview_id}/answer")
+async def answer_question(
+    interview_id: int,
+    answer_data: InterviewAnswerRequest,
+    current_user: Annotated[User, Depends(get_curr_user)]
+):
+    """
+    Answer the current question; the next one appears once the session has
+    produced feedback. Answers must reach the node running the session.
+    """
+    live = get_interview_engine().get(interview_id)
+    if live is None or live.user_id != current_user.id:
+        raise HTTPException(status_code=409, detail="Interview is not live on this server")
+    try:
+        turn_index = live.submit_answer(answer_data.answer)
+    except AnswerRejected as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": "Answer received", "turn_index": turn_index}
+
+
+def _encode_event(event: dict) -> str:
+    return json.dumps(event, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+
+
+async def _stream_session(token: str | None, interview_id: int) -> InterviewSession:
+    """Authenticate a streaming connection and find its live session on this node"""
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    # A short-lived session just for the token check; open streams hold no connection
+    async with AsyncSessionLocal() as session:
+        current_user = await get_curr_user(token, session)
+    live = get_interview_engine().get(interview_id)
+    if live is None or live.user_id != current_user.id:
+        raise HTTPException(status_code=409, detail="Interview is not live on this server")
+    return live
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription) -> None:
+    while (event := await subscription.next()) is not None:
+        # Waits while the socket's buffers are full; events meanwhile queue up
+        # to the subscription's limit and then collapse into a snapshot
+        await asyncio.wait_for(websocket.send_text(_encode_event(event)), INTERVIEW_STREAM_SEND_TIMEOUT_SECONDS)
+    await websocket.close()
+
+
+async def _receive_answers(websocket: WebSocket, live: InterviewSession, subscription: Subscription) -> None:
+    loop = asyncio.get_running_loop()
+    interval = 1 / INTERVIEW_STREAM_MESSAGES_PER_SECOND
+    # Token bucket as a theoretical arrival time, allowing a one second burst
+    allowed_at = loop.time()
+    while True:
+        allowed_at = max(allowed_at, loop.time()) + interval
+        delay = allowed_at - loop.time() - 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = await websocket.receive_text()
+        if len(message.encode()) > INTERVIEW_STREAM_MAX_MESSAGE_BYTES:
+            await websocket.close(code=1009, reason=f"Messages are limited to {INTERVIEW_STREAM_MAX_MESSAGE_BYTES} bytes")
+            return
+        try:
+            data = json.loads(message)
+            kind = data["type"]
+            if kind == "answer_chunk":
+                live.add_answer_chunk(data["turn_index"], str(data["text"]))
+            elif kind == "answer_end":
+                if data.get("text"):
+                    live.add_answer_chunk(data["turn_index"], str(data["text"]))
+                live.finish_answer(data["turn_index"])
+            elif kind == "ping":
+                subscription.push({"type": "pong"})
+            else:
+                subscription.push({"type": "error", "detail": f"Unknown message type: {kind}"})
+        except (ValueError, KeyError, TypeError):
+            subscription.push({"type": "error", "detail": "Messages are JSON objects with a type"})
+        except AnswerRejected as e:
+            subscription.push({"type": "error", "detail": str(e)})
+
+
+@router.websocket("/{interview_id}/ws")
+async def interview_socket(websocket: WebSocket, interview_id: int, token: str | None = None):
+    """
+    Live interview over a WebSocket.
+
+    The server sends JSON events: a snapshot first (and again after the
+    connection falls behind), then question_delta/question, answer_received,
+    feedback_delta/feedback and finally end. The client answers with
+    {"type": "answer_chunk", "turn_index", "text"} messages and one
+    {"type": "answer_end", "turn_index"}. Errors close the socket with
+    4000 + the HTTP status (4401, 4409, 4429).
+    """
+    await websocket.accept()
+    engine = get_interview_engine()
+    try:
+        live = await _stream_session(token, interview_id)
+        subscription = engine.subscribe(live)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code, reason=e.detail)
+        return
+    except TooManyStreams as e:
+        await websocket.close(code=4429, reason=str(e))
+        return
+
+    sender = asyncio.create_task(_send_events(websocket, subscription))
+    receiver = asyncio.create_task(_receive_answers(websocket, live, subscription))
+    try:
+        await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        engine.unsubscribe(subscription)
+        for task in (sender, receiver):
+            task.cancel()
+        # Disconnects, send timeouts and closes all end the connection the same way
+        for result in await asyncio.gather(sender, receiver, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, (WebSocketDisconnect, asyncio.TimeoutError)):
+                print(f"Interview {interview_id} stream failed: {result}")
+
+
+async def _sse_events(engine, live: InterviewSession):
+    try:
+        subscription = engine.subscribe(live)
+    except TooManyStreams as e:
+        yield f"event: error\ndata: {_encode_event({'type': 'error', 'detail': str(e)})}\n\n"
+        return
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.next(), INTERVIEW_STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            yield f"event: {event['type']}\ndata: {_encode_event(event)}\n\n"
+    finally:
+        engine.unsubscribe(subscription)
+
+
+@router.get("/{interview_id}/events")
+async def interview_events(
+    interview_id: int,
+    token: str | None = None,
+    bearer: Annotated[str | None, Depends(optional_oauth2_scheme)] = None
+):
+    """
+    Server-sent events fallback for clients that cannot open the WebSocket:
+    the same events, one per SSE message named after its type. Answers go to
+    POST /{interview_id}/answer.
+    """
+    live = await _stream_session(bearer or token, interview_id)
+    engine = get_interview_engine()
+    if len(live.subscriptions) >= INTERVIEW_STREAM_MAX_PER_SESSION:
+        raise HTTPException(status_code=429, detail="Too many connections to this interview")
+    return StreamingResponse(
+        _sse_events(engine, live),
+        media_type="text/event-stream",
+        # No proxy buffering, or events arrive in bursts
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
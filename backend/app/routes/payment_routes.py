@@ -1,52 +1,62 @@
-from fastapi import Depends, HTTPException, APIRouter, Request
-from typing import Annotated, List
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import Depends, HTTPException, APIRouter, Query, Request
+from fastapi.responses import Response
+from typing import Annotated, List, Optional
+from sqlalchemy import func, select
 from app.models.user_model import User
-from app.models.wallet_model import Wallet
 from app.models.transaction_model import Transaction
 from app.models.payment_model import Payment
+from app.models.credit_pack_model import CreditPack
 from app.schemas import (
     PaymentWalletResponse, PaymentTransactionResponse, PaymentOrderRequest,
-    PaymentOrderResponse, PaymentWebhookRequest, TransactionListResponse
+    PaymentOrderResponse, PaymentWebhookRequest, TransactionListResponse, CreditPackResponse
 )
 from app.dependencies import SessionDep, get_curr_user
+from app.catalog_cache import CatalogCache, etag_matches
+from app.pagination import MAX_PAGE_SIZE, keyset_page, next_page, page_size
+from app.services.payment_events import razorpay_payment_entity
+from app.services.payment_gateway import RAZORPAY_KEY, RAZORPAY_SECRET, GatewayUnavailable, PaymentGatewayError, get_payment_gateway
+from app.services.qr_codes import get_qr_svg, link_from_token, qr_token
+from app.services.wallet_ledger import get_balance
+from app.services.webhook_queue import enqueue_event
 import os
 import hashlib
 import hmac
 import json
+import uuid
 from decimal import Decimal
 
 router = APIRouter()
 
 # Payment configuration
-PAYMENT_PROVIDER = os.getenv("PAYMENT_PROVIDER", "razorpay")
-RAZORPAY_KEY = os.getenv("RAZORPAY_KEY")
-RAZORPAY_SECRET = os.getenv("RAZORPAY_SECRET")
 MERCHANT_UPI_ID = os.getenv("MERCHANT_UPI_ID", "merchant@upi")  # Your UPI ID
 COMPANY_NAME = os.getenv("COMPANY_NAME", "InterviewCredits")
 
-# Credit pack configuration (hardcoded for MVP)
-CREDIT_PACKS = {
-    1: {"credits": 10, "amount_inr": Decimal("100.00"), "description": "10 Credits Pack"},
-    2: {"credits": 25, "amount_inr": Decimal("225.00"), "description": "25 Credits Pack"},
-    3: {"credits": 50, "amount_inr": Decimal("400.00"), "description": "50 Credits Pack"},
-    4: {"credits": 100, "amount_inr": Decimal("750.00"), "description": "100 Credits Pack"},
-}
+async def _load_credit_packs(session):
+    packs = (await session.execute(
+        select(CreditPack).where(CreditPack.is_active == True).order_by(CreditPack.sort_order, CreditPack.id)
+    )).scalars().all()
+    return [
+        {
+            "id": pack.id,
+            "credits": pack.credits,
+            "amount_inr": str(pack.amount_inr),  # exact, as the order response renders it
+            "description": pack.description,
+            "is_active": pack.is_active
+        }
+        for pack in packs
+    ]
+
+# Invalidated by the credit_packs table's NOTIFY trigger (see app/catalog_cache.py)
+credit_packs_catalog = CatalogCache("credit_packs", _load_credit_packs)
 
-def get_or_create_wallet(user_id: int, session: Session) -> Wallet:
-    """Get or create wallet for user"""
-    wallet = session.query(Wallet).filter(Wallet.user_id == user_id).first()
-    if not wallet:
-        wallet = Wallet(user_id=user_id, balance_credits=0)
-        session.add(wallet)
-        session.commit()
-        session.refresh(wallet)
-    return wallet
+async def get_credit_pack(pack_id: int) -> dict | None:
+    """Active pack by id, from the cached catalog"""
+    catalog = await credit_packs_catalog.get()
+    return next((pack for pack in catalog.data if pack["id"] == pack_id), None)
 
 def verify_razorpay_signature(payload: str, signature: str) -> bool:
     """Verify Razorpay webhook signature"""
-    if not RAZORPAY_SECRET:
+    if not RAZORPAY_SECRET or not signature:
         return False
     
     expected_signature = hmac.new(
@@ -57,34 +67,6 @@ def verify_razorpay_signature(payload: str, signature: str) -> bool:
     
     return hmac.compare_digest(expected_signature, signature)
 
-def create_razorpay_order(amount: int, order_id: str, user_email: str):
-    """Create real Razorpay order"""
-    try:
-        import razorpay
-        
-        if not RAZORPAY_KEY or not RAZORPAY_SECRET:
-            raise Exception("Razorpay credentials not configured")
-        
-        client = razorpay.Client(auth=(RAZORPAY_KEY, RAZORPAY_SECRET))
-        
-        order_data = {
-            "amount": amount,  # Amount in paise
-            "currency": "INR",
-            "receipt": order_id,
-            "notes": {
-                "user_email": user_email,
-                "order_type": "credit_purchase"
-            }
-        }
-        
-        razorpay_order = client.order.create(data=order_data)
-        return razorpay_order
-        
-    except ImportError:
-        raise Exception("Razorpay package not installed. Run: pip install razorpay")
-    except Exception as e:
-        raise Exception(f"Failed to create Razorpay order: {str(e)}")
-
 def generate_real_upi_link(order_id: str, amount: Decimal, razorpay_order_id: str = None):
     """Generate real UPI payment link"""
     if RAZORPAY_KEY and RAZORPAY_SECRET and MERCHANT_UPI_ID:
@@ -98,7 +80,7 @@ def generate_real_upi_link(order_id: str, amount: Decimal, razorpay_order_id: st
         return f"upi://pay?pa=merchant@upi&pn=InterviewCredits&tn={order_id}&am={amount}&cu=INR"
 
 @router.get("/wallet", response_model=PaymentWalletResponse)
-def get_wallet(
+async def get_wallet(
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
 ):
@@ -106,13 +88,12 @@ def get_wallet(
     Get user's wallet balance and last 5 transactions
     """
     try:
-        # Get or create wallet
-        wallet = get_or_create_wallet(current_user.id, session)
+        balance_credits = await get_balance(session, current_user.id)
         
         # Get last 5 transactions
-        transactions = session.query(Transaction).filter(
+        transactions = (await session.execute(select(Transaction).where(
             Transaction.user_id == current_user.id
-        ).order_by(Transaction.created_at.desc()).limit(5).all()
+        ).order_by(Transaction.created_at.desc()).limit(5))).scalars().all()
         
         transaction_responses = [
             PaymentTransactionResponse(
@@ -131,16 +112,27 @@ def get_wallet(
         ]
         
         return PaymentWalletResponse(
-            balance_credits=wallet.balance_credits,
+            balance_credits=balance_credits,
             last_transactions=transaction_responses
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get wallet: {str(e)}")
 
+@router.get("/payments/packs", response_model=List[CreditPackResponse])
+async def get_credit_packs(request: Request):
+    """
+    Active credit packs, from the per-process catalog cache (ETag / 304 aware)
+    """
+    try:
+        return await credit_packs_catalog.response(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get credit packs: {str(e)}")
+
 @router.post("/payments/order", response_model=PaymentOrderResponse)
-def create_payment_order(
+async def create_payment_order(
     order_data: PaymentOrderRequest,
+    request: Request,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
 ):
@@ -149,203 +141,162 @@ def create_payment_order(
     """
     try:
         # Validate credit pack
-        if order_data.pack_id not in CREDIT_PACKS:
+        pack = await get_credit_pack(order_data.pack_id)
+        if pack is None:
             raise HTTPException(status_code=400, detail="Invalid credit pack")
+        amount_inr = Decimal(pack["amount_inr"])
         
-        pack = CREDIT_PACKS[order_data.pack_id]
-        
-        # Generate order ID
-        import uuid
-        order_id = f"order_{uuid.uuid4().hex[:16]}"
-        
-        # Create payment record
+        # The gateway order comes first so the payment row is written once, with
+        # the gateway's order id that its webhooks will refer to
+        receipt = f"rcpt_{uuid.uuid4().hex[:16]}"
+        gateway = get_payment_gateway()
+        gateway_order = await gateway.create_order(
+            amount_paise=int(amount_inr * 100),
+            currency="INR",
+            receipt=receipt,
+            notes={"user_email": current_user.email, "order_type": "credit_purchase"},
+        )
+        order_id = gateway_order.id
+
         payment = Payment(
             user_id=current_user.id,
             order_id=order_id,
-            amount_inr=pack["amount_inr"],
+            amount_inr=amount_inr,
             currency="INR",
             status="created",
             method="UPI",
-            payload_json={"pack_id": order_data.pack_id, "credits": pack["credits"]}
+            payload_json={
+                "pack_id": order_data.pack_id,
+                "credits": pack["credits"],
+                "gateway": gateway.name,
+                "receipt": receipt,
+            }
         )
-        
         session.add(payment)
-        session.commit()
-        session.refresh(payment)
-        
-        # Create Razorpay order if credentials are available
-        razorpay_order_id = None
-        if RAZORPAY_KEY and RAZORPAY_SECRET:
-            try:
-                amount_in_paise = int(pack["amount_inr"] * 100)  # Convert to paise
-                razorpay_order = create_razorpay_order(
-                    amount=amount_in_paise,
-                    order_id=order_id,
-                    user_email=current_user.email
-                )
-                razorpay_order_id = razorpay_order.get("id")
-                
-                # Update payment record with Razorpay order ID
-                payment.payload_json["razorpay_order_id"] = razorpay_order_id
-                session.commit()
-                
-            except Exception as e:
-                # Log error but continue with mock payment
-                print(f"Razorpay order creation failed: {e}")
+        await session.commit()
         
         # Generate UPI link
         upi_link = generate_real_upi_link(
             order_id=order_id,
-            amount=pack["amount_inr"],
-            razorpay_order_id=razorpay_order_id
+            amount=amount_inr,
+            razorpay_order_id=order_id if gateway.name == "razorpay" else None
         )
         
-        # Generate QR code (in production, you'd use a QR code library)
-        qr_code = None
-        if RAZORPAY_KEY and RAZORPAY_SECRET:
-            # In production, generate QR code for the UPI link
-            try:
-                import qrcode
-                import base64
-                from io import BytesIO
-                
-                # Generate QR code
-                qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                qr.add_data(upi_link)
-                qr.make(fit=True)
-                
-                # Create QR code image
-                img = qr.make_image(fill_color="black", back_color="white")
-                
-                # Convert to base64
-                buffer = BytesIO()
-                img.save(buffer, format='PNG')
-                qr_code = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
-                
-            except ImportError:
-                # QR code library not installed, continue without QR
-                pass
-            except Exception as e:
-                # QR generation failed, continue without QR
-                print(f"QR code generation failed: {e}")
-                pass
+        # The QR image is rendered and cached when the client fetches it
+        token = qr_token(upi_link)
+        qr_code = str(request.url_for("payment_qr_code", token=token)) if token else None
         
         return PaymentOrderResponse(
             order_id=order_id,
-            amount=pack["amount_inr"],
+            amount=amount_inr,
             upi_link=upi_link,
             qr_code=qr_code
         )
         
     except HTTPException:
         raise
+    except GatewayUnavailable:
+        raise HTTPException(status_code=503, detail="Payment gateway is unavailable, please retry shortly", headers={"Retry-After": "5"})
+    except PaymentGatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Payment gateway rejected the order: {str(e)}")
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
 
+@router.get("/payments/qr/{token}")
+async def payment_qr_code(token: str, request: Request):
+    """
+    SVG QR code for a UPI link issued by /payments/order. The token is signed
+    and content-addressed, so the image never changes and may be cached forever.
+    """
+    upi_link = link_from_token(token)
+    if upi_link is None:
+        raise HTTPException(status_code=404, detail="QR code not found")
+    svg, etag = await get_qr_svg(upi_link)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=svg, media_type="image/svg+xml", headers=headers)
+
 @router.post("/payments/webhook")
 async def payment_webhook(
     request: Request,
     session: SessionDep
 ):
     """
-    Handle payment webhook from payment gateway
+    Accept a payment webhook from the gateway.
+
+    The event is verified and stored, keyed by the gateway's event id so
+    redeliveries are dropped, and applied later by the webhook workers. This
+    keeps the response fast enough that the gateway does not retry.
     """
     try:
-        # Get raw body for signature verification
         body = await request.body()
-        payload = body.decode()
-        
-        # Get headers
         signature = request.headers.get("X-Razorpay-Signature")
-        
+
         # Verify signature (in production)
-        if RAZORPAY_SECRET and not verify_razorpay_signature(payload, signature):
+        if RAZORPAY_SECRET and not verify_razorpay_signature(body.decode(), signature):
             raise HTTPException(status_code=400, detail="Invalid signature")
-        
-        # Parse webhook data
-        webhook_data = json.loads(payload)
-        
-        # Extract payment details
-        payment_id = webhook_data.get("payload", {}).get("payment", {}).get("entity", {}).get("id")
-        order_id = webhook_data.get("payload", {}).get("payment", {}).get("entity", {}).get("order_id")
-        status = webhook_data.get("payload", {}).get("payment", {}).get("entity", {}).get("status")
-        amount = webhook_data.get("payload", {}).get("payment", {}).get("entity", {}).get("amount")
-        
-        if not all([payment_id, order_id, status, amount]):
+
+        try:
+            webhook_data = json.loads(body)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Invalid webhook data")
-        
-        # Find payment record
-        payment = session.query(Payment).filter(Payment.order_id == order_id).first()
-        if not payment:
-            raise HTTPException(status_code=404, detail="Payment not found")
-        
-        # Check if already processed
-        if payment.status == "success":
-            return {"message": "Payment already processed"}
-        
-        # Update payment status
-        payment.status = status
-        payment.signature = signature
-        
-        if status == "captured":
-            # Payment successful - credit the wallet
-            pack_data = payment.payload_json
-            credits = pack_data.get("credits", 0)
-            
-            # Get or create wallet
-            wallet = get_or_create_wallet(payment.user_id, session)
-            
-            # Add credits
-            wallet.balance_credits += credits
-            
-            # Create transaction record
-            transaction = Transaction(
-                user_id=payment.user_id,
-                type="purchase",
-                credits=credits,
-                amount_inr=payment.amount_inr,
-                currency=payment.currency,
-                payment_gateway="razorpay",
-                external_ref=payment_id,
-                status="success"
-            )
-            
-            session.add(transaction)
-            session.commit()
-            
-            return {"message": "Payment processed successfully", "credits_added": credits}
-        else:
-            # Payment failed
-            session.commit()
-            return {"message": "Payment failed", "status": status}
-            
+
+        entity = razorpay_payment_entity(webhook_data)
+        if not all([entity.get("id"), entity.get("order_id"), entity.get("status"), entity.get("amount")]):
+            raise HTTPException(status_code=400, detail="Invalid webhook data")
+
+        # Razorpay sends a unique id per event; fall back to the body digest
+        event_id = request.headers.get("X-Razorpay-Event-Id") or hashlib.sha256(body).hexdigest()
+        accepted = await enqueue_event(session, "razorpay", event_id, entity["order_id"], webhook_data, signature)
+        await session.commit()
+
+        return {"message": "Event accepted" if accepted else "Event already received"}
+
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process webhook: {str(e)}")
 
 @router.get("/transactions", response_model=TransactionListResponse)
-def get_transactions(
+async def get_transactions(
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep,
-    skip: int = 0,
-    limit: int = 10
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, description=f"Page size, capped at {MAX_PAGE_SIZE}"),
+    include_total: bool = False,
+    skip: Optional[int] = Query(None, ge=0, description="Deprecated offset mode; use cursor")
 ):
     """
-    Get paginated list of user's transactions
+    Get the user's transactions, newest first.
+
+    Pass the returned next_cursor to fetch the following page. total is only
+    computed when include_total=true (or in the legacy skip/limit mode).
     """
     try:
-        # Get total count
-        total = session.query(Transaction).filter(
-            Transaction.user_id == current_user.id
-        ).count()
-        
-        # Get transactions with pagination
-        transactions = session.query(Transaction).filter(
-            Transaction.user_id == current_user.id
-        ).order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
+        # Clients of the old skip/limit API may ask for more than a page
+        limit = page_size(limit)
+        query = select(Transaction).where(Transaction.user_id == current_user.id)
+        next_cursor = None
+        if skip is not None:
+            # Compatibility mode: offset paging, always with a total
+            include_total = True
+            transactions = (await session.execute(
+                query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).offset(skip).limit(limit)
+            )).scalars().all()
+        else:
+            rows = (await session.execute(
+                keyset_page(query, Transaction.created_at, Transaction.id, cursor, limit)
+            )).scalars().all()
+            transactions, next_cursor = next_page(rows, limit)
+
+        total = None
+        if include_total:
+            total = (await session.execute(
+                select(func.count()).select_from(Transaction).where(Transaction.user_id == current_user.id)
+            )).scalar_one()
         
         transaction_responses = [
             PaymentTransactionResponse(
@@ -365,9 +316,12 @@ def get_transactions(
         
         return TransactionListResponse(
             transactions=transaction_responses,
-            total=total
+            total=total,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get transactions: {str(e)}")
 
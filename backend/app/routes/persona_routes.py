@@ -0,0 +1,54 @@
+from fastapi import Depends, HTTPException, APIRouter, Response
+from typing import Annotated
+from sqlalchemy import select
+from app.models.user_model import User
+from app.models.persona_model import Persona
+from app.schemas import PersonaResponse
+from app.dependencies import SessionDep, get_curr_user
+from app.process_pool import PoolSaturated
+from app.services.persona_engine import (
+    cache_persona, get_cached_persona, get_persona_engine, persona_generation
+)
+
+router = APIRouter()
+
+
+@router.post("/compute", response_model=PersonaResponse)
+async def compute_persona(current_user: Annotated[User, Depends(get_curr_user)]):
+    """
+    Build or refresh the user's persona from their CVs, role selections,
+    screenings and interviews. Only sources changed since the last run are
+    processed; concurrent requests share one run.
+    """
+    try:
+        return await get_persona_engine().compute(current_user.id)
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute persona: {str(e)}")
+
+
+@router.get("/current", response_model=PersonaResponse)
+async def get_current_persona(current_user: Annotated[User, Depends(get_curr_user)], session: SessionDep):
+    """
+    The materialized persona, served from memory when cached. It is kept
+    up to date in the background as its inputs change.
+    """
+    body = get_cached_persona(current_user.id)
+    if body is None:
+        generation = persona_generation()
+        persona = (await session.execute(
+            select(Persona.id, Persona.user_id, Persona.summary, Persona.skills, Persona.updated_at)
+            .where(Persona.user_id == current_user.id)
+        )).first()
+        if persona is None:
+            raise HTTPException(status_code=404, detail="Persona not found")
+        body = PersonaResponse(
+            id=persona.id,
+            user_id=persona.user_id,
+            summary=persona.summary,
+            skills=persona.skills or [],
+            updated_at=persona.updated_at,
+        ).model_dump_json().encode()
+        cache_persona(current_user.id, body, generation)
+    return Response(content=body, media_type="application/json")
@@ -1,74 +1,98 @@
 from fastapi import  Depends, HTTPException, APIRouter
+from fastapi.responses import Response
 from typing import Annotated
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
 from app.models.user_model import User
 from app.models.user_profiles_model import UserProfile
 from app.models.activity_model import Activity
+from app.models.wallet_model import Wallet
 from app.schemas import (
     UserProfileUpdate, UserWithProfile
 )
 from app.dependencies import SessionDep, get_curr_user
+from app.user_cache import (
+    cache_snapshot, get_cached_snapshot, invalidate_user, notify_user_changed, snapshot_generation
+)
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserWithProfile)
-def get_user_profile(current_user: Annotated[User, Depends(get_curr_user)], session: SessionDep):
+async def get_user_profile(current_user: Annotated[User, Depends(get_curr_user)], session: SessionDep):
     try:
-        user_profile = session.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        wallet_balance = 0
-        from app.models.wallet_model import Wallet
-        wallet = session.query(Wallet).filter(Wallet.user_id == current_user.id).first()
-        wallet_balance = wallet.balance_credits if wallet else 0
-        user_data = {
-            "id": current_user.id,
-            "name": current_user.name,
-            "email": current_user.email,
-            "phone": current_user.phone,
-            "city": current_user.city
-        }
-        profile_data = None
-        if user_profile:
-            profile_data = {
-                "user_id": user_profile.user_id,
-                "full_name": user_profile.full_name,
-                "phone": user_profile.phone,
-                "city": user_profile.city,
-                "persona_id": user_profile.persona_id,
-                "created_at": user_profile.created_at,
-                "updated_at": user_profile.updated_at
+        body = get_cached_snapshot(current_user.id)
+        if body is None:
+            generation = snapshot_generation()
+            # users ⟕ user_profiles ⟕ wallets in one round-trip
+            row = (await session.execute(
+                select(User, UserProfile, Wallet.balance_credits)
+                .outerjoin(UserProfile, UserProfile.user_id == User.id)
+                .outerjoin(Wallet, Wallet.user_id == User.id)
+                .where(User.id == current_user.id)
+            )).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            user, user_profile, wallet_balance = row
+            user_data = {
+                "id": user.id,
+                "name": user.name,
+                "email": user.email,
+                "phone": user.phone,
+                "city": user.city
             }
-        return {"user": user_data, "profile": profile_data, "wallet_balance": wallet_balance}
+            profile_data = None
+            if user_profile:
+                profile_data = {
+                    "user_id": user_profile.user_id,
+                    "full_name": user_profile.full_name,
+                    "phone": user_profile.phone,
+                    "city": user_profile.city,
+                    "persona_id": user_profile.persona_id,
+                    "created_at": user_profile.created_at,
+                    "updated_at": user_profile.updated_at
+                }
+            snapshot = UserWithProfile(user=user_data, profile=profile_data, wallet_balance=wallet_balance or 0)
+            body = snapshot.model_dump_json().encode()
+            cache_snapshot(current_user.id, body, generation)
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user profile: {str(e)}")
 
 @router.put("/me/profile")
-def update_user_profile(
+async def update_user_profile(
     profile_data: UserProfileUpdate,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
 ):
     try:
-        user_profile = session.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+        user_profile = (await session.execute(select(UserProfile).where(UserProfile.user_id == current_user.id))).scalars().first()
         if not user_profile:
             raise HTTPException(status_code=404, detail="User profile not found")
+        user_updates = {}
         if profile_data.full_name is not None:
             user_profile.full_name = profile_data.full_name
         if profile_data.phone is not None:
             user_profile.phone = profile_data.phone
             # mirror to users table as before
-            current_user.phone = profile_data.phone
+            user_updates["phone"] = profile_data.phone
         if profile_data.city is not None:
             user_profile.city = profile_data.city
             # mirror to users table as before
-            current_user.city = profile_data.city
+            user_updates["city"] = profile_data.city
+        if user_updates:
+            # current_user may be a shared cached row, so update the table directly
+            await session.execute(update(User).where(User.id == current_user.id).values(**user_updates))
         activity = Activity(user_id=current_user.id, kind="profile_update", ref_id=f"profile_update_{current_user.id}")
         session.add(activity)
-        session.commit()
+        await notify_user_changed(session, current_user.id)
+        await session.commit()
+        invalidate_user(current_user.id)
         return {"message": "Profile updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update profile: {str(e)}")
 
 
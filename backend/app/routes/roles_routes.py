@@ -1,6 +1,7 @@
-from fastapi import  Depends, HTTPException, APIRouter
+from fastapi import  Depends, HTTPException, APIRouter, Query, Request
 from typing import Annotated, List
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.user_model import User
 from app.models.role_model import Role
 from app.models.user_role_selection_model import UserRoleSelection
@@ -8,59 +9,70 @@ from app.schemas import (
     RoleResponse, RoleSelectionCreate, UserRoleSelectionResponse
 )
 from app.dependencies import SessionDep, get_curr_user
+from app.catalog_cache import CatalogCache
+from app.services.persona_engine import persona_inputs_changed
+from app.user_cache import invalidate_user, notify_user_changed
 
 router = APIRouter()
 
+async def _load_active_roles(session):
+    roles = (await session.execute(select(Role).where(Role.is_active == True).order_by(Role.id))).scalars().all()
+    return [
+        {
+            "id": role.id,
+            "title": role.title,
+            "description": role.description,
+            "tags": role.tags or [],
+            "is_active": role.is_active
+        }
+        for role in roles
+    ]
+
+# Invalidated by the roles table's NOTIFY trigger (see app/catalog_cache.py)
+roles_catalog = CatalogCache("roles", _load_active_roles)
+
 @router.get("/roles", response_model=List[RoleResponse])
-def get_roles(session: SessionDep):
+async def get_roles(request: Request):
     try:
-        roles = session.query(Role).filter(Role.is_active == True).all()
-        return [
-            {
-                "id": role.id,
-                "title": role.title,
-                "description": role.description,
-                "tags": role.tags or [],
-                "is_active": role.is_active
-            }
-            for role in roles
-        ]
+        return await roles_catalog.response(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get roles: {str(e)}")
 
 @router.post("/my/roles")
-def add_role_selection(
+async def add_role_selection(
     role_data: RoleSelectionCreate,
     current_user: Annotated[User, Depends(get_curr_user)],
     session: SessionDep
     ):
     try:
-        added_roles = []
-        skipped_roles = []
-        
-        for role_id in role_data.role_ids:
-            # Check if role exists and is active
-            role = session.query(Role).filter(Role.id == role_id, Role.is_active == True).first()
-            if not role:
-                raise HTTPException(status_code=404, detail=f"Role with ID {role_id} not found or inactive")
-            
-            # Check if already selected
-            existing_selection = session.query(UserRoleSelection).filter(
-                UserRoleSelection.user_id == current_user.id,
-                UserRoleSelection.role_id == role_id
-            ).first()
-            
-            if existing_selection:
-                skipped_roles.append(role_id)
-                continue  # Skip if already selected
-            
-            # Add new selection
-            role_selection = UserRoleSelection(user_id=current_user.id, role_id=role_id)
-            session.add(role_selection)
-            added_roles.append(role_id)
-        
-        session.commit()
-        
+        # Keep the caller's order, drop repeated ids
+        role_ids = list(dict.fromkeys(role_data.role_ids))
+        if not role_ids:
+            return {"message": "Successfully added 0 role(s)", "added_role_ids": [], "skipped_role_ids": []}
+
+        # Validate every id with one IN query
+        active_ids = set((await session.execute(
+            select(Role.id).where(Role.id.in_(role_ids), Role.is_active == True)
+        )).scalars().all())
+        missing = [role_id for role_id in role_ids if role_id not in active_ids]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Role with ID {missing[0]} not found or inactive")
+
+        # One bulk insert; rows already selected are skipped by the unique constraint
+        inserted = set((await session.execute(
+            pg_insert(UserRoleSelection)
+            .values([{"user_id": current_user.id, "role_id": role_id} for role_id in role_ids])
+            .on_conflict_do_nothing(index_elements=["user_id", "role_id"])
+            .returning(UserRoleSelection.role_id)
+        )).scalars().all())
+        await notify_user_changed(session, current_user.id)
+        await session.commit()
+        invalidate_user(current_user.id)
+        persona_inputs_changed(current_user.id)
+
+        added_roles = [role_id for role_id in role_ids if role_id in inserted]
+        skipped_roles = [role_id for role_id in role_ids if role_id not in inserted]
+
         response_message = f"Successfully added {len(added_roles)} role(s)"
         if skipped_roles:
             response_message += f", skipped {len(skipped_roles)} already selected role(s)"
@@ -74,18 +86,44 @@ def add_role_selection(
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to add role selections: {str(e)}")
 
+@router.delete("/my/roles")
+async def remove_role_selections(
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep,
+    role_ids: List[int] = Query(..., description="Role ids to deselect, e.g. ?role_ids=1&role_ids=2")
+    ):
+    try:
+        role_ids = list(dict.fromkeys(role_ids))
+        removed = set((await session.execute(
+            delete(UserRoleSelection)
+            .where(UserRoleSelection.user_id == current_user.id, UserRoleSelection.role_id.in_(role_ids))
+            .returning(UserRoleSelection.role_id)
+        )).scalars().all())
+        await notify_user_changed(session, current_user.id)
+        await session.commit()
+        invalidate_user(current_user.id)
+        persona_inputs_changed(current_user.id)
+        return {
+            "message": f"Successfully removed {len(removed)} role(s)",
+            "removed_role_ids": [role_id for role_id in role_ids if role_id in removed],
+            "not_selected_role_ids": [role_id for role_id in role_ids if role_id not in removed]
+        }
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to remove role selections: {str(e)}")
+
 @router.get("/my/roles", response_model=List[UserRoleSelectionResponse])
-def get_user_roles(current_user: Annotated[User, Depends(get_curr_user)], session: SessionDep):
+async def get_user_roles(current_user: Annotated[User, Depends(get_curr_user)], session: SessionDep):
     try:
-        role_selections = session.query(UserRoleSelection, Role).join(
+        role_selections = (await session.execute(select(UserRoleSelection, Role).join(
             Role, UserRoleSelection.role_id == Role.id
-        ).filter(
+        ).where(
             UserRoleSelection.user_id == current_user.id,
             Role.is_active == True
-        ).all()
+        ))).all()
         return [
             {
                 "id": selection.id,
@@ -0,0 +1,114 @@
+from fastapi import Depends, HTTPException, APIRouter, Response
+from typing import Annotated
+from sqlalchemy import select
+from app.models.user_model import User
+from app.models.cv_model import CV
+from app.models.screening_model import Screening
+from app.models.user_role_selection_model import UserRoleSelection
+from app.schemas import ScreeningRunRequest, ScreeningResponse
+from app.dependencies import SessionDep, get_curr_user
+from app.process_pool import PoolSaturated
+from app.routes.roles_routes import roles_catalog
+from app.services.cv_screening import DOCX_MIME_TYPE, PDF_MIME_TYPE
+from app.services.screening_queue import SCREENING_CLIENT_POLL_SECONDS, enqueue_screening
+from app.services.wallet_ledger import InsufficientCredits
+from app.user_cache import invalidate_user
+
+router = APIRouter()
+
+_RESPONSE_COLUMNS = (
+    Screening.id, Screening.user_id, Screening.cv_id, Screening.role_id, Screening.status,
+    Screening.credits_used, Screening.score, Screening.result, Screening.failure_reason,
+    Screening.completed_at, Screening.created_at,
+)
+
+
+def _screening_response(screening) -> dict:
+    return {
+        "id": screening.id,
+        "user_id": screening.user_id,
+        "cv_id": screening.cv_id,
+        "role_id": screening.role_id,
+        "status": screening.status,
+        "credits_used": screening.credits_used,
+        "score": screening.score,
+        "result": screening.result,
+        # While pending this holds the last transient error, which is retried
+        "failure_reason": screening.failure_reason if screening.status == "failed" else None,
+        "completed_at": screening.completed_at,
+        "created_at": screening.created_at,
+    }
+
+
+@router.post("/run", response_model=ScreeningResponse, status_code=202)
+async def run_screening(
+    run_data: ScreeningRunRequest,
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep,
+    response: Response
+):
+    """
+    Queue a screening of one of the user's CVs against a role for 1 credit,
+    refunded if the screening fails. Poll GET /{screening_id} for the result.
+    """
+    try:
+        cv = (await session.execute(select(CV.id, CV.role_id, CV.mime_type).where(
+            CV.id == run_data.cv_id,
+            CV.user_id == current_user.id
+        ))).first()
+        if not cv:
+            raise HTTPException(status_code=404, detail="CV not found")
+        if cv.mime_type not in (PDF_MIME_TYPE, DOCX_MIME_TYPE):
+            raise HTTPException(status_code=400, detail="Only PDF and DOCX CVs can be screened")
+
+        role_id = run_data.role_id or cv.role_id
+        if role_id is None:
+            role_id = (await session.execute(
+                select(UserRoleSelection.role_id)
+                .where(UserRoleSelection.user_id == current_user.id)
+                .order_by(UserRoleSelection.created_at.desc())
+                .limit(1)
+            )).scalar()
+        if role_id is None:
+            raise HTTPException(status_code=400, detail="Choose a role to screen this CV against")
+        # Active roles come from the cached catalog; no query
+        if not any(r["id"] == role_id for r in (await roles_catalog.get()).data):
+            raise HTTPException(status_code=404, detail="Role not found or inactive")
+
+        try:
+            screening = await enqueue_screening(session, current_user.id, cv.id, role_id)
+        except InsufficientCredits:
+            await session.rollback()
+            raise HTTPException(status_code=402, detail="Insufficient credits. You need at least 1 credit to start screening.")
+        await session.commit()
+    except (HTTPException, PoolSaturated):
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to start screening: {str(e)}")
+
+    invalidate_user(current_user.id)
+    response.headers["Retry-After"] = str(SCREENING_CLIENT_POLL_SECONDS)
+    return _screening_response(screening)
+
+
+@router.get("/{screening_id}", response_model=ScreeningResponse)
+async def get_screening(
+    screening_id: int,
+    current_user: Annotated[User, Depends(get_curr_user)],
+    session: SessionDep,
+    response: Response
+):
+    """
+    Screening status and, once done, its score. Meant for polling: one
+    primary key lookup, and Retry-After says when to ask again while pending.
+    """
+    screening = (await session.execute(select(*_RESPONSE_COLUMNS).where(
+        Screening.id == screening_id,
+        Screening.user_id == current_user.id
+    ))).first()
+    if not screening:
+        raise HTTPException(status_code=404, detail="Screening not found")
+    if screening.status == "pending":
+        response.headers["Retry-After"] = str(SCREENING_CLIENT_POLL_SECONDS)
+    return _screening_response(screening)
@@ -21,6 +21,10 @@ from .cv_schemas import (
     CVPresignRequest,
     CVPresignResponse,
     CVConfirmRequest,
+    CVMultipartStartRequest,
+    CVMultipartStartResponse,
+    CVMultipartCompleteRequest,
+    CVMultipartAbortRequest,
     CVResponse,
     CVListResponse,
     CVDownloadResponse
@@ -36,6 +40,26 @@ from .payment_schemas import (
     TransactionListResponse
 )
 
+from .interview_schemas import (
+    InterviewStartRequest,
+    InterviewAnswerRequest,
+    InterviewTurnResponse,
+    InterviewResponse,
+    InterviewStateResponse
+)
+
+from .screening_schemas import (
+    ScreeningRunRequest,
+    ScreeningResult,
+    ScreeningResponse
+)
+
+from .persona_schemas import (
+    PersonaStats,
+    PersonaSummary,
+    PersonaResponse
+)
+
 __all__ = [
     # User schemas
     "CreateUser",
@@ -58,6 +82,10 @@ __all__ = [
     "CVPresignRequest",
     "CVPresignResponse",
     "CVConfirmRequest",
+    "CVMultipartStartRequest",
+    "CVMultipartStartResponse",
+    "CVMultipartCompleteRequest",
+    "CVMultipartAbortRequest",
     "CVResponse",
     "CVListResponse",
     "CVDownloadResponse",
@@ -69,5 +97,22 @@ __all__ = [
     "PaymentOrderResponse",
     "PaymentWebhookRequest",
     "CreditPackResponse",
-    "TransactionListResponse"
+    "TransactionListResponse",
+
+    # Interview schemas
+    "InterviewStartRequest",
+    "InterviewAnswerRequest",
+    "InterviewTurnResponse",
+    "InterviewResponse",
+    "InterviewStateResponse",
+
+    # Screening schemas
+    "ScreeningRunRequest",
+    "ScreeningResult",
+    "ScreeningResponse",
+
+    # Persona schemas
+    "PersonaStats",
+    "PersonaSummary",
+    "PersonaResponse"
 ]
@@ -10,13 +10,47 @@ class CVPresignRequest(BaseModel):
 
 class CVPresignResponse(BaseModel):
     url: str
-    fields: dict
+    fields: dict  # POST these form fields, then the file, to url
+    storage_filename: str
+    max_size_bytes: int
 
 class CVConfirmRequest(BaseModel):
     filename: str  # Original filename
-    storage_filename: str  # The filename generated during presign (from fields)
+    storage_filename: str  # The key generated during presign
     role_id: Optional[int] = None
+    size_bytes: Optional[int] = None  # Ignored; the stored object's size is used
+
+class CVMultipartStartRequest(BaseModel):
+    filename: str
+    mime_type: str
+    size_bytes: int
+    role_id: Optional[int] = None
+
+class CVUploadPart(BaseModel):
+    part_number: int
     size_bytes: int
+    url: str  # presigned PUT for exactly size_bytes
+
+class CVMultipartStartResponse(BaseModel):
+    storage_filename: str
+    upload_id: str
+    part_size: int
+    parts: List[CVUploadPart]
+
+class CVCompletedPart(BaseModel):
+    part_number: int
+    etag: str  # ETag response header of the part PUT
+
+class CVMultipartCompleteRequest(BaseModel):
+    filename: str
+    storage_filename: str
+    upload_id: str
+    parts: List[CVCompletedPart]
+    role_id: Optional[int] = None
+
+class CVMultipartAbortRequest(BaseModel):
+    storage_filename: str
+    upload_id: str
 
 class CVResponse(BaseModel):
     id: int
@@ -35,4 +69,5 @@ class CVDownloadResponse(BaseModel):
 
 class CVListResponse(BaseModel):
     cvs: List[CVResponse]
-    total: int
+    total: Optional[int] = None  # only with include_total=true or skip/limit
+    next_cursor: Optional[str] = None
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+# Interview schemas
+class InterviewStartRequest(BaseModel):
+    role_id: int
+    cv_id: Optional[int] = None
+
+class InterviewAnswerRequest(BaseModel):
+    answer: str = Field(..., min_length=1, max_length=20000)
+
+class InterviewTurnResponse(BaseModel):
+    turn_index: int
+    question: str
+    answer: Optional[str] = None
+    feedback: Optional[str] = None
+    asked_at: datetime
+    answered_at: Optional[datetime] = None
+
+class InterviewResponse(BaseModel):
+    id: int
+    user_id: int
+    role_id: int
+    cv_id: Optional[int]
+    status: str  # pending|in_progress|done|failed
+    credits_used: int
+    failure_reason: Optional[str] = None
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    created_at: datetime
+
+class InterviewStateResponse(InterviewResponse):
+    current_question: Optional[str] = None  # set while waiting for an answer
+    turns: List[InterviewTurnResponse]
@@ -15,7 +15,7 @@ class TransactionResponse(BaseModel):
     type: str  # purchase, deduct, refund, adjust
     credits: int
     amount_inr: Optional[Decimal]
-    currency: str
+    currency: Optional[str]  # none for credit-only entries (deduct, refund)
     payment_gateway: Optional[str]
     external_ref: Optional[str]
     status: str
@@ -29,7 +29,7 @@ class PaymentOrderResponse(BaseModel):
     order_id: str
     amount: Decimal
     upi_link: str
-    qr_code: Optional[str]
+    qr_code: Optional[str]  # URL of the cacheable SVG QR image
 
 class PaymentWebhookRequest(BaseModel):
     order_id: str
@@ -49,7 +49,8 @@ class CreditPackResponse(BaseModel):
 # Transaction list response
 class TransactionListResponse(BaseModel):
     transactions: List[TransactionResponse]
-    total: int
+    total: Optional[int] = None  # only with include_total=true or skip/limit
+    next_cursor: Optional[str] = None
 
 
 
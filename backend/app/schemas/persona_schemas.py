@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+# Persona schemas
+class PersonaStats(BaseModel):
+    cvs: int
+    screenings: int
+    average_score: Optional[int] = None
+    best_score: Optional[int] = None
+    interviews: int
+    answered_questions: int
+
+class PersonaSummary(BaseModel):
+    professional_summary: str
+    strengths: List[str]
+    areas_for_improvement: List[str]
+    target_roles: List[str]
+    stats: PersonaStats
+
+class PersonaResponse(BaseModel):
+    id: int
+    user_id: int
+    summary: Optional[PersonaSummary] = None
+    skills: List[str]  # ranked by how many CVs and screenings back them
+    updated_at: datetime
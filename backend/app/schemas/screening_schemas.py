@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+# Screening schemas
+class ScreeningRunRequest(BaseModel):
+    cv_id: int
+    role_id: Optional[int] = None  # defaults to the CV's role, then the user's latest selected role
+
+class ScreeningResult(BaseModel):
+    matched_skills: List[str]
+    missing_skills: List[str]
+    matched_keywords: List[str]
+    sections: List[str]
+    word_count: int
+    truncated: bool
+    summary: str
+
+class ScreeningResponse(BaseModel):
+    id: int
+    user_id: int
+    cv_id: Optional[int]  # None once the CV is deleted
+    role_id: Optional[int]
+    status: str  # pending|done|failed
+    credits_used: int
+    score: Optional[int] = None
+    result: Optional[ScreeningResult] = None
+    failure_reason: Optional[str] = None
+    completed_at: Optional[datetime] = None
+    created_at: datetime
@@ -0,0 +1,102 @@
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import storage
+from app.models.cv_blob_model import CVBlob
+from app.models.cv_model import CV
+from app.services.storage_reaper import enqueue_orphan
+
+# Content-addressed CV storage. An upload is fingerprinted (SHA-256) and the
+# first object with that content becomes the shared copy; later identical
+# uploads point their CV rows at it and their own object is handed to the
+# storage reaper. All functions here run in the caller's transaction.
+
+
+async def attach_blob(session: AsyncSession, sha256: str, key: str, size_bytes: int, mime_type: str) -> str:
+    """
+    Take a reference to the blob with this content, creating it from the
+    object at key if it is new. Returns the key CV rows should point at;
+    when that is not key, key is a duplicate and is queued for deletion.
+    """
+    canonical = (await session.execute(
+        pg_insert(CVBlob)
+        .values(sha256=sha256, storage_key=key, size_bytes=size_bytes, mime_type=mime_type, ref_count=1)
+        .on_conflict_do_update(index_elements=[CVBlob.sha256], set_={"ref_count": CVBlob.ref_count + 1})
+        .returning(CVBlob.storage_key)
+    )).scalar_one()
+    if canonical != key:
+        await enqueue_orphan(session, key)
+    return canonical
+
+
+async def release_blob(session: AsyncSession, sha256: str) -> None:
+    """
+    Drop a CV row's reference (after the row is deleted and flushed). The
+    last reference removes the blob and queues its object for deletion.
+    """
+    blob = (await session.execute(
+        update(CVBlob)
+        .where(CVBlob.sha256 == sha256)
+        .values(ref_count=CVBlob.ref_count - 1)
+        .returning(CVBlob.ref_count, CVBlob.storage_key)
+    )).first()
+    if blob is not None and blob.ref_count <= 0:
+        # The row stays locked until commit, so a concurrent attach waits
+        # and then creates a fresh blob from its own object
+        await session.execute(delete(CVBlob).where(CVBlob.sha256 == sha256))
+        await enqueue_orphan(session, blob.storage_key)
+
+
+async def fingerprint_cv(session: AsyncSession, cv_id: int, sha256: str) -> None:
+    """
+    Attach a CV uploaded before fingerprinting (hashed later by a screening
+    worker) to its blob; no-op if it has been fingerprinted meanwhile.
+    """
+    # Locked so two workers fingerprinting the same CV take one reference
+    cv = (await session.execute(
+        select(CV.storage_url, CV.size_bytes, CV.mime_type)
+        .where(CV.id == cv_id, CV.content_sha256.is_(None))
+        .with_for_update()
+    )).first()
+    if cv is None:
+        return
+    key = storage.key_from_url(cv.storage_url)
+    canonical = await attach_blob(session, sha256, key, cv.size_bytes, cv.mime_type)
+    await session.execute(
+        update(CV)
+        .where(CV.id == cv_id)
+        .values(content_sha256=sha256, storage_url=storage.object_url(canonical))
+    )
+
+
+async def store_extraction(session: AsyncSession, sha256: str, text: str, features: dict) -> None:
+    """Cache a blob's extracted text; the first extraction wins"""
+    await session.execute(
+        update(CVBlob)
+        .where(CVBlob.sha256 == sha256, CVBlob.extracted_at.is_(None))
+        .values(text=text, features=features, extracted_at=func.now())
+    )
+
+
+async def blob_stats(session: AsyncSession) -> dict:
+    """Deduplication savings for the internal endpoint"""
+    row = (await session.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(CVBlob.ref_count), 0),
+            func.coalesce(func.sum(CVBlob.size_bytes), 0),
+            func.coalesce(func.sum(CVBlob.size_bytes * CVBlob.ref_count), 0),
+            func.count().filter(CVBlob.extracted_at.is_not(None)),
+        )
+    )).one()
+    unfingerprinted = (await session.execute(
+        select(func.count()).select_from(CV).where(CV.content_sha256.is_(None))
+    )).scalar_one()
+    return {
+        "blobs": row[0],
+        "references": row[1],
+        "stored_bytes": row[2],
+        "referenced_bytes": row[3],
+        "extracted": row[4],
+        "unfingerprinted_cvs": unfingerprinted,
+    }
@@ -0,0 +1,291 @@
+import hashlib
+import os
+import re
+import tempfile
+import zipfile
+from collections.abc import Iterable, Iterator
+from xml.etree import ElementTree
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+from app import storage
+
+# CV screening work that runs in the screening worker processes: stream the
+# file from storage, pull its text out page by page (PDF) or paragraph by
+# paragraph (DOCX), and score it against the role. Nothing here touches the
+# database; screening_queue claims the work and records the results, and
+# caches extracted text by content hash so a document is only parsed once.
+
+# PDF and DOCX both keep their index at the end of the file, so the download
+# is spooled: in memory up to this size, on disk beyond it
+SCREENING_SPOOL_BYTES = int(os.getenv("SCREENING_SPOOL_BYTES", 1024 * 1024))
+# Text beyond this is not read; long CVs are scored on their start
+SCREENING_MAX_TEXT_CHARS = int(os.getenv("SCREENING_MAX_TEXT_CHARS", 200_000))
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+_SECTIONS = {
+    "experience": re.compile(r"\b(experience|employment|work history)\b"),
+    "education": re.compile(r"\b(education|degree|university|college)\b"),
+    "skills": re.compile(r"\b(skills|technologies|tools)\b"),
+    "projects": re.compile(r"\b(projects?|portfolio)\b"),
+}
+_STOPWORDS = frozenset("""
+    a about above after all also an and any are as at be been being both but by can could do does
+    for from has have having he her his how i if in into is it its more most of on or other our out
+    over per she should so some such than that the their them then there these they this those to
+    under up us very was we were what when where which while who will with within would you your
+    role work working team teams ability strong good great experience years including etc using
+""".split())
+
+
+class ScreeningError(Exception):
+    """The CV cannot be screened (the screening fails and is refunded)"""
+
+
+def _words(text: str) -> list[str]:
+    return [word.rstrip(".") for word in _WORD_RE.findall(text.lower())]
+
+
+class RoleIndex:
+    """What a CV is scored against; built once per role in each batch"""
+
+    def __init__(self, role: dict):
+        self.title = role["title"]
+        # Tags are the role's skills; multi-word tags are matched as phrases
+        self.skills = {tuple(_words(tag)): tag for tag in role.get("tags") or [] if _words(tag)}
+        self.longest_skill = max((len(phrase) for phrase in self.skills), default=1)
+        skill_words = {word for phrase in self.skills for word in phrase}
+        text = f"{role['title']} {role.get('description') or ''}"
+        self.keywords = {
+            word for word in _words(text)
+            if len(word) > 2 and word not in _STOPWORDS and word not in skill_words and not word.isdigit()
+        }
+
+    def find_skills(self, words: list[str]) -> set:
+        """The skill phrases that occur in a word sequence"""
+        found = set()
+        for size in range(1, self.longest_skill + 1):
+            for start in range(len(words) - size + 1):
+                phrase = tuple(words[start:start + size])
+                if phrase in self.skills:
+                    found.add(phrase)
+        return found
+
+
+def iter_pdf_text(file) -> Iterator[str]:
+    try:
+        reader = PdfReader(file)
+        if reader.is_encrypted:
+            raise ScreeningError("Password-protected PDFs cannot be screened")
+        for page in reader.pages:
+            yield page.extract_text() or ""
+    except PyPdfError as e:
+        raise ScreeningError(f"Not a readable PDF: {e}")
+
+
+def iter_docx_text(file) -> Iterator[str]:
+    try:
+        archive = zipfile.ZipFile(file)
+        document = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError):
+        raise ScreeningError("Not a readable DOCX file")
+    with archive, document:
+        parts = []
+        try:
+            # Parsed as a stream; each finished paragraph is yielded and dropped
+            for _, element in ElementTree.iterparse(document):
+                if element.tag == f"{_W}t":
+                    parts.append(element.text or "")
+                elif element.tag in (f"{_W}tab", f"{_W}br"):
+                    parts.append(" ")
+                elif element.tag == f"{_W}p":
+                    yield "".join(parts)
+                    parts = []
+                    element.clear()
+        except ElementTree.ParseError as e:
+            raise ScreeningError(f"Not a readable DOCX file: {e}")
+
+
+def iter_text(file, mime_type: str) -> Iterator[str]:
+    if mime_type == PDF_MIME_TYPE:
+        return iter_pdf_text(file)
+    if mime_type == DOCX_MIME_TYPE:
+        return iter_docx_text(file)
+    raise ScreeningError("Only PDF and DOCX files can be screened")
+
+
+def read_text(chunks: Iterable[str]) -> tuple[str, bool]:
+    """Join text chunks, reading no further once SCREENING_MAX_TEXT_CHARS are in"""
+    parts = []
+    chars = 0
+    for chunk in chunks:
+        if chars + len(chunk) > SCREENING_MAX_TEXT_CHARS:
+            parts.append(chunk[:SCREENING_MAX_TEXT_CHARS - chars])
+            return "\n".join(parts), True
+        parts.append(chunk)
+        chars += len(chunk)
+    return "\n".join(parts), False
+
+
+def text_features(text: str, truncated: bool) -> dict:
+    """What scoring needs besides the text itself; the same for every role"""
+    lowered = text.lower()
+    return {
+        "sections": sorted(name for name, pattern in _SECTIONS.items() if pattern.search(lowered)),
+        "word_count": len(_words(lowered)),
+        "truncated": truncated,
+    }
+
+
+def score_cv(text: str, features: dict, index: RoleIndex) -> dict:
+    """
+    Score extracted text against a role: 70% relevance (tags, then title and
+    description keywords), 20% standard sections present, 10% length.
+    """
+    word_count = features["word_count"]
+    if word_count == 0:
+        raise ScreeningError("No text found in the CV; scanned documents are not supported")
+    words = _words(text)
+    found_keywords = index.keywords.intersection(words)
+    found_skills = index.find_skills(words)
+
+    skill_ratio = len(found_skills) / len(index.skills) if index.skills else None
+    keyword_ratio = len(found_keywords) / len(index.keywords) if index.keywords else None
+    if skill_ratio is not None and keyword_ratio is not None:
+        relevance = 0.7 * skill_ratio + 0.3 * keyword_ratio
+    else:
+        relevance = skill_ratio if skill_ratio is not None else (keyword_ratio or 0.0)
+    structure = len(features["sections"]) / len(_SECTIONS)
+    if word_count < 150:
+        length = word_count / 150
+    elif word_count > 2000:
+        length = max(0.5, 2000 / word_count)
+    else:
+        length = 1.0
+    score = round(100 * (0.7 * relevance + 0.2 * structure + 0.1 * length))
+
+    matched = sorted(index.skills[phrase] for phrase in found_skills)
+    missing = sorted(tag for phrase, tag in index.skills.items() if phrase not in found_skills)
+    summary = f"Matches {len(matched)} of {len(index.skills)} listed skills for {index.title}"
+    if missing:
+        summary += f"; missing {', '.join(missing[:5])}"
+    return {
+        "score": score,
+        "matched_skills": matched,
+        "missing_skills": missing,
+        "matched_keywords": sorted(found_keywords)[:25],
+        "sections": features["sections"],
+        "word_count": word_count,
+        "truncated": features["truncated"],
+        "summary": summary + ".",
+    }
+
+
+def extract_cv(key: str, mime_type: str) -> dict:
+    """
+    Download and parse a CV: {"sha256", "text", "features"}. The content hash
+    is computed from the same stream, so unfingerprinted CVs get one too.
+    """
+    if mime_type not in (PDF_MIME_TYPE, DOCX_MIME_TYPE):
+        raise ScreeningError("Only PDF and DOCX files can be screened")
+    digest = hashlib.sha256()
+    with tempfile.SpooledTemporaryFile(max_size=SCREENING_SPOOL_BYTES) as spool:
+        try:
+            size = storage.copy_object_to(key, spool, hasher=digest)
+        except ValueError as e:
+            raise ScreeningError(str(e))
+        if size is None:
+            raise ScreeningError("The CV file is missing from storage")
+        spool.seek(0)
+        try:
+            text, truncated = read_text(iter_text(spool, mime_type))
+        except ScreeningError:
+            raise
+        except Exception as e:
+            # Parsers fail in many ways on malformed files; retrying will not help
+            raise ScreeningError(f"Could not read the CV: {type(e).__name__}")
+    return {"sha256": digest.hexdigest(), "text": text, "features": text_features(text, truncated)}
+
+
+def screen_batch(jobs: list[dict]) -> list[dict]:
+    """
+    Runs in a screening worker process: screen a micro-batch of CVs in turn.
+    The storage client and its connections, the parsers and each role's
+    index are set up once and shared by the whole batch, and a document
+    screened for several roles is parsed once.
+
+    Each job is {"id", "key", "mime_type", "sha256", "text", "features",
+    "role_id", "role"}; a job with cached text is scored without touching
+    storage. Each result is {"id", "score", "result"}, {"id", "error"} for a
+    CV that cannot be screened, or {"id", "retry"} for a failure worth
+    another attempt, plus "extracted" when the CV was downloaded and parsed.
+    """
+    indexes: dict = {}
+    extracted: dict = {}
+    results = []
+    for job in jobs:
+        outcome = {"id": job["id"]}
+        try:
+            index = indexes.get(job["role_id"])
+            if index is None:
+                index = indexes[job["role_id"]] = RoleIndex(job["role"])
+            if job.get("text") is not None:
+                text, features = job["text"], job["features"]
+            else:
+                document = extracted.get(job.get("sha256") or job["key"])
+                if document is None:
+                    document = extract_cv(job["key"], job["mime_type"])
+                    extracted[job.get("sha256") or job["key"]] = document
+                outcome["extracted"] = document
+                text, features = document["text"], document["features"]
+            result = score_cv(text, features, index)
+            outcome.update(score=result.pop("score"), result=result)
+        except ScreeningError as e:
+            outcome["error"] = str(e)
+        except Exception as e:
+            # Storage timeouts and the like
+            outcome["retry"] = f"{type(e).__name__}: {e}"
+        results.append(outcome)
+    return results
+
+
+def profile_cvs(jobs: list[dict], vocabulary: list[str]) -> list[dict]:
+    """
+    Runs in a screening worker process for the persona engine: which skills
+    from vocabulary (the role catalog's tags) each CV mentions.
+
+    Each job is {"cv_id", "key", "mime_type", "sha256", "text", "features"};
+    as in screen_batch, cached text is used when present and a document is
+    parsed at most once. Each result is {"cv_id", "skills", "sections",
+    "word_count"}, {"cv_id", "error"} for a CV that cannot be read, or
+    {"cv_id", "retry"}; plus "extracted" when the CV was parsed here.
+    """
+    index = RoleIndex({"title": "", "tags": vocabulary})
+    extracted: dict = {}
+    results = []
+    for job in jobs:
+        outcome = {"cv_id": job["cv_id"]}
+        try:
+            if job.get("text") is not None:
+                text, features = job["text"], job["features"]
+            else:
+                document = extracted.get(job.get("sha256") or job["key"])
+                if document is None:
+                    document = extract_cv(job["key"], job["mime_type"])
+                    extracted[job.get("sha256") or job["key"]] = document
+                outcome["extracted"] = document
+                text, features = document["text"], document["features"]
+            outcome.update(
+                skills=sorted(index.skills[phrase] for phrase in index.find_skills(_words(text))),
+                sections=features["sections"],
+                word_count=features["word_count"],
+            )
+        except ScreeningError as e:
+            outcome["error"] = str(e)
+        except Exception as e:
+            outcome["retry"] = f"{type(e).__name__}: {e}"
+        results.append(outcome)
+    return results
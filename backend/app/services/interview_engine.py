@@ -0,0 +1,624 @@
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.metrics import Histogram
+from app.models.interview_model import Interview
+from app.models.interview_turn_model import InterviewTurn
+from app.process_pool import PoolSaturated
+from app.services.persona_engine import persona_inputs_changed
+from app.services.question_model import InterviewContext, get_question_model
+from app.services.wallet_ledger import post_entry
+from app.user_cache import invalidate_user
+
+# Interviews run as lightweight asyncio sessions on the node that started
+# them: a session mostly waits for the candidate, so it holds no thread, no
+# worker and no database connection while idle. Only model calls are bounded.
+
+INTERVIEW_CREDITS = 5
+INTERVIEW_QUESTIONS = int(os.getenv("INTERVIEW_QUESTIONS", 5))
+# Live sessions per node; starts beyond this get a 503 before any credits move
+INTERVIEW_MAX_SESSIONS = int(os.getenv("INTERVIEW_MAX_SESSIONS", 5000))
+# Concurrent question model calls per node
+INTERVIEW_MODEL_CONCURRENCY = int(os.getenv("INTERVIEW_MODEL_CONCURRENCY", 64))
+INTERVIEW_ANSWER_TIMEOUT_SECONDS = float(os.getenv("INTERVIEW_ANSWER_TIMEOUT_SECONDS", 900))
+# Live sessions are heartbeated in one UPDATE per interval; sessions whose
+# node stopped heartbeating (crash, kill -9) are failed and refunded
+INTERVIEW_HEARTBEAT_SECONDS = float(os.getenv("INTERVIEW_HEARTBEAT_SECONDS", 30))
+INTERVIEW_STALE_SECONDS = float(os.getenv("INTERVIEW_STALE_SECONDS", 120))
+INTERVIEW_SWEEP_BATCH_SIZE = int(os.getenv("INTERVIEW_SWEEP_BATCH_SIZE", 500))
+# Answered turns are buffered and written in one INSERT per interval, or as
+# soon as this many are waiting, instead of one commit per turn
+INTERVIEW_TURN_FLUSH_SECONDS = float(os.getenv("INTERVIEW_TURN_FLUSH_SECONDS", 1))
+INTERVIEW_TURN_FLUSH_SIZE = int(os.getenv("INTERVIEW_TURN_FLUSH_SIZE", 500))
+
+# Streaming connections (WebSocket, or SSE as the fallback) per live session.
+# Each connection queues at most MAX_QUEUED_EVENTS; one that falls further
+# behind drops its queue and gets a single snapshot of the session instead.
+INTERVIEW_STREAM_MAX_PER_SESSION = int(os.getenv("INTERVIEW_STREAM_MAX_PER_SESSION", 4))
+INTERVIEW_STREAM_MAX_QUEUED_EVENTS = int(os.getenv("INTERVIEW_STREAM_MAX_QUEUED_EVENTS", 256))
+# Inbound WebSocket limits: bigger messages close the connection, faster
+# ones are read more slowly (the client is held back by TCP flow control)
+INTERVIEW_STREAM_MAX_MESSAGE_BYTES = int(os.getenv("INTERVIEW_STREAM_MAX_MESSAGE_BYTES", 16384))
+INTERVIEW_STREAM_MESSAGES_PER_SECOND = float(os.getenv("INTERVIEW_STREAM_MESSAGES_PER_SECOND", 20))
+# A connection whose send blocks this long is dropped
+INTERVIEW_STREAM_SEND_TIMEOUT_SECONDS = float(os.getenv("INTERVIEW_STREAM_SEND_TIMEOUT_SECONDS", 10))
+INTERVIEW_STREAM_KEEPALIVE_SECONDS = float(os.getenv("INTERVIEW_STREAM_KEEPALIVE_SECONDS", 15))
+
+MAX_ANSWER_CHARS = 20000
+
+LIVE_STATUSES = ("pending", "in_progress")
+
+
+class AnswerRejected(Exception):
+    """The session is not waiting for an answer"""
+
+
+class InterviewAbandoned(Exception):
+    """The candidate did not answer in time"""
+
+
+class TooManyStreams(Exception):
+    """The session already has its maximum number of streaming connections"""
+
+
+@dataclass
+class Turn:
+    index: int
+    question: str
+    asked_at: datetime
+    answer: str | None = None
+    answered_at: datetime | None = None
+    feedback: str | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "turn_index": self.index,
+            "question": self.question,
+            "answer": self.answer,
+            "feedback": self.feedback,
+            "asked_at": self.asked_at,
+            "answered_at": self.answered_at,
+        }
+
+
+class Subscription:
+    """
+    One streaming connection's queue of session events. Publishing never
+    waits for the connection: past max_queued events the queue is dropped
+    and the next read returns a snapshot of the session instead.
+    """
+
+    def __init__(self, session: "InterviewSession", max_queued: int, on_lag: Callable[[], None]):
+        self.session = session
+        self.max_queued = max_queued
+        self.on_lag = on_lag
+        self.events: deque[dict] = deque()
+        self.lagged = False
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict, force: bool = False) -> None:
+        if self.closed:
+            return
+        if not force and len(self.events) >= self.max_queued:
+            self.events.clear()
+            self.lagged = True
+            self.on_lag()
+        else:
+            self.events.append(event)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next(self) -> dict | None:
+        """The next event, a snapshot after falling behind, or None once closed"""
+        while True:
+            if self.lagged:
+                self.lagged = False
+                return self.session.snapshot()
+            if self.events:
+                return self.events.popleft()
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+
+class InterviewSession:
+    """In-memory state of one live interview; owned by the engine's task for it"""
+
+    def __init__(self, interview_id: int, user_id: int, context: InterviewContext):
+        self.interview_id = interview_id
+        self.user_id = user_id
+        self.context = context
+        self.status = "pending"
+        self.turns: list[Turn] = []
+        self.failure_reason: str | None = None
+        self.subscriptions: list[Subscription] = []
+        self._answer: asyncio.Future | None = None
+        self._draft: list[str] = []
+        self._draft_chars = 0
+        # Question or feedback text being streamed: (kind, turn index, pieces so far)
+        self._streaming: tuple[str, int, list[str]] | None = None
+
+    @property
+    def awaiting_answer(self) -> bool:
+        return self._answer is not None and not self._answer.done()
+
+    @property
+    def current_question(self) -> str | None:
+        if self.awaiting_answer:
+            return self.turns[-1].question
+        return None
+
+    def publish(self, event: dict, force: bool = False) -> None:
+        for subscription in self.subscriptions:
+            subscription.push(event, force)
+
+    def snapshot(self) -> dict:
+        """Everything a (re)connecting stream needs to catch up"""
+        streaming = None
+        if self._streaming is not None:
+            kind, turn_index, pieces = self._streaming
+            streaming = {"kind": kind, "turn_index": turn_index, "text": "".join(pieces)}
+        return {
+            "type": "snapshot",
+            "status": self.status,
+            "current_question": self.current_question,
+            "turns": [turn.as_dict() for turn in self.turns],
+            "streaming": streaming,
+            "failure_reason": self.failure_reason,
+        }
+
+    def begin_stream(self, kind: str, turn_index: int) -> None:
+        self._streaming = (kind, turn_index, [])
+
+    def stream_piece(self, text: str) -> None:
+        kind, turn_index, pieces = self._streaming
+        pieces.append(text)
+        self.publish({"type": f"{kind}_delta", "turn_index": turn_index, "text": text})
+
+    def end_stream(self) -> str:
+        text = "".join(self._streaming[2])
+        self._streaming = None
+        return text
+
+    def ask(self, turn: Turn) -> None:
+        """Put a question to the candidate; answers are accepted from here on"""
+        self.turns.append(turn)
+        self._answer = asyncio.get_running_loop().create_future()
+        self._draft = []
+        self._draft_chars = 0
+        self.publish({"type": "question", "turn_index": turn.index, "text": turn.question})
+
+    def _check_turn(self, turn_index) -> None:
+        if not self.awaiting_answer:
+            raise AnswerRejected("The interview is not waiting for an answer")
+        if turn_index != self.turns[-1].index:
+            raise AnswerRejected(f"Turn {self.turns[-1].index} is waiting for an answer, not turn {turn_index}")
+
+    def add_answer_chunk(self, turn_index: int, text: str) -> None:
+        """Append part of the answer to the current question"""
+        self._check_turn(turn_index)
+        if self._draft_chars + len(text) > MAX_ANSWER_CHARS:
+            raise AnswerRejected(f"Answers are limited to {MAX_ANSWER_CHARS} characters")
+        self._draft.append(text)
+        self._draft_chars += len(text)
+
+    def finish_answer(self, turn_index: int) -> int:
+        """Submit the chunks received for the current question as its answer"""
+        self._check_turn(turn_index)
+        answer = "".join(self._draft)
+        if not answer.strip():
+            raise AnswerRejected("The answer is empty")
+        return self.submit_answer(answer)
+
+    def submit_answer(self, answer: str) -> int:
+        """Hand the candidate's answer to the session; returns the turn it answers"""
+        if not self.awaiting_answer:
+            raise AnswerRejected("The interview is not waiting for an answer")
+        self._answer.set_result(answer)
+        self._draft = []
+        self._draft_chars = 0
+        turn_index = self.turns[-1].index
+        self.publish({"type": "answer_received", "turn_index": turn_index})
+        return turn_index
+
+    async def wait_for_answer(self, timeout: float) -> str:
+        try:
+            return await asyncio.wait_for(self._answer, timeout)
+        except asyncio.TimeoutError:
+            raise InterviewAbandoned(f"No answer within {int(timeout)} seconds")
+        finally:
+            self._answer = None
+
+    def end(self) -> None:
+        """Tell every stream how the session ended and close them"""
+        self.publish({"type": "end", "status": self.status, "failure_reason": self.failure_reason}, force=True)
+        for subscription in self.subscriptions:
+            subscription.close()
+        self.subscriptions = []
+
+
+async def reserve_interview(
+    session: AsyncSession, user_id: int, role_id: int, cv_id: int | None
+) -> Interview:
+    """
+    Create a pending interview and debit its credits in the same transaction.
+    Raises InsufficientCredits (and the caller rolls back). The caller commits.
+    """
+    interview = Interview(
+        user_id=user_id,
+        role_id=role_id,
+        cv_id=cv_id,
+        status="pending",
+        credits_used=INTERVIEW_CREDITS,
+        # Swept like any live session if this node dies before it starts
+        heartbeat_at=datetime.now(timezone.utc),
+    )
+    session.add(interview)
+    await session.flush()
+    await post_entry(
+        session,
+        user_id,
+        -INTERVIEW_CREDITS,
+        type="deduct",
+        idempotency_key=f"interview:{interview.id}:reserve",
+        external_ref=f"interview:{interview.id}",
+    )
+    return interview
+
+
+async def refund_interview(session: AsyncSession, interview_id: int, user_id: int, credits: int) -> bool:
+    """Return a failed interview's credits; at most once per interview. The caller commits."""
+    entry = await post_entry(
+        session,
+        user_id,
+        credits,
+        type="refund",
+        idempotency_key=f"interview:{interview_id}:refund",
+        external_ref=f"interview:{interview_id}",
+    )
+    return entry.applied
+
+
+class InterviewEngine:
+    """
+    Runs every live interview on this node as one asyncio task.
+
+    pending -> in_progress when the task picks the session up, then done, or
+    failed with an automatic refund. The outcome, the rest of the transcript
+    and the refund are written in one transaction, guarded on the row still
+    being live, so a session the stale sweeper already failed is never
+    refunded twice. Answered turns are written earlier, in batches shared by
+    all sessions (flush_turns).
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        model=None,
+        max_sessions: int = INTERVIEW_MAX_SESSIONS,
+        questions: int = INTERVIEW_QUESTIONS,
+        answer_timeout: float = INTERVIEW_ANSWER_TIMEOUT_SECONDS,
+        model_concurrency: int = INTERVIEW_MODEL_CONCURRENCY,
+    ):
+        self.session_factory = session_factory
+        self._model = model
+        self.max_sessions = max_sessions
+        self.questions = questions
+        self.answer_timeout = answer_timeout
+        self.live: dict[int, InterviewSession] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._admitted = 0
+        self._model_slots = asyncio.Semaphore(model_concurrency)
+        self.model_latency_ms = Histogram()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._turn_buffer: list[dict] = []
+        # Set when the buffer reaches INTERVIEW_TURN_FLUSH_SIZE; run_turn_writer waits on it
+        self.flush_requested = asyncio.Event()
+        self.turn_flushes = 0
+        self.turns_written = 0
+        self.streams_opened = 0
+        self.stream_resyncs = 0
+
+    @property
+    def model(self):
+        return self._model or get_question_model()
+
+    def admit(self) -> None:
+        """Hold a session slot while the start request reserves credits; PoolSaturated when full"""
+        if len(self.live) + self._admitted >= self.max_sessions:
+            self.rejected += 1
+            raise PoolSaturated("interviews")
+        self._admitted += 1
+
+    def release(self) -> None:
+        """Give back an admitted slot that was not started"""
+        self._admitted -= 1
+
+    def start(self, interview_id: int, user_id: int, context: InterviewContext) -> InterviewSession:
+        """Start an admitted, committed interview"""
+        self._admitted -= 1
+        session = InterviewSession(interview_id, user_id, context)
+        self.live[interview_id] = session
+        self._tasks[interview_id] = asyncio.create_task(self._run(session))
+        self.started += 1
+        return session
+
+    def get(self, interview_id: int) -> InterviewSession | None:
+        return self.live.get(interview_id)
+
+    def subscribe(self, session: InterviewSession) -> Subscription:
+        """Open a stream of the session's events; the first one is a snapshot"""
+        if len(session.subscriptions) >= INTERVIEW_STREAM_MAX_PER_SESSION:
+            raise TooManyStreams(f"At most {INTERVIEW_STREAM_MAX_PER_SESSION} connections per interview")
+        subscription = Subscription(session, INTERVIEW_STREAM_MAX_QUEUED_EVENTS, self._count_resync)
+        subscription.push(session.snapshot())
+        session.subscriptions.append(subscription)
+        self.streams_opened += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        if subscription in subscription.session.subscriptions:
+            subscription.session.subscriptions.remove(subscription)
+
+    def _count_resync(self) -> None:
+        self.stream_resyncs += 1
+
+    async def _stream_model(self, session: InterviewSession, kind: str, turn_index: int, pieces) -> str:
+        """Run one model call, forwarding its text to the session's streams as it arrives"""
+        async with self._model_slots:
+            start = time.perf_counter()
+            session.begin_stream(kind, turn_index)
+            try:
+                async for piece in pieces:
+                    session.stream_piece(piece)
+            finally:
+                self.model_latency_ms.observe((time.perf_counter() - start) * 1000)
+            return session.end_stream()
+
+    async def _run(self, session: InterviewSession) -> None:
+        try:
+            await self._mark_in_progress(session)
+            session.publish({"type": "status", "status": session.status})
+            for index in range(self.questions):
+                question = await self._stream_model(session, "question", index, self.model.stream_question(session.context))
+                turn = Turn(index=index, question=question, asked_at=datetime.now(timezone.utc))
+                session.ask(turn)
+                turn.answer = await session.wait_for_answer(self.answer_timeout)
+                turn.answered_at = datetime.now(timezone.utc)
+                turn.feedback = await self._stream_model(
+                    session, "feedback", index, self.model.stream_feedback(session.context, question, turn.answer)
+                )
+                session.publish({"type": "feedback", "turn_index": index, "text": turn.feedback})
+                session.context.history.append((question, turn.answer))
+                self._buffer_turn(session, turn)
+            await self._finish(session, "done")
+        except asyncio.CancelledError:
+            await self._finish(session, "failed", session.failure_reason or "Interrupted by server shutdown")
+            raise
+        except Exception as e:
+            await self._finish(session, "failed", f"{type(e).__name__}: {e}")
+        finally:
+            self.live.pop(session.interview_id, None)
+            self._tasks.pop(session.interview_id, None)
+            session.end()
+
+    def _buffer_turn(self, session: InterviewSession, turn: Turn) -> None:
+        self._turn_buffer.append({"interview_id": session.interview_id, **turn.as_dict()})
+        if len(self._turn_buffer) >= INTERVIEW_TURN_FLUSH_SIZE:
+            self.flush_requested.set()
+
+    async def flush_turns(self) -> int:
+        """Write every buffered turn in one INSERT; returns how many"""
+        rows, self._turn_buffer = self._turn_buffer, []
+        if not rows:
+            return 0
+        try:
+            async with self.session_factory() as db:
+                # A finished session may have written the same turns itself
+                await db.execute(insert(InterviewTurn).on_conflict_do_nothing(), rows)
+                await db.commit()
+        except BaseException:
+            # Kept for the next flush; the session's own end writes them at the latest
+            self._turn_buffer[:0] = rows
+            raise
+        self.turn_flushes += 1
+        self.turns_written += len(rows)
+        return len(rows)
+
+    async def _mark_in_progress(self, session: InterviewSession) -> None:
+        async with self.session_factory() as db:
+            started = (await db.execute(
+                update(Interview)
+                .where(Interview.id == session.interview_id, Interview.status == "pending")
+                .values(status="in_progress", started_at=func.now(), heartbeat_at=func.now())
+                .returning(Interview.id)
+            )).first()
+            await db.commit()
+        if started is None:
+            raise RuntimeError("Interview is no longer pending")
+        session.status = "in_progress"
+
+    async def _finish(self, session: InterviewSession, status: str, reason: str | None = None) -> None:
+        session.status = status
+        session.failure_reason = reason
+        if status == "done":
+            self.completed += 1
+        else:
+            self.failed += 1
+        refunded = False
+        try:
+            async with self.session_factory() as db:
+                ended = (await db.execute(
+                    update(Interview)
+                    .where(Interview.id == session.interview_id, Interview.status.in_(LIVE_STATUSES))
+                    .values(status=status, ended_at=func.now(), failure_reason=reason)
+                    .returning(Interview.credits_used)
+                )).first()
+                if ended is None:
+                    # Already failed (and refunded) by the stale sweeper
+                    return
+                if session.turns:
+                    # Turns already flushed are skipped
+                    await db.execute(
+                        insert(InterviewTurn).on_conflict_do_nothing(),
+                        [{"interview_id": session.interview_id, **turn.as_dict()} for turn in session.turns],
+                    )
+                if status == "failed":
+                    refunded = await refund_interview(db, session.interview_id, session.user_id, ended.credits_used)
+                await db.commit()
+        except Exception as e:
+            # The row stays live; the stale sweeper fails and refunds it later
+            print(f"Could not record the end of interview {session.interview_id}: {e}")
+            return
+        self._turn_buffer = [row for row in self._turn_buffer if row["interview_id"] != session.interview_id]
+        if refunded:
+            invalidate_user(session.user_id)
+        if status == "done":
+            persona_inputs_changed(session.user_id)
+
+    async def heartbeat(self) -> None:
+        """
+        Touch every live session in one statement. Sessions the sweeper has
+        already failed (their heartbeat was late) are stopped here.
+        """
+        ids = list(self.live)
+        if not ids:
+            return
+        async with self.session_factory() as db:
+            alive = set((await db.execute(
+                update(Interview)
+                .where(Interview.id.in_(ids), Interview.status.in_(LIVE_STATUSES))
+                .values(heartbeat_at=func.now())
+                .returning(Interview.id)
+            )).scalars())
+            await db.commit()
+        for interview_id in ids:
+            if interview_id not in alive and interview_id in self._tasks:
+                session = self.live.get(interview_id)
+                if session is not None:
+                    session.failure_reason = "Session was taken over by the stale sweeper"
+                self._tasks[interview_id].cancel()
+
+    async def shutdown(self, timeout: float = 10) -> None:
+        """Fail and refund the sessions still running on this node"""
+        # Let sessions started in this loop iteration enter _run, so their
+        # cancellation goes through the failure path
+        await asyncio.sleep(0)
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        try:
+            await self.flush_turns()
+        except Exception as e:
+            print(f"Could not write buffered interview turns: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "live_sessions": len(self.live),
+            "awaiting_answer": sum(1 for s in self.live.values() if s.awaiting_answer),
+            "max_sessions": self.max_sessions,
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "open_streams": sum(len(s.subscriptions) for s in self.live.values()),
+            "streams_opened": self.streams_opened,
+            "stream_resyncs": self.stream_resyncs,
+            "turns_buffered": len(self._turn_buffer),
+            "turn_flushes": self.turn_flushes,
+            "turns_written": self.turns_written,
+            "model": self.model.stats(),
+            "model_latency_ms": self.model_latency_ms.snapshot(),
+        }
+
+
+async def sweep_stale_interviews(session_factory=AsyncSessionLocal) -> int:
+    """Fail and refund live interviews whose node stopped heartbeating. Returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=INTERVIEW_STALE_SECONDS)
+    async with session_factory() as db:
+        stale = (
+            select(Interview.id)
+            .where(Interview.status.in_(LIVE_STATUSES), Interview.heartbeat_at < cutoff)
+            .limit(INTERVIEW_SWEEP_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        failed = (await db.execute(
+            update(Interview)
+            .where(Interview.id.in_(stale.scalar_subquery()))
+            .values(status="failed", ended_at=func.now(), failure_reason="Interview session was lost")
+            .returning(Interview.id, Interview.user_id, Interview.credits_used)
+        )).all()
+        refunded_users = set()
+        for row in failed:
+            if await refund_interview(db, row.id, row.user_id, row.credits_used):
+                refunded_users.add(row.user_id)
+        await db.commit()
+    for user_id in refunded_users:
+        invalidate_user(user_id)
+    return len(failed)
+
+
+async def run_interview_maintenance(engine: "InterviewEngine") -> None:
+    """Background task started by the app lifespan: heartbeats and the stale sweep"""
+    while True:
+        await asyncio.sleep(INTERVIEW_HEARTBEAT_SECONDS)
+        try:
+            await engine.heartbeat()
+            while await sweep_stale_interviews(engine.session_factory) == INTERVIEW_SWEEP_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Interview maintenance failed: {e}")
+
+
+async def run_turn_writer(engine: "InterviewEngine") -> None:
+    """Background task started by the app lifespan: flushes answered turns in batches"""
+    while True:
+        try:
+            await asyncio.wait_for(engine.flush_requested.wait(), INTERVIEW_TURN_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        engine.flush_requested.clear()
+        try:
+            await engine.flush_turns()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Could not write buffered interview turns: {e}")
+
+
+_engine: InterviewEngine | None = None
+
+
+def get_interview_engine() -> InterviewEngine:
+    """Process-wide engine; created by the app lifespan"""
+    global _engine
+    if _engine is None:
+        _engine = InterviewEngine()
+    return _engine
+
+
+def set_interview_engine(engine: InterviewEngine | None) -> None:
+    """Swap the engine (tests use one bound to their own database and model)"""
+    global _engine
+    _engine = engine
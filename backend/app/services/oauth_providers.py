@@ -0,0 +1,160 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from app.http_client import get_http_client
+from app.oidc import (
+    GOOGLE_DISCOVERY_URL, LINKEDIN_DISCOVERY_URL, MICROSOFT_DISCOVERY_URL,
+    get_discovery, verify_id_token
+)
+
+
+class OAuthError(Exception):
+    """The provider rejected the login or returned unusable data (maps to a 400)"""
+
+
+@dataclass
+class OAuthIdentity:
+    email: str
+    name: str
+
+
+class OAuthProvider:
+    """
+    Authorization-code login against one provider.
+
+    Subclasses describe where the identity comes from; exchanging the code,
+    id_token verification and the userinfo fallback are shared.
+    """
+
+    name: str
+    display_name: str
+    discovery_url: str
+    client_id: str | None
+    client_secret: str | None
+    redirect_uri: str | None
+    token_scope: str | None = None
+    uses_id_token: bool = True
+
+    async def authenticate(self, code: str) -> OAuthIdentity:
+        discovery = await get_discovery(self.discovery_url)
+        tokens = await self.exchange_code(discovery, code)
+        claims = None
+        if self.uses_id_token and tokens.get("id_token"):
+            # A verified id_token already carries the email, saving the userinfo round-trip
+            claims = await verify_id_token(tokens["id_token"], self.discovery_url, self.client_id, tokens["access_token"])
+        if claims and claims.get("email"):
+            return self.identity_from_claims(claims)
+        return await self.fetch_identity(discovery, tokens["access_token"])
+
+    async def exchange_code(self, discovery: dict, code: str) -> dict:
+        token_data = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "redirect_uri": self.redirect_uri,
+        }
+        if self.token_scope:
+            token_data["scope"] = self.token_scope
+        response = await get_http_client().post(
+            discovery["token_endpoint"],
+            data=token_data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        if response.status_code != 200:
+            raise OAuthError(f"Token exchange failed: {response.text}")
+        tokens = response.json()
+        if "access_token" not in tokens:
+            error_desc = tokens.get("error_description", "Unknown error")
+            raise OAuthError(f"Failed to get access token: {error_desc}")
+        return tokens
+
+    def identity_from_claims(self, claims: dict) -> OAuthIdentity:
+        name = claims.get("name") or f"{claims.get('given_name', '')} {claims.get('family_name', '')}".strip()
+        return OAuthIdentity(email=claims["email"], name=name or f"{self.display_name} User")
+
+    async def fetch_identity(self, discovery: dict, access_token: str) -> OAuthIdentity:
+        response = await get_http_client().get(discovery["userinfo_endpoint"], headers=_bearer(access_token))
+        if response.status_code != 200:
+            raise OAuthError(f"Failed to get user info: {response.text}")
+        user_data = response.json()
+        if not user_data.get("email"):
+            raise OAuthError(f"Could not retrieve email from {self.display_name}")
+        return self.identity_from_claims(user_data)
+
+
+class GoogleProvider(OAuthProvider):
+    name = "google"
+    display_name = "Google"
+    discovery_url = GOOGLE_DISCOVERY_URL
+    client_id = os.getenv("GOOGLE_CLIENT_ID")
+    client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
+    redirect_uri = os.getenv("GOOGLE_REDIRECT_URI")
+
+
+class LinkedInProvider(OAuthProvider):
+    name = "linkedin"
+    display_name = "LinkedIn"
+    discovery_url = LINKEDIN_DISCOVERY_URL
+    client_id = os.getenv("LINKEDIN_CLIENT_ID")
+    client_secret = os.getenv("LINKEDIN_CLIENT_SECRET")
+    redirect_uri = os.getenv("LINKEDIN_REDIRECT_URI")
+
+    async def fetch_identity(self, discovery: dict, access_token: str) -> OAuthIdentity:
+        client = get_http_client()
+        headers = _bearer(access_token)
+        response = await client.get(discovery.get("userinfo_endpoint", "https://api.linkedin.com/v2/userinfo"), headers=headers)
+        if response.status_code == 200 and response.json().get("email"):
+            return self.identity_from_claims(response.json())
+        # Legacy v2 API: profile and email live behind two independent calls
+        profile_response, email_response = await asyncio.gather(
+            client.get("https://api.linkedin.com/v2/people/~?projection=(id,firstName,lastName)", headers=headers),
+            client.get("https://api.linkedin.com/v2/emailAddress?q=members&projection=(elements*(handle~))", headers=headers),
+        )
+        if profile_response.status_code != 200:
+            raise OAuthError(f"Failed to get user profile: {profile_response.text}")
+        profile_data = profile_response.json()
+        user_email = None
+        if email_response.status_code == 200:
+            elements = email_response.json().get("elements", [])
+            if elements:
+                user_email = elements[0].get("handle~", {}).get("emailAddress")
+        if not user_email:
+            raise OAuthError("Could not retrieve email from LinkedIn")
+        first_name_data = profile_data.get("firstName", {}).get("localized", {})
+        last_name_data = profile_data.get("lastName", {}).get("localized", {})
+        first_name = list(first_name_data.values())[0] if first_name_data else ""
+        last_name = list(last_name_data.values())[0] if last_name_data else ""
+        return self.identity_from_claims({"email": user_email, "given_name": first_name, "family_name": last_name})
+
+
+class MicrosoftProvider(OAuthProvider):
+    name = "microsoft"
+    display_name = "Microsoft"
+    discovery_url = MICROSOFT_DISCOVERY_URL
+    client_id = os.getenv("MICROSOFT_CLIENT_ID")
+    client_secret = os.getenv("MICROSOFT_CLIENT_SECRET")
+    redirect_uri = os.getenv("MICROSOFT_REDIRECT_URI")
+    token_scope = "https://graph.microsoft.com/User.Read"
+    # The Graph-scoped token response carries no id_token; identity comes from /me
+    uses_id_token = False
+
+    async def fetch_identity(self, discovery: dict, access_token: str) -> OAuthIdentity:
+        response = await get_http_client().get("https://graph.microsoft.com/v1.0/me", headers=_bearer(access_token))
+        if response.status_code != 200:
+            raise OAuthError(f"Failed to get user info: {response.text}")
+        user_data = response.json()
+        email = user_data.get("mail") or user_data.get("userPrincipalName")
+        if not email:
+            raise OAuthError("Could not retrieve email from Microsoft")
+        return OAuthIdentity(email=email, name=user_data.get("displayName") or "Microsoft User")
+
+
+def _bearer(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+OAUTH_PROVIDERS = {
+    provider.name: provider
+    for provider in (GoogleProvider(), LinkedInProvider(), MicrosoftProvider())
+}
@@ -0,0 +1,88 @@
+from sqlalchemy import DateTime, Integer, String, cast, insert, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User
+from app.models.user_profiles_model import UserProfile
+from app.models.wallet_model import Wallet
+from app.models.activity_model import Activity
+from app.models.refresh_session_model import RefreshSession
+
+
+async def onboard_user(
+    session: AsyncSession,
+    *,
+    name: str,
+    email: str,
+    password: str,
+    refresh_session: dict,
+    phone: str | None = None,
+    city: str | None = None,
+    existing_ok: bool = False,
+):
+    """
+    Create (or, with existing_ok, find) a user together with the profile, wallet,
+    registration activity and a refresh session in a single statement.
+
+    Data-modifying CTEs chain the inserts off the user row, so a new account costs
+    one round-trip. With existing_ok the user insert becomes an upsert on email:
+    an existing user only gets the new refresh session. Without it a duplicate email
+    raises IntegrityError from the unique constraint.
+
+    refresh_session holds the RefreshSession column values (see
+    refresh_sessions.session_values). Returns a row with id, name, email,
+    token_version and inserted. The caller commits.
+    """
+    user_insert = pg_insert(User).values(
+        name=name,
+        email=email,
+        password=password,
+        phone=phone,
+        city=city,
+        token_version=0,  # column defaults are not applied inside a CTE
+    )
+    if existing_ok:
+        user_insert = user_insert.on_conflict_do_update(
+            index_elements=[User.email],
+            # A no-op update so RETURNING yields the existing row
+            set_={"email": user_insert.excluded.email},
+        )
+    user_cte = user_insert.returning(
+        User.id,
+        User.name,
+        User.email,
+        User.token_version,
+        # xmax is 0 only for freshly inserted rows, not ones touched by ON CONFLICT
+        literal_column("(xmax = 0)").label("inserted"),
+    ).cte("new_user")
+
+    # Dependent rows are only created for a user this statement actually inserted
+    profile_cte = insert(UserProfile).from_select(
+        ["user_id", "full_name", "phone", "city"],
+        select(user_cte.c.id, user_cte.c.name, literal(phone, String), literal(city, String)).where(user_cte.c.inserted),
+    ).cte("new_profile")
+    wallet_cte = insert(Wallet).from_select(
+        ["user_id", "balance_credits"],
+        select(user_cte.c.id, literal(0, Integer)).where(user_cte.c.inserted),
+    ).cte("new_wallet")
+    activity_cte = insert(Activity).from_select(
+        ["user_id", "kind", "ref_id"],
+        select(
+            user_cte.c.id,
+            literal("profile_update", String),
+            literal("user_registration_", String) + cast(user_cte.c.id, String),
+        ).where(user_cte.c.inserted),
+    ).cte("new_activity")
+
+    session_cte = insert(RefreshSession).from_select(
+        ["user_id", "token_hash", "family_id", "expires_at", "user_agent"],
+        select(
+            user_cte.c.id,
+            literal(refresh_session["token_hash"], String),
+            literal(refresh_session["family_id"], String),
+            literal(refresh_session["expires_at"], DateTime(timezone=True)),
+            literal(refresh_session["user_agent"], String),
+        ),
+    ).cte("new_session")
+
+    stmt = select(user_cte).add_cte(profile_cte, wallet_cte, activity_cte, session_cte)
+    return (await session.execute(stmt)).one()
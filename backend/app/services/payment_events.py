@@ -0,0 +1,53 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.payment_model import Payment
+from app.services.wallet_ledger import post_entry
+
+
+class PermanentWebhookError(Exception):
+    """The event can never be applied; it goes straight to the dead-letter list"""
+
+
+def razorpay_payment_entity(payload: dict) -> dict:
+    return payload.get("payload", {}).get("payment", {}).get("entity", {})
+
+
+async def apply_razorpay_event(session: AsyncSession, payload: dict, signature: str | None = None) -> None:
+    """
+    Apply one Razorpay payment event: record the payment status and, once
+    captured, credit the pack through the wallet ledger. Safe to run again for
+    the same payment. The caller commits.
+    """
+    entity = razorpay_payment_entity(payload)
+    payment_id = entity.get("id")
+    order_id = entity.get("order_id")
+    status = entity.get("status")
+    if not all([payment_id, order_id, status]):
+        raise PermanentWebhookError("Invalid webhook data")
+
+    payment = (await session.execute(
+        select(Payment).where(Payment.order_id == order_id).with_for_update()
+    )).scalars().first()
+    if not payment:
+        # Retried: the event may have overtaken the order's own commit
+        raise LookupError(f"Payment {order_id} not found")
+
+    if payment.status in ("success", "captured"):
+        return
+
+    payment.status = status
+    payment.signature = signature
+
+    if status == "captured":
+        # The gateway payment id keeps a replayed event from crediting twice
+        await post_entry(
+            session,
+            payment.user_id,
+            (payment.payload_json or {}).get("credits", 0),
+            type="purchase",
+            idempotency_key=f"razorpay:{payment_id}",
+            amount_inr=payment.amount_inr,
+            currency=payment.currency,
+            payment_gateway="razorpay",
+            external_ref=payment_id,
+        )
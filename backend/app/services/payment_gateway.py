@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass
+import httpx
+from app.http_client import get_http_client
+
+# Payment gateway selection: "razorpay" (needs RAZORPAY_KEY/RAZORPAY_SECRET,
+# otherwise the stub is used) or "stub" for local runs, tests and load benchmarks
+PAYMENT_PROVIDER = os.getenv("PAYMENT_PROVIDER", "razorpay")
+RAZORPAY_KEY = os.getenv("RAZORPAY_KEY")
+RAZORPAY_SECRET = os.getenv("RAZORPAY_SECRET")
+RAZORPAY_API_URL = os.getenv("RAZORPAY_API_URL", "https://api.razorpay.com/v1")
+
+PAYMENT_GATEWAY_TIMEOUT_SECONDS = float(os.getenv("PAYMENT_GATEWAY_TIMEOUT_SECONDS", 5))
+# Consecutive failures that open the circuit, and how long it stays open
+PAYMENT_GATEWAY_FAILURE_THRESHOLD = int(os.getenv("PAYMENT_GATEWAY_FAILURE_THRESHOLD", 5))
+PAYMENT_GATEWAY_RESET_SECONDS = float(os.getenv("PAYMENT_GATEWAY_RESET_SECONDS", 30))
+# Simulated gateway round-trip for the stub
+STUB_GATEWAY_LATENCY_MS = float(os.getenv("STUB_GATEWAY_LATENCY_MS", 0))
+
+
+class PaymentGatewayError(Exception):
+    """The gateway rejected the request"""
+
+
+class GatewayUnavailable(PaymentGatewayError):
+    """The gateway is failing or timing out, or the circuit is open; retry later"""
+
+
+@dataclass
+class GatewayOrder:
+    id: str
+    amount_paise: int
+    currency: str
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a dependency is down. After failure_threshold consecutive
+    failures calls are refused for reset_seconds; then a single trial call is
+    let through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            self.rejected += 1
+            raise GatewayUnavailable("Payment gateway circuit is open")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def abandon(self) -> None:
+        """The call was cancelled before an outcome; let the next one be the trial"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+
+class PaymentGateway:
+    name: str
+
+    async def create_order(self, amount_paise: int, currency: str, receipt: str, notes: dict) -> GatewayOrder:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"name": self.name}
+
+
+class RazorpayGateway(PaymentGateway):
+    """Razorpay Orders API over the shared, connection-pooled HTTP client"""
+
+    name = "razorpay"
+
+    def __init__(self, key_id: str, key_secret: str, base_url: str = RAZORPAY_API_URL):
+        self.base_url = base_url.rstrip("/")
+        self.auth = httpx.BasicAuth(key_id, key_secret)
+        self.breaker = CircuitBreaker(PAYMENT_GATEWAY_FAILURE_THRESHOLD, PAYMENT_GATEWAY_RESET_SECONDS)
+
+    async def create_order(self, amount_paise: int, currency: str, receipt: str, notes: dict) -> GatewayOrder:
+        self.breaker.before_call()
+        try:
+            response = await get_http_client().post(
+                f"{self.base_url}/orders",
+                json={"amount": amount_paise, "currency": currency, "receipt": receipt, "notes": notes},
+                auth=self.auth,
+                timeout=PAYMENT_GATEWAY_TIMEOUT_SECONDS,
+            )
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise GatewayUnavailable(f"Razorpay request failed: {type(e).__name__}") from e
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise GatewayUnavailable(f"Razorpay returned {response.status_code}")
+        # Any answer below 500 means the gateway itself is up
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise PaymentGatewayError(f"Razorpay rejected the order: {response.status_code} {response.text[:200]}")
+        order = response.json()
+        return GatewayOrder(id=order["id"], amount_paise=order["amount"], currency=order["currency"])
+
+    def stats(self) -> dict:
+        return {"name": self.name, "circuit": self.breaker.stats()}
+
+
+class StubGateway(PaymentGateway):
+    """Accepts every order without network access, after STUB_GATEWAY_LATENCY_MS"""
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = STUB_GATEWAY_LATENCY_MS):
+        self.latency_ms = latency_ms
+        self.orders = 0
+
+    async def create_order(self, amount_paise: int, currency: str, receipt: str, notes: dict) -> GatewayOrder:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self.orders += 1
+        return GatewayOrder(id=f"order_{uuid.uuid4().hex[:16]}", amount_paise=amount_paise, currency=currency)
+
+    def stats(self) -> dict:
+        return {"name": self.name, "orders": self.orders}
+
+
+_gateway: PaymentGateway | None = None
+
+
+def build_payment_gateway() -> PaymentGateway:
+    if PAYMENT_PROVIDER == "razorpay" and RAZORPAY_KEY and RAZORPAY_SECRET:
+        return RazorpayGateway(RAZORPAY_KEY, RAZORPAY_SECRET)
+    return StubGateway()
+
+
+def get_payment_gateway() -> PaymentGateway:
+    """Process-wide gateway; created by the app lifespan"""
+    global _gateway
+    if _gateway is None:
+        _gateway = build_payment_gateway()
+    return _gateway
+
+
+def set_payment_gateway(gateway: PaymentGateway | None) -> None:
+    """Swap the gateway (tests and benchmarks use a stub or a local fake)"""
+    global _gateway
+    _gateway = gateway
@@ -0,0 +1,553 @@
+import asyncio
+import copy
+import hashlib
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from cachetools import TTLCache
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import storage
+from app.database import AsyncSessionLocal
+from app.invalidation import notify, on_notification
+from app.models.cv_blob_model import CVBlob
+from app.models.cv_model import CV
+from app.models.interview_model import Interview
+from app.models.interview_turn_model import InterviewTurn
+from app.models.persona_model import Persona
+from app.models.role_model import Role
+from app.models.screening_model import Screening
+from app.models.user_profiles_model import UserProfile
+from app.models.user_role_selection_model import UserRoleSelection
+from app.process_pool import BoundedProcessPool, PoolSaturated
+from app.services.cv_blobs import fingerprint_cv, store_extraction
+from app.services.cv_screening import profile_cvs
+from app.user_cache import invalidate_user, notify_user_changed
+
+# A persona is derived from the user's CVs, role selections, screenings and
+# interviews and materialized in the personas row. Each source's
+# contribution is kept in personas.sources keyed by id, so a recompute only
+# reads what changed since updated_at and merges it in. Changes to the
+# inputs mark the user dirty; recomputes are debounced per user, and
+# concurrent requests for the same user share one run.
+
+# Quiet period after the last change before recomputing, and the most a
+# steady stream of changes can postpone it
+PERSONA_DEBOUNCE_MS = float(os.getenv("PERSONA_DEBOUNCE_MS", 2000))
+PERSONA_MAX_DELAY_MS = float(os.getenv("PERSONA_MAX_DELAY_MS", 10000))
+# Sources committed while a recompute ran may carry timestamps just before
+# its updated_at; the next recompute looks this far back to pick them up
+PERSONA_WATERMARK_OVERLAP_SECONDS = float(os.getenv("PERSONA_WATERMARK_OVERLAP_SECONDS", 60))
+# CVs are profiled on their own worker pool so personas never take the
+# screening dispatcher's slots (and a screening backlog never starves them)
+PERSONA_WORKERS = int(os.getenv("PERSONA_WORKERS", 1))
+PERSONA_MAX_PENDING = int(os.getenv("PERSONA_MAX_PENDING", 4))
+# A background recompute that hit a saturated pool or a database hiccup is
+# tried again after RETRY_SECONDS, doubling up to RETRY_MAX_SECONDS
+PERSONA_RETRY_SECONDS = float(os.getenv("PERSONA_RETRY_SECONDS", 5))
+PERSONA_RETRY_MAX_SECONDS = float(os.getenv("PERSONA_RETRY_MAX_SECONDS", 120))
+# Serialized /personas/current responses; dropped on change notifications, the TTL is a fallback
+PERSONA_CACHE_TTL_SECONDS = int(os.getenv("PERSONA_CACHE_TTL_SECONDS", 300))
+PERSONA_CACHE_MAX_SIZE = int(os.getenv("PERSONA_CACHE_MAX_SIZE", 10000))
+PERSONA_MAX_SKILLS = 30
+PERSONA_MAX_POINTS = 5
+
+PERSONA_CHANNEL = "persona_changed"
+
+
+
+class CVProfilingDeferred(Exception):
+    """
+    Some CVs could not be profiled for a transient reason (storage timeout);
+    the rest of the recompute was saved, persona holds its result
+    """
+
+    def __init__(self, persona: dict, reason: str):
+        super().__init__(reason)
+        self.persona = persona
+
+
+# Failures worth retrying; anything else waits for the user's next change
+_TRANSIENT_ERRORS = (
+    PoolSaturated, BrokenProcessPool, OperationalError, InterfaceError, OSError, asyncio.TimeoutError,
+    CVProfilingDeferred,
+)
+
+persona_pool = BoundedProcessPool("persona", PERSONA_WORKERS, PERSONA_MAX_PENDING)
+
+_personas = TTLCache(maxsize=PERSONA_CACHE_MAX_SIZE, ttl=PERSONA_CACHE_TTL_SECONDS)
+# Bumped on every invalidation so a load that raced with one is not cached
+_generation = 0
+
+
+def get_cached_persona(user_id: int) -> bytes | None:
+    return _personas.get(user_id)
+
+
+def persona_generation() -> int:
+    """Take before loading a persona and pass to cache_persona"""
+    return _generation
+
+
+def cache_persona(user_id: int, body: bytes, generation: int) -> None:
+    if generation == _generation:
+        _personas[user_id] = body
+
+
+def invalidate_persona(user_id: int) -> None:
+    global _generation
+    _generation += 1
+    _personas.pop(user_id, None)
+
+
+def _on_persona_changed(payload: str | None) -> None:
+    global _generation
+    if payload is None:
+        _generation += 1
+        _personas.clear()
+    else:
+        invalidate_persona(int(payload))
+
+
+on_notification(PERSONA_CHANNEL, _on_persona_changed)
+
+
+def _empty_sources() -> dict:
+    return {"vocabulary": None, "cvs": {}, "screenings": {}, "interviews": {}}
+
+
+def summarize(sources: dict, roles: dict, selected_role_ids: list[int]) -> tuple[dict, list[str]]:
+    """
+    Build the persona from the merged sources: skills ranked by how much
+    evidence backs them (CVs mentioning them, screenings matching them), a
+    short summary, strengths, and gaps against the roles the user targets.
+    """
+    cvs = [entry for entry in sources["cvs"].values() if "skills" in entry]
+    screenings = list(sources["screenings"].values())
+    interviews = list(sources["interviews"].values())
+
+    on_cvs = Counter(skill for entry in cvs for skill in entry["skills"])
+    matched = Counter(skill for entry in screenings for skill in entry["matched"])
+    missing = Counter(skill for entry in screenings for skill in entry["missing"])
+    evidence = on_cvs + matched
+    skills = [skill for skill, _ in sorted(evidence.items(), key=lambda item: (-item[1], item[0].lower()))]
+    skills = skills[:PERSONA_MAX_SKILLS]
+
+    targets = [roles[role_id] for role_id in selected_role_ids if role_id in roles]
+    scores = [entry["score"] for entry in screenings]
+    best = max(screenings, key=lambda entry: entry["score"], default=None)
+    answered = sum(entry["answered"] for entry in interviews)
+
+    strengths = [
+        f"{skill}: matched in {count} screening{'s' if count != 1 else ''}"
+        for skill, count in matched.most_common(PERSONA_MAX_POINTS)
+    ]
+    for skill in skills:
+        if len(strengths) >= PERSONA_MAX_POINTS:
+            break
+        if skill not in matched:
+            strengths.append(f"{skill}: on {on_cvs[skill]} of your CVs" if on_cvs[skill] > 1 else f"{skill}: on your CV")
+    if best is not None and best["role_id"] in roles:
+        strengths.append(f"Best screening score {best['score']} for {roles[best['role_id']]['title']}")
+
+    gaps = {}
+    for skill, count in missing.most_common():
+        if skill not in on_cvs and skill not in matched:
+            gaps.setdefault(skill, f"{skill}: missing in {count} screening{'s' if count != 1 else ''}")
+    for role in targets:
+        for tag in role["tags"]:
+            if tag not in evidence:
+                gaps.setdefault(tag, f"{tag}: listed for {role['title']}, not found on your CVs")
+    areas = list(gaps.values())[:PERSONA_MAX_POINTS]
+
+    parts = []
+    if targets:
+        parts.append(f"Targeting {', '.join(role['title'] for role in targets)}.")
+    if cvs:
+        parts.append(
+            f"{len(cvs)} CV{'s' if len(cvs) != 1 else ''} on file mentioning {len(on_cvs)} "
+            f"skill{'s' if len(on_cvs) != 1 else ''} from the roles catalog"
+            + (f", strongest in {', '.join(skills[:3])}." if skills else ".")
+        )
+    if scores:
+        parts.append(
+            f"Average screening score {round(sum(scores) / len(scores))} across {len(scores)} "
+            f"screening{'s' if len(scores) != 1 else ''}."
+        )
+    if interviews:
+        parts.append(
+            f"{len(interviews)} practice interview{'s' if len(interviews) != 1 else ''} completed, "
+            f"{answered} question{'s' if answered != 1 else ''} answered."
+        )
+    if not parts:
+        parts.append("Upload a CV and select roles to build your persona.")
+
+    summary = {
+        "professional_summary": " ".join(parts),
+        "strengths": strengths,
+        "areas_for_improvement": areas,
+        "target_roles": [role["title"] for role in targets],
+        "stats": {
+            "cvs": len(cvs),
+            "screenings": len(scores),
+            "average_score": round(sum(scores) / len(scores)) if scores else None,
+            "best_score": best["score"] if best is not None else None,
+            "interviews": len(interviews),
+            "answered_questions": answered,
+        },
+    }
+    return summary, skills
+
+
+class PersonaEngine:
+    """Per-process scheduler and incremental builder of personas"""
+
+    def __init__(self, sessions=AsyncSessionLocal, runner=None):
+        self.sessions = sessions
+        # Runs profile_cvs off the event loop (the persona worker pool)
+        self.runner = runner or persona_pool.run
+        self._timers: dict = {}
+        self._first_change: dict = {}
+        self._running: dict = {}
+        self._background: set = set()
+        # Consecutive failed background runs per user, for the retry backoff
+        self._retries: dict = {}
+        # Users changed since their running recompute started (it may have missed the change)
+        self._changed_while_running: set = set()
+        self.changes = 0
+        self.debounced_runs = 0
+        self.coalesced = 0
+        self.recomputes = 0
+        self.full_recomputes = 0
+        self.sources_processed = 0
+        self.failures = 0
+        self.retries = 0
+        self.last_error = None
+        self.last_duration_ms = None
+
+    def changed(self, user_id: int) -> None:
+        """
+        An input of this user's persona changed (call after committing).
+        Recomputes once the changes stop for PERSONA_DEBOUNCE_MS, or
+        PERSONA_MAX_DELAY_MS after the first one. Users without a persona
+        are skipped; theirs is built on the first explicit compute.
+        """
+        self.changes += 1
+        if user_id in self._running:
+            self._changed_while_running.add(user_id)
+        now = asyncio.get_running_loop().time()
+        first = self._first_change.setdefault(user_id, now)
+        self._schedule(user_id, min(PERSONA_DEBOUNCE_MS / 1000, first + PERSONA_MAX_DELAY_MS / 1000 - now))
+
+    def _schedule(self, user_id: int, delay: float) -> None:
+        timer = self._timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._timers[user_id] = asyncio.get_running_loop().call_later(max(0.0, delay), self._fire, user_id)
+
+    def _fire(self, user_id: int) -> None:
+        self._timers.pop(user_id, None)
+        if user_id in self._running:
+            # Changes made while a run is reading may be missed by it; go again after
+            self._schedule(user_id, PERSONA_DEBOUNCE_MS / 1000)
+            return
+        self._first_change.pop(user_id, None)
+        self.debounced_runs += 1
+        task = asyncio.create_task(self._run(user_id, create=False))
+        self._background.add(task)
+        task.add_done_callback(lambda done: self._background_done(user_id, done))
+
+    def _background_done(self, user_id: int, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            self._retries.pop(user_id, None)
+            return
+        if not isinstance(error, _TRANSIENT_ERRORS):
+            self.last_error = f"{type(error).__name__}: {error}"
+            print(f"Persona recompute for user {user_id} failed: {self.last_error}")
+            self._retries.pop(user_id, None)
+            return
+        self._retry_later(user_id, error)
+
+    def _retry_later(self, user_id: int, error: Exception) -> None:
+        """Schedule another run after a transient failure, backing off per user"""
+        self.last_error = f"{type(error).__name__}: {error}"
+        if user_id in self._timers:
+            # A retry or a newer change is already due
+            return
+        attempt = self._retries.get(user_id, 0)
+        self._retries[user_id] = attempt + 1
+        self.retries += 1
+        delay = min(PERSONA_RETRY_SECONDS * 2 ** attempt, PERSONA_RETRY_MAX_SECONDS) * random.uniform(0.8, 1.2)
+        print(f"Persona recompute for user {user_id} failed, retrying in {delay:.0f}s: {self.last_error}")
+        self._schedule(user_id, delay)
+
+    async def compute(self, user_id: int) -> dict:
+        """
+        Recompute now, creating the persona if needed; pending debounced work
+        is folded in. A run already in flight is joined unless the user
+        changed something after it started; then it is waited out and a
+        fresh run reads the change.
+        """
+        running = self._running.get(user_id)
+        if running is not None and user_id in self._changed_while_running:
+            # Its outcome is superseded; failures are the caller's only if they recur
+            await asyncio.wait([running])
+        timer = self._timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+            self._first_change.pop(user_id, None)
+        try:
+            persona = await self._run(user_id, create=True)
+            if persona is None:
+                # Joined a background run that found no persona to update
+                persona = await self._run(user_id, create=True)
+        except CVProfilingDeferred as e:
+            # Saved without the CVs that failed; they are retried in the background
+            self._retry_later(user_id, e)
+            return e.persona
+        return persona
+
+    async def _run(self, user_id: int, create: bool) -> dict | None:
+        task = self._running.get(user_id)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._recompute(user_id, create))
+            self._running[user_id] = task
+            self._changed_while_running.discard(user_id)
+            task.add_done_callback(lambda _: self._running.pop(user_id, None))
+        # A cancelled caller must not cancel the run others are waiting on
+        return await asyncio.shield(task)
+
+    async def _recompute(self, user_id: int, create: bool) -> dict | None:
+        started = time.perf_counter()
+        try:
+            gathered = await self._gather(user_id, create)
+            if gathered is None:
+                return None
+            profiles = []
+            if gathered["cv_jobs"]:
+                profiles = await self.runner(profile_cvs, gathered["cv_jobs"], gathered["vocabulary"])
+            persona = await self._save(user_id, create, gathered, profiles)
+            deferred = [profile["retry"] for profile in profiles if "retry" in profile]
+            if deferred and persona is not None:
+                raise CVProfilingDeferred(persona, f"{len(deferred)} CV(s) not profiled: {deferred[0]}")
+            return persona
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    async def _gather(self, user_id: int, create: bool) -> dict | None:
+        """Read what changed since the last recompute (no locks held)"""
+        async with self.sessions() as session:
+            persona = (await session.execute(
+                select(Persona.sources, Persona.updated_at).where(Persona.user_id == user_id)
+            )).first()
+            if persona is None and not create:
+                return None
+            roles = {
+                row.id: {"title": row.title, "tags": list(row.tags or [])}
+                for row in (await session.execute(
+                    select(Role.id, Role.title, Role.tags).where(Role.is_active == True)
+                )).all()
+            }
+            vocabulary = sorted({tag for role in roles.values() for tag in role["tags"]})
+            vocabulary_key = hashlib.sha256("\n".join(vocabulary).encode()).hexdigest()[:16]
+            sources = (persona.sources if persona is not None else None) or _empty_sources()
+            # New catalog tags can appear on CVs already processed: start over
+            full = sources.get("vocabulary") != vocabulary_key
+            since = None if full else persona.updated_at - timedelta(seconds=PERSONA_WATERMARK_OVERLAP_SECONDS)
+
+            # CVs do not change once uploaded, so only unseen ones are read
+            cv_ids = (await session.execute(select(CV.id).where(CV.user_id == user_id))).scalars().all()
+            new_ids = [cv_id for cv_id in cv_ids if full or str(cv_id) not in sources["cvs"]]
+            cv_jobs = []
+            if new_ids:
+                cv_jobs = [
+                    {
+                        "cv_id": row.id,
+                        "key": storage.key_from_url(row.storage_url) if row.storage_url else None,
+                        "mime_type": row.mime_type,
+                        "sha256": row.content_sha256,
+                        "text": row.text if row.features is not None else None,
+                        "features": row.features,
+                    }
+                    for row in (await session.execute(
+                        select(CV.id, CV.storage_url, CV.mime_type, CV.content_sha256, CVBlob.text, CVBlob.features)
+                        .outerjoin(CVBlob, CVBlob.sha256 == CV.content_sha256)
+                        .where(CV.id.in_(new_ids))
+                    )).all()
+                ]
+
+            screenings = select(Screening.id, Screening.role_id, Screening.score, Screening.result).where(
+                Screening.user_id == user_id, Screening.status == "done"
+            )
+            interviews = (
+                select(Interview.id, Interview.role_id, func.count(InterviewTurn.answer).label("answered"))
+                .outerjoin(InterviewTurn, InterviewTurn.interview_id == Interview.id)
+                .where(Interview.user_id == user_id, Interview.status == "done")
+                .group_by(Interview.id)
+            )
+            if since is not None:
+                screenings = screenings.where(Screening.completed_at >= since)
+                interviews = interviews.where(Interview.ended_at >= since)
+            screening_rows = (await session.execute(screenings)).all()
+            interview_rows = (await session.execute(interviews)).all()
+            selected_role_ids = (await session.execute(
+                select(UserRoleSelection.role_id)
+                .where(UserRoleSelection.user_id == user_id)
+                .order_by(UserRoleSelection.created_at)
+            )).scalars().all()
+
+        return {
+            "full": full,
+            "roles": roles,
+            "vocabulary": vocabulary,
+            "vocabulary_key": vocabulary_key,
+            "cv_jobs": cv_jobs,
+            "screenings": {
+                str(row.id): {
+                    "role_id": row.role_id,
+                    "score": row.score,
+                    "matched": (row.result or {}).get("matched_skills", []),
+                    "missing": (row.result or {}).get("missing_skills", []),
+                }
+                for row in screening_rows
+            },
+            "interviews": {str(row.id): {"role_id": row.role_id, "answered": row.answered} for row in interview_rows},
+            "selected_role_ids": selected_role_ids,
+        }
+
+    async def _save(self, user_id: int, create: bool, gathered: dict, profiles: list[dict]) -> dict | None:
+        """Merge the changes into the persona row under its lock and rebuild the summary"""
+        async with self.sessions() as session:
+            created = False
+            if create:
+                created = (await session.execute(
+                    pg_insert(Persona)
+                    .values(user_id=user_id, sources=_empty_sources())
+                    .on_conflict_do_nothing(index_elements=[Persona.user_id])
+                    .returning(Persona.id)
+                )).scalar() is not None
+            persona = (await session.execute(
+                select(Persona).where(Persona.user_id == user_id).with_for_update()
+            )).scalars().first()
+            if persona is None:
+                return None
+
+            sources = copy.deepcopy(persona.sources) if persona.sources else _empty_sources()
+            if gathered["full"]:
+                sources["cvs"] = {}
+            sources["vocabulary"] = gathered["vocabulary_key"]
+            jobs = {job["cv_id"]: job for job in gathered["cv_jobs"]}
+            cached = set()
+            for profile in profiles:
+                # Transient failures are left out; _recompute schedules a retry
+                if "retry" in profile:
+                    continue
+                entry = {key: profile[key] for key in ("skills", "sections", "word_count", "error") if key in profile}
+                sources["cvs"][str(profile["cv_id"])] = entry
+                document = profile.get("extracted")
+                if document is not None:
+                    if jobs[profile["cv_id"]]["sha256"] is None:
+                        await fingerprint_cv(session, profile["cv_id"], document["sha256"])
+                    if document["sha256"] not in cached:
+                        cached.add(document["sha256"])
+                        await store_extraction(session, document["sha256"], document["text"], document["features"])
+            # CVs deleted since the last run drop out
+            cv_ids = {str(cv_id) for cv_id in (await session.execute(
+                select(CV.id).where(CV.user_id == user_id)
+            )).scalars()}
+            sources["cvs"] = {cv_id: entry for cv_id, entry in sources["cvs"].items() if cv_id in cv_ids}
+            sources["screenings"].update(gathered["screenings"])
+            sources["interviews"].update(gathered["interviews"])
+
+            summary, skills = summarize(sources, gathered["roles"], gathered["selected_role_ids"])
+            persona.sources = sources
+            persona.summary = summary
+            persona.skills = skills
+            persona.updated_at = func.now()
+            if created:
+                # Profiles point at the persona; /me snapshots include it
+                await session.execute(
+                    update(UserProfile).where(UserProfile.user_id == user_id).values(persona_id=persona.id)
+                )
+                await notify_user_changed(session, user_id)
+            await notify(session, PERSONA_CHANNEL, str(user_id))
+            await session.commit()
+            await session.refresh(persona)
+
+        invalidate_persona(user_id)
+        if created:
+            invalidate_user(user_id)
+        self.recomputes += 1
+        if gathered["full"]:
+            self.full_recomputes += 1
+        self.sources_processed += len(profiles) + len(gathered["screenings"]) + len(gathered["interviews"])
+        return {
+            "id": persona.id,
+            "user_id": persona.user_id,
+            "summary": persona.summary,
+            "skills": persona.skills or [],
+            "updated_at": persona.updated_at,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "changes": self.changes,
+            "pending": len(self._timers),
+            "running": len(self._running),
+            "debounced_runs": self.debounced_runs,
+            "coalesced": self.coalesced,
+            "recomputes": self.recomputes,
+            "full_recomputes": self.full_recomputes,
+            "sources_processed": self.sources_processed,
+            "failures": self.failures,
+            "retries": self.retries,
+            "retrying": len(self._retries),
+            "last_error": self.last_error,
+            "last_duration_ms": self.last_duration_ms,
+            "cached": len(_personas),
+        }
+
+    def shutdown(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._first_change.clear()
+        self._retries.clear()
+        self._changed_while_running.clear()
+        for task in self._background:
+            task.cancel()
+
+
+_engine: PersonaEngine | None = None
+
+
+def get_persona_engine() -> PersonaEngine:
+    """Process-wide engine"""
+    global _engine
+    if _engine is None:
+        _engine = PersonaEngine()
+    return _engine
+
+
+def set_persona_engine(engine: PersonaEngine | None) -> None:
+    """Swap the engine (tests use one bound to their own database)"""
+    global _engine
+    _engine = engine
+
+
+def persona_inputs_changed(user_id: int) -> None:
+    """Hook for the routes and workers that change a persona's inputs"""
+    get_persona_engine().changed(user_id)
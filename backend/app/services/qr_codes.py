@@ -0,0 +1,108 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import qrcode
+from cachetools import LRUCache
+from app.process_pool import BoundedProcessPool
+
+# UPI QR codes are rendered on demand in a worker process and kept as SVG
+# bytes keyed by a digest of the link, so each distinct link renders once.
+
+QR_WORKERS = int(os.getenv("QR_WORKERS", 1))
+QR_MAX_PENDING = int(os.getenv("QR_MAX_PENDING", 16))
+QR_CACHE_MAX_SIZE = int(os.getenv("QR_CACHE_MAX_SIZE", 1024))
+# Signs QR URLs so the endpoint only renders links this API issued. With no
+# secret there is nothing to sign with, so no QR URLs are issued or served.
+QR_TOKEN_SECRET = (os.getenv("QR_TOKEN_SECRET") or os.getenv("SECRET_KEY") or "").encode()
+if not QR_TOKEN_SECRET:
+    print("Neither QR_TOKEN_SECRET nor SECRET_KEY is set; UPI QR codes are disabled")
+
+qr_pool = BoundedProcessPool("qr_codes", QR_WORKERS, QR_MAX_PENDING)
+
+_svgs = LRUCache(maxsize=QR_CACHE_MAX_SIZE)
+_rendering: dict = {}
+
+
+def render_qr_svg(data: str) -> bytes:
+    """
+    Runs in a worker process. Each row's dark runs become one path segment,
+    which keeps the SVG to a couple of KB and needs no imaging library.
+    """
+    qr = qrcode.QRCode(border=4, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    size = len(matrix)
+    segments = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            segments.append(f"M{start} {y}h{x - start}v1H{start}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(segments)}"/></svg>'
+    ).encode()
+
+
+def link_digest(link: str) -> str:
+    return hashlib.sha256(link.encode()).hexdigest()
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _signature(encoded_link: str) -> str:
+    return _b64(hmac.new(QR_TOKEN_SECRET, encoded_link.encode(), hashlib.sha256).digest()[:16])
+
+
+def qr_token(link: str) -> str | None:
+    """
+    URL-safe token carrying the link itself, so any process can render it
+    without a lookup. None when no signing secret is configured.
+    """
+    if not QR_TOKEN_SECRET:
+        return None
+    encoded = _b64(link.encode())
+    return f"{encoded}.{_signature(encoded)}"
+
+
+def link_from_token(token: str) -> str | None:
+    if not QR_TOKEN_SECRET:
+        return None
+    encoded, _, signature = token.partition(".")
+    if not signature or not hmac.compare_digest(signature, _signature(encoded)):
+        return None
+    try:
+        return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+    except ValueError:
+        return None
+
+
+async def get_qr_svg(link: str) -> tuple[bytes, str]:
+    """
+    SVG bytes for the link and their ETag. Concurrent requests for a link
+    that is not cached yet share one render; PoolSaturated when the pool is full.
+    """
+    digest = link_digest(link)
+    etag = f'"qr-{digest[:32]}"'
+    svg = _svgs.get(digest)
+    if svg is not None:
+        return svg, etag
+    render = _rendering.get(digest)
+    if render is None:
+        render = asyncio.ensure_future(qr_pool.run(render_qr_svg, link))
+        _rendering[digest] = render
+        render.add_done_callback(lambda _: _rendering.pop(digest, None))
+    # shield: one caller disconnecting must not cancel the render for the others
+    svg = await asyncio.shield(render)
+    _svgs[digest] = svg
+    return svg, etag
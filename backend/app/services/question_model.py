@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import os
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+# Interview question model. Only the local stub ships today; a hosted model
+# plugs in as another QuestionModel returned by build_question_model.
+
+# Simulated model round-trip for the stub, and the delay between streamed tokens
+STUB_QUESTION_MODEL_LATENCY_MS = float(os.getenv("STUB_QUESTION_MODEL_LATENCY_MS", 0))
+STUB_QUESTION_MODEL_TOKEN_MS = float(os.getenv("STUB_QUESTION_MODEL_TOKEN_MS", 0))
+
+
+@dataclass
+class InterviewContext:
+    role_title: str
+    role_description: str = ""
+    # (question, answer) pairs so far, oldest first
+    history: list[tuple[str, str | None]] = field(default_factory=list)
+
+
+class QuestionModel:
+    name: str
+
+    async def next_question(self, context: InterviewContext) -> str:
+        raise NotImplementedError
+
+    async def feedback(self, context: InterviewContext, question: str, answer: str) -> str:
+        raise NotImplementedError
+
+    # Streaming variants yield the text in pieces as the model produces it.
+    # Models that cannot stream yield the whole text once.
+
+    async def stream_question(self, context: InterviewContext) -> AsyncIterator[str]:
+        yield await self.next_question(context)
+
+    async def stream_feedback(self, context: InterviewContext, question: str, answer: str) -> AsyncIterator[str]:
+        yield await self.feedback(context, question, answer)
+
+    def stats(self) -> dict:
+        return {"name": self.name}
+
+
+_STUB_QUESTIONS = [
+    "Walk me through a recent project you are proud of as a {role}.",
+    "What does a typical week look like for a {role}, in your understanding?",
+    "Describe a hard problem you solved. What options did you weigh?",
+    "Tell me about a time you disagreed with a teammate. How was it resolved?",
+    "Which skill would you most like to improve for a {role} position, and how?",
+    "How would you explain a technical decision to a non-technical stakeholder?",
+    "What would you do in your first month as a {role}?",
+]
+
+
+class StubQuestionModel(QuestionModel):
+    """Deterministic canned questions and feedback after STUB_QUESTION_MODEL_LATENCY_MS, with no network access"""
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = STUB_QUESTION_MODEL_LATENCY_MS, token_ms: float = STUB_QUESTION_MODEL_TOKEN_MS):
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.calls = 0
+
+    async def _think(self) -> None:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    async def next_question(self, context: InterviewContext) -> str:
+        await self._think()
+        seed = int(hashlib.sha256(context.role_title.encode()).hexdigest(), 16)
+        template = _STUB_QUESTIONS[(seed + len(context.history)) % len(_STUB_QUESTIONS)]
+        return template.format(role=context.role_title)
+
+    async def feedback(self, context: InterviewContext, question: str, answer: str) -> str:
+        await self._think()
+        words = len(answer.split())
+        if words < 20:
+            return "A little brief: add a concrete example and the outcome."
+        if words > 250:
+            return "Good detail; try to lead with the key point and keep it under two minutes."
+        return "Clear answer with a reasonable structure. Quantify the result where you can."
+
+    async def _tokens(self, text: str) -> AsyncIterator[str]:
+        words = text.split(" ")
+        for n, word in enumerate(words):
+            if n and self.token_ms:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield word if n == len(words) - 1 else word + " "
+
+    async def stream_question(self, context: InterviewContext) -> AsyncIterator[str]:
+        async for token in self._tokens(await self.next_question(context)):
+            yield token
+
+    async def stream_feedback(self, context: InterviewContext, question: str, answer: str) -> AsyncIterator[str]:
+        async for token in self._tokens(await self.feedback(context, question, answer)):
+            yield token
+
+    def stats(self) -> dict:
+        return {"name": self.name, "calls": self.calls}
+
+
+_model: QuestionModel | None = None
+
+
+def build_question_model() -> QuestionModel:
+    return StubQuestionModel()
+
+
+def get_question_model() -> QuestionModel:
+    """Process-wide question model"""
+    global _model
+    if _model is None:
+        _model = build_question_model()
+    return _model
+
+
+def set_question_model(model: QuestionModel | None) -> None:
+    """Swap the model (tests and benchmarks use a stub with a chosen latency)"""
+    global _model
+    _model = model
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+import secrets
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import DateTime, String, delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import create_refresh_token
+from app.database import AsyncSessionLocal
+from app.models.refresh_session_model import RefreshSession
+from app.models.user_model import User
+from app.user_cache import notify_user_changed
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+REFRESH_SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("REFRESH_SESSION_SWEEP_INTERVAL_SECONDS", 3600))
+REFRESH_SESSION_SWEEP_BATCH_SIZE = int(os.getenv("REFRESH_SESSION_SWEEP_BATCH_SIZE", 1000))
+
+
+class RefreshTokenReused(Exception):
+    """An already-rotated refresh token was presented again; its whole family is revoked"""
+
+
+@dataclass
+class IssuedRefreshToken:
+    token: str
+    token_hash: str
+    family_id: str
+    expires_at: datetime
+
+
+def hash_jti(jti: str) -> str:
+    return hashlib.sha256(jti.encode()).hexdigest()
+
+
+def issue_refresh_token(email: str, family_id: str | None = None) -> IssuedRefreshToken:
+    """Mint a refresh token; the caller stores its hash (see session_values)"""
+    jti = secrets.token_urlsafe(32)
+    expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    return IssuedRefreshToken(
+        token=create_refresh_token(data={"sub": email, "jti": jti}, expires_delta=expires),
+        token_hash=hash_jti(jti),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.now(timezone.utc) + expires,
+    )
+
+
+def session_values(issued: IssuedRefreshToken, user_agent: str | None) -> dict:
+    return {
+        "token_hash": issued.token_hash,
+        "family_id": issued.family_id,
+        "expires_at": issued.expires_at,
+        "user_agent": user_agent[:255] if user_agent else None,
+    }
+
+
+async def create_session(session: AsyncSession, user_id: int, email: str, user_agent: str | None) -> IssuedRefreshToken:
+    """Start a new session family (a login on one device). The caller commits."""
+    issued = issue_refresh_token(email)
+    await session.execute(insert(RefreshSession).values(user_id=user_id, **session_values(issued, user_agent)))
+    return issued
+
+
+async def rotate_session(session: AsyncSession, jti: str, email: str):
+    """
+    Swap a refresh token for a new one in the same family, in one statement.
+
+    Returns (user row with id/email/token_version, new token), or None when the
+    token is unknown or expired. Raises RefreshTokenReused when the token was
+    already rotated or revoked: that means it leaked, so the family is revoked.
+    The caller commits either way.
+    """
+    token_hash = hash_jti(jti)
+    issued = issue_refresh_token(email)
+    rotated = (
+        update(RefreshSession)
+        .where(
+            RefreshSession.token_hash == token_hash,
+            RefreshSession.revoked_at.is_(None),
+            RefreshSession.expires_at > func.now(),
+        )
+        .values(revoked_at=func.now(), replaced_by=issued.token_hash)
+        .returning(RefreshSession.user_id, RefreshSession.family_id, RefreshSession.user_agent)
+        .cte("rotated")
+    )
+    successor = insert(RefreshSession).from_select(
+        ["user_id", "family_id", "token_hash", "expires_at", "user_agent"],
+        select(
+            rotated.c.user_id,
+            rotated.c.family_id,
+            literal(issued.token_hash, String),
+            literal(issued.expires_at, DateTime(timezone=True)),
+            rotated.c.user_agent,
+        ),
+    ).cte("successor")
+    stmt = (
+        select(User.id, User.email, User.token_version, rotated.c.family_id)
+        .join_from(rotated, User, User.id == rotated.c.user_id)
+        .add_cte(successor)
+    )
+    user = (await session.execute(stmt)).first()
+    if user is not None:
+        issued.family_id = user.family_id
+        return user, issued
+
+    family_id = (await session.execute(
+        select(RefreshSession.family_id).where(RefreshSession.token_hash == token_hash, RefreshSession.revoked_at.is_not(None))
+    )).scalar()
+    if family_id is None:
+        return None
+    await session.execute(
+        update(RefreshSession)
+        .where(RefreshSession.family_id == family_id, RefreshSession.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
+    raise RefreshTokenReused()
+
+
+async def revoke_session(session: AsyncSession, jti: str) -> int | None:
+    """Revoke one device's session; returns its user id. The caller commits."""
+    return (await session.execute(
+        update(RefreshSession)
+        .where(RefreshSession.token_hash == hash_jti(jti), RefreshSession.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+        .returning(RefreshSession.user_id)
+    )).scalar()
+
+
+async def revoke_all_sessions(session: AsyncSession, user_id: int) -> None:
+    """
+    Sign a user out everywhere: revoke every refresh session and bump
+    token_version so outstanding access tokens stop working. The caller commits.
+    """
+    await session.execute(
+        update(RefreshSession)
+        .where(RefreshSession.user_id == user_id, RefreshSession.revoked_at.is_(None))
+        .values(revoked_at=func.now())
+    )
+    await session.execute(
+        update(User).where(User.id == user_id).values(token_version=User.token_version + 1)
+    )
+    # Other processes drop their cached copy of the user on commit
+    await notify_user_changed(session, user_id)
+
+
+async def sweep_expired_sessions(batch_size: int = REFRESH_SESSION_SWEEP_BATCH_SIZE) -> int:
+    """
+    Delete expired sessions in short batches so no single statement holds many
+    row locks. Revoked rows are kept until they expire: reuse detection needs them.
+    """
+    deleted = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            batch = (
+                select(RefreshSession.id)
+                .where(RefreshSession.expires_at < func.now())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)  # several workers may sweep at once
+            )
+            result = await session.execute(delete(RefreshSession).where(RefreshSession.id.in_(batch.scalar_subquery())))
+            await session.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+async def run_session_sweeper(interval_seconds: int = REFRESH_SESSION_SWEEP_INTERVAL_SECONDS) -> None:
+    """Background task started by the app lifespan"""
+    while True:
+        try:
+            await sweep_expired_sessions()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Refresh session sweep failed: {e}")
+        await asyncio.sleep(interval_seconds)
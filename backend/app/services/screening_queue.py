@@ -0,0 +1,301 @@
+import asyncio
+import os
+import random
+from datetime import timedelta
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import storage
+from app.database import AsyncSessionLocal
+from app.invalidation import notify, on_notification
+from app.models.cv_blob_model import CVBlob
+from app.models.cv_model import CV
+from app.models.role_model import Role
+from app.models.screening_model import Screening
+from app.process_pool import BoundedProcessPool, PoolSaturated
+from app.services.cv_blobs import fingerprint_cv, store_extraction
+from app.services.cv_screening import screen_batch
+from app.services.persona_engine import persona_inputs_changed
+from app.services.wallet_ledger import post_entry
+from app.user_cache import invalidate_user
+
+# Screenings are queued as pending rows when requested and worked off by a
+# dispatcher in every API process. It claims small batches with SKIP LOCKED
+# and hands each batch to one screening worker process, so a burst of
+# requests shares the download, parser and role setup in that process.
+
+SCREENING_CREDITS = 1
+SCREENING_WORKERS = int(os.getenv("SCREENING_WORKERS", 2))
+# Batches waiting for a worker beyond the running ones (0: claim only what can start)
+SCREENING_MAX_PENDING = int(os.getenv("SCREENING_MAX_PENDING", 0))
+SCREENING_BATCH_SIZE = int(os.getenv("SCREENING_BATCH_SIZE", 16))
+# How long the dispatcher lets a burst gather before claiming a batch
+SCREENING_BATCH_WINDOW_MS = float(os.getenv("SCREENING_BATCH_WINDOW_MS", 50))
+# A claimed batch not finished within the lease is taken over by another process
+SCREENING_LEASE_SECONDS = float(os.getenv("SCREENING_LEASE_SECONDS", 300))
+SCREENING_MAX_ATTEMPTS = int(os.getenv("SCREENING_MAX_ATTEMPTS", 3))
+SCREENING_RETRY_SECONDS = float(os.getenv("SCREENING_RETRY_SECONDS", 10))
+# Fallback polling when a wake-up notification is missed
+SCREENING_POLL_SECONDS = float(os.getenv("SCREENING_POLL_SECONDS", 5))
+# Suggested interval for clients polling a pending screening
+SCREENING_CLIENT_POLL_SECONDS = 2
+
+SCREENING_CHANNEL = "screenings"
+
+screening_pool = BoundedProcessPool("screening", SCREENING_WORKERS, SCREENING_MAX_PENDING)
+batch_stats = {"batches": 0, "screenings": 0, "largest": 0}
+
+_wakeup = asyncio.Event()
+
+
+async def enqueue_screening(session: AsyncSession, user_id: int, cv_id: int, role_id: int) -> Screening:
+    """
+    Create a pending screening and debit its credit in the same transaction;
+    the dispatchers are woken once the caller commits. Raises
+    InsufficientCredits (and the caller rolls back).
+    """
+    screening = Screening(
+        user_id=user_id,
+        cv_id=cv_id,
+        role_id=role_id,
+        status="pending",
+        credits_used=SCREENING_CREDITS,
+    )
+    session.add(screening)
+    await session.flush()
+    await post_entry(
+        session,
+        user_id,
+        -SCREENING_CREDITS,
+        type="deduct",
+        idempotency_key=f"screening:{screening.id}:reserve",
+        external_ref=f"screening:{screening.id}",
+    )
+    await notify(session, SCREENING_CHANNEL, str(screening.id))
+    return screening
+
+
+async def claim_batch(sessions=AsyncSessionLocal, limit: int = SCREENING_BATCH_SIZE) -> list[dict]:
+    """
+    Lease up to limit due screenings and return them as worker jobs. The
+    claim commits at once, so no transaction stays open while they run.
+    """
+    async with sessions() as session:
+        due = (
+            select(Screening.id)
+            .where(
+                Screening.status == "pending",
+                or_(Screening.leased_until.is_(None), Screening.leased_until < func.now()),
+            )
+            .order_by(Screening.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = (await session.execute(
+            update(Screening)
+            .where(Screening.id.in_(due.scalar_subquery()))
+            .values(leased_until=func.now() + timedelta(seconds=SCREENING_LEASE_SECONDS), attempts=Screening.attempts + 1)
+            .returning(Screening.id)
+        )).scalars().all()
+        if not claimed:
+            await session.commit()
+            return []
+        # Text already extracted from the same content travels with the job,
+        # so the worker scores it without downloading or parsing anything
+        rows = (await session.execute(
+            select(Screening.id, Screening.user_id, Screening.cv_id, Screening.role_id, Screening.attempts, CV.storage_url, CV.mime_type,
+                   CV.content_sha256, CVBlob.text, CVBlob.features, Role.title, Role.description, Role.tags)
+            .outerjoin(CV, CV.id == Screening.cv_id)
+            .outerjoin(CVBlob, CVBlob.sha256 == CV.content_sha256)
+            .outerjoin(Role, Role.id == Screening.role_id)
+            .where(Screening.id.in_(claimed))
+            .order_by(Screening.id)
+        )).all()
+        await session.commit()
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "cv_id": row.cv_id,
+            "attempts": row.attempts,
+            "key": storage.key_from_url(row.storage_url) if row.storage_url else None,
+            "mime_type": row.mime_type,
+            "sha256": row.content_sha256,
+            "text": row.text if row.features is not None else None,
+            "features": row.features,
+            "role_id": row.role_id,
+            "role": {"title": row.title, "description": row.description, "tags": list(row.tags or [])} if row.title else None,
+        }
+        for row in rows
+    ]
+
+
+async def record_results(sessions, jobs: list[dict], results: list[dict]) -> dict:
+    """
+    Write a batch's outcomes in one transaction: scores for the screened,
+    failure plus refund for the rest, and a delayed retry for transient
+    failures that have attempts left. Deferred jobs never reached a worker
+    and are put back without using up an attempt. Text the workers
+    extracted is cached by content hash, fingerprinting CVs that were not
+    hashed on upload. Returns counts per outcome.
+    """
+    attempts = {job["id"]: job["attempts"] for job in jobs}
+    job_by_id = {job["id"]: job for job in jobs}
+    deferred = [r for r in results if "deferred" in r]
+    done = [r for r in results if "score" in r]
+    retry = [r for r in results if "retry" in r and attempts[r["id"]] < SCREENING_MAX_ATTEMPTS]
+    failed = [r for r in results if "error" in r or ("retry" in r and attempts[r["id"]] >= SCREENING_MAX_ATTEMPTS)]
+    table = Screening.__table__
+    refunded_users = set()
+    async with sessions() as session:
+        cached = set()
+        for r in results:
+            document = r.get("extracted")
+            if document is None:
+                continue
+            if job_by_id[r["id"]]["sha256"] is None:
+                await fingerprint_cv(session, job_by_id[r["id"]]["cv_id"], document["sha256"])
+            if document["sha256"] not in cached:
+                cached.add(document["sha256"])
+                await store_extraction(session, document["sha256"], document["text"], document["features"])
+        if done:
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam("screening_id"), table.c.status == "pending")
+                .values(status="done", score=bindparam("score"), result=bindparam("result"),
+                        completed_at=func.now(), leased_until=None),
+                [{"screening_id": r["id"], "score": r["score"], "result": r["result"]} for r in done],
+            )
+        for r in failed:
+            ended = (await session.execute(
+                update(Screening)
+                .where(Screening.id == r["id"], Screening.status == "pending")
+                .values(status="failed", failure_reason=(r.get("error") or r["retry"])[:2000],
+                        completed_at=func.now(), leased_until=None)
+                .returning(Screening.user_id, Screening.credits_used)
+            )).first()
+            if ended is not None and await refund_screening(session, r["id"], ended.user_id, ended.credits_used):
+                refunded_users.add(ended.user_id)
+        if retry:
+            delay = SCREENING_RETRY_SECONDS * random.uniform(0.8, 1.2)
+            await session.execute(
+                update(Screening)
+                .where(Screening.id.in_([r["id"] for r in retry]), Screening.status == "pending")
+                .values(leased_until=func.now() + timedelta(seconds=delay), failure_reason=retry[0]["retry"][:2000])
+            )
+        if deferred:
+            delay = SCREENING_RETRY_SECONDS * random.uniform(0.8, 1.2)
+            await session.execute(
+                update(Screening)
+                .where(Screening.id.in_([r["id"] for r in deferred]), Screening.status == "pending")
+                .values(leased_until=func.now() + timedelta(seconds=delay), attempts=Screening.attempts - 1)
+            )
+        await session.commit()
+    for user_id in refunded_users:
+        invalidate_user(user_id)
+    for user_id in {job_by_id[r["id"]]["user_id"] for r in done}:
+        persona_inputs_changed(user_id)
+    return {"done": len(done), "failed": len(failed), "retry": len(retry), "deferred": len(deferred)}
+
+
+async def refund_screening(session: AsyncSession, screening_id: int, user_id: int, credits: int) -> bool:
+    """Return a failed screening's credit; at most once per screening. The caller commits."""
+    entry = await post_entry(
+        session,
+        user_id,
+        credits,
+        type="refund",
+        idempotency_key=f"screening:{screening_id}:refund",
+        external_ref=f"screening:{screening_id}",
+    )
+    return entry.applied
+
+
+async def screen_claimed(sessions, jobs: list[dict], runner=None) -> dict:
+    """Screen one claimed batch on the worker pool and record the outcome"""
+    runner = runner or screening_pool.run
+    results = []
+    runnable = []
+    for job in jobs:
+        # Fail without reaching a worker; a job past its attempts has been
+        # claimed by processes that died while screening it
+        if job["attempts"] > SCREENING_MAX_ATTEMPTS:
+            results.append({"id": job["id"], "error": f"Gave up after {SCREENING_MAX_ATTEMPTS} attempts"})
+        elif not job["key"]:
+            results.append({"id": job["id"], "error": "The CV file is missing from storage"})
+        elif job["role"] is None:
+            results.append({"id": job["id"], "error": "The role no longer exists"})
+        else:
+            runnable.append(job)
+    if runnable:
+        batch_stats["batches"] += 1
+        batch_stats["screenings"] += len(runnable)
+        batch_stats["largest"] = max(batch_stats["largest"], len(runnable))
+        try:
+            results += await runner(screen_batch, runnable)
+        except PoolSaturated:
+            # No worker took the batch, so the claim's attempt is handed back
+            results += [{"id": job["id"], "deferred": True} for job in runnable]
+        except Exception as e:
+            # Broken pool or worker error: the whole batch is retried later
+            results += [{"id": job["id"], "retry": f"{type(e).__name__}: {e}"} for job in runnable]
+    return await record_results(sessions, jobs, results)
+
+
+async def run_screening_dispatcher(sessions=AsyncSessionLocal, runner=None) -> None:
+    """
+    Background task started by the app lifespan. Claims one batch per free
+    worker and screens batches concurrently; what is not claimed waits in
+    the table, where any process can pick it up.
+    """
+    slots = asyncio.Semaphore(screening_pool.max_workers + screening_pool.max_pending)
+    batches: set = set()
+
+    def finished(task: asyncio.Task) -> None:
+        batches.discard(task)
+        slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Screening batch failed: {task.exception()}")
+        # A free worker may have more to do
+        _wakeup.set()
+
+    try:
+        while True:
+            _wakeup.clear()
+            await slots.acquire()
+            jobs = []
+            try:
+                # Let a burst of requests gather into one batch
+                await asyncio.sleep(SCREENING_BATCH_WINDOW_MS / 1000)
+                jobs = await claim_batch(sessions)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Screening dispatcher failed: {e}")
+            if jobs:
+                task = asyncio.create_task(screen_claimed(sessions, jobs, runner))
+                batches.add(task)
+                task.add_done_callback(finished)
+                continue
+            slots.release()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), SCREENING_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        # Unfinished batches keep their lease and are retried once it expires
+        for task in batches:
+            task.cancel()
+
+
+async def screening_stats(session: AsyncSession) -> dict:
+    counts = dict((await session.execute(
+        select(Screening.status, func.count()).group_by(Screening.status)
+    )).all())
+    return {"counts": counts, "batches": dict(batch_stats), "pool": screening_pool.stats()}
+
+
+def _on_screening(_payload: str | None) -> None:
+    _wakeup.set()
+
+
+on_notification(SCREENING_CHANNEL, _on_screening)
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import random
+from datetime import timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import storage
+from app.database import AsyncSessionLocal
+from app.models.storage_orphan_model import StorageOrphan
+
+# Request handlers never delete from object storage: they record the key in
+# storage_orphans in the same transaction as the row delete, and this reaper
+# removes the objects in batches.
+
+STORAGE_REAPER_BATCH_SIZE = min(int(os.getenv("STORAGE_REAPER_BATCH_SIZE", 500)), storage.DELETE_BATCH_MAX_KEYS)
+STORAGE_REAPER_POLL_SECONDS = float(os.getenv("STORAGE_REAPER_POLL_SECONDS", 30))
+STORAGE_REAPER_RETRY_BASE_SECONDS = float(os.getenv("STORAGE_REAPER_RETRY_BASE_SECONDS", 30))
+STORAGE_REAPER_RETRY_MAX_SECONDS = float(os.getenv("STORAGE_REAPER_RETRY_MAX_SECONDS", 6 * 3600))
+
+
+async def enqueue_orphan(session: AsyncSession, key: str) -> None:
+    """Schedule an object for deletion once the caller commits"""
+    await session.execute(
+        pg_insert(StorageOrphan).values(key=key).on_conflict_do_nothing(index_elements=[StorageOrphan.key])
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(STORAGE_REAPER_RETRY_BASE_SECONDS * 2 ** (attempts - 1), STORAGE_REAPER_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def reap_batch(sessions=AsyncSessionLocal) -> int:
+    """
+    Delete one batch of due orphans with a single DeleteObjects request.
+    Returns how many keys were claimed (0 when nothing is due). Claimed rows
+    stay locked (SKIP LOCKED for other reapers) until the outcome is committed.
+    """
+    async with sessions() as session:
+        orphans = (await session.execute(
+            select(StorageOrphan)
+            .where(StorageOrphan.next_attempt_at <= func.now())
+            .order_by(StorageOrphan.next_attempt_at)
+            .limit(STORAGE_REAPER_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not orphans:
+            return 0
+
+        try:
+            errors = await storage.run(storage.delete_objects, [orphan.key for orphan in orphans])
+        except Exception as e:
+            # Storage unreachable: the whole batch backs off
+            errors = {orphan.key: f"{type(e).__name__}: {e}" for orphan in orphans}
+
+        done = [orphan.id for orphan in orphans if orphan.key not in errors]
+        if done:
+            await session.execute(delete(StorageOrphan).where(StorageOrphan.id.in_(done)))
+        for orphan in orphans:
+            if orphan.key in errors:
+                orphan.attempts += 1
+                orphan.last_error = errors[orphan.key][:2000]
+                orphan.next_attempt_at = func.now() + timedelta(seconds=retry_delay(orphan.attempts))
+        await session.commit()
+        return len(orphans)
+
+
+async def run_storage_reaper(sessions=AsyncSessionLocal) -> None:
+    """Background task started by the app lifespan"""
+    while True:
+        try:
+            while await reap_batch(sessions) == STORAGE_REAPER_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Storage reaper failed: {e}")
+        await asyncio.sleep(STORAGE_REAPER_POLL_SECONDS)
+
+
+async def orphan_stats(session: AsyncSession) -> dict:
+    """Reaper backlog for the internal endpoint"""
+    row = (await session.execute(
+        select(
+            func.count(),
+            func.count().filter(StorageOrphan.attempts > 0),
+            func.min(StorageOrphan.enqueued_at),
+        )
+    )).one()
+    return {"pending": row[0], "retrying": row[1], "oldest_enqueued_at": row[2]}
@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from sqlalchemy import Integer, delete, func, literal, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.transaction_model import Transaction
+from app.models.wallet_model import Wallet
+from app.user_cache import USER_CHANNEL
+
+
+class InsufficientCredits(Exception):
+    """A debit would take the wallet below zero; nothing was written"""
+
+
+@dataclass
+class LedgerEntry:
+    transaction_id: int
+    balance_credits: int | None
+    applied: bool  # False when the idempotency key had already been used
+
+
+async def get_balance(session: AsyncSession, user_id: int) -> int:
+    """Current balance; a user without a wallet row has 0 credits"""
+    balance = (await session.execute(select(Wallet.balance_credits).where(Wallet.user_id == user_id))).scalar()
+    return balance or 0
+
+
+async def post_entry(
+    session: AsyncSession,
+    user_id: int,
+    credits: int,
+    *,
+    type: str,
+    idempotency_key: str | None = None,
+    allow_negative: bool = False,
+    amount_inr: Decimal | None = None,
+    currency: str | None = None,
+    payment_gateway: str | None = None,
+    external_ref: str | None = None,
+) -> LedgerEntry:
+    """
+    Move credits in or out of a wallet (credits is signed) and record the
+    transaction, in a single statement.
+
+    The transaction insert runs first and the wallet change only happens for a
+    row it actually inserted, so a repeated idempotency_key is a no-op (applied
+    is False and the original entry is returned). Balances are changed with
+    balance_credits = balance_credits + n under the row lock, never read and
+    written back, so concurrent entries cannot lose updates.
+
+    Unless allow_negative is set, a debit larger than the balance raises
+    InsufficientCredits and leaves nothing behind. Credits create the wallet if
+    it is missing. The caller commits, then calls invalidate_user; other
+    processes are notified on commit.
+    """
+    entry_insert = pg_insert(Transaction).values(
+        user_id=user_id,
+        type=type,
+        credits=credits,
+        amount_inr=amount_inr,
+        currency=currency,
+        payment_gateway=payment_gateway,
+        external_ref=external_ref,
+        status="success",
+        idempotency_key=idempotency_key,
+    )
+    if idempotency_key is not None:
+        # Waits for a concurrent holder of the same key, then does nothing
+        entry_insert = entry_insert.on_conflict_do_nothing(index_elements=[Transaction.idempotency_key])
+    entry_cte = entry_insert.returning(Transaction.id).cte("entry")
+
+    if credits >= 0 or allow_negative:
+        wallet_insert = pg_insert(Wallet).from_select(
+            ["user_id", "balance_credits"],
+            select(literal(user_id, Integer), literal(credits, Integer)).select_from(entry_cte),
+        )
+        wallet_cte = wallet_insert.on_conflict_do_update(
+            index_elements=[Wallet.user_id],
+            set_={
+                "balance_credits": Wallet.balance_credits + wallet_insert.excluded.balance_credits,
+                "updated_at": func.now(),
+            },
+        ).returning(Wallet.balance_credits).cte("moved")
+    else:
+        # The balance check is re-evaluated against the latest row version once
+        # the lock is granted, so parallel debits cannot overdraw
+        wallet_cte = (
+            update(Wallet)
+            .where(
+                Wallet.user_id == user_id,
+                Wallet.balance_credits + credits >= 0,
+                select(entry_cte.c.id).exists(),
+            )
+            .values(balance_credits=Wallet.balance_credits + credits, updated_at=func.now())
+            .returning(Wallet.balance_credits)
+            .cte("moved")
+        )
+
+    stmt = select(
+        entry_cte.c.id,
+        wallet_cte.c.balance_credits,
+        func.pg_notify(USER_CHANNEL, str(user_id)),
+    ).select_from(entry_cte.outerjoin(wallet_cte, true()))
+    row = (await session.execute(stmt)).first()
+
+    if row is None:
+        existing = (await session.execute(
+            select(Transaction.id, Wallet.balance_credits)
+            .outerjoin(Wallet, Wallet.user_id == Transaction.user_id)
+            .where(Transaction.idempotency_key == idempotency_key)
+        )).one()
+        return LedgerEntry(transaction_id=existing.id, balance_credits=existing.balance_credits, applied=False)
+
+    if row.balance_credits is None:
+        await session.execute(delete(Transaction).where(Transaction.id == row.id))
+        raise InsufficientCredits()
+
+    return LedgerEntry(transaction_id=row.id, balance_credits=row.balance_credits, applied=True)
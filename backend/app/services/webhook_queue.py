@@ -0,0 +1,173 @@
+import asyncio
+import os
+import random
+from datetime import timedelta
+from sqlalchemy import String, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.database import AsyncSessionLocal
+from app.invalidation import on_notification
+from app.models.webhook_event_model import WebhookEvent
+from app.services.payment_events import PermanentWebhookError, apply_razorpay_event
+
+# Webhooks are recorded by the request handler and applied by these workers,
+# so the gateway gets its 200 without waiting on payment processing.
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 2))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 8))
+WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", 5))
+WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", 3600))
+# Fallback polling when a wake-up notification is missed
+WEBHOOK_POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", 5))
+
+WEBHOOK_CHANNEL = "webhook_events"
+
+# provider -> async handler(session, payload, signature); handlers never commit
+WEBHOOK_HANDLERS = {
+    "razorpay": apply_razorpay_event,
+}
+
+_wakeup = asyncio.Event()
+
+
+async def enqueue_event(
+    session: AsyncSession,
+    provider: str,
+    event_id: str,
+    order_id: str | None,
+    payload: dict,
+    signature: str | None = None,
+) -> bool:
+    """
+    Record an event unless this provider already delivered event_id, and wake
+    the workers once the caller commits. Returns False for a duplicate.
+    """
+    inserted = (
+        pg_insert(WebhookEvent)
+        .values(provider=provider, event_id=event_id, order_id=order_id, payload=payload, signature=signature)
+        .on_conflict_do_nothing(index_elements=[WebhookEvent.provider, WebhookEvent.event_id])
+        .returning(WebhookEvent.id)
+        .cte("inserted")
+    )
+    stmt = select(inserted.c.id, func.pg_notify(WEBHOOK_CHANNEL, cast(inserted.c.id, String)))
+    return (await session.execute(stmt)).first() is not None
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, so a gateway outage does not retry in lockstep"""
+    delay = min(WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1), WEBHOOK_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def process_next(sessions=AsyncSessionLocal) -> bool:
+    """
+    Claim one due event and apply it. Returns False when nothing is due.
+
+    An event is only claimable when no earlier event for the same order is
+    still pending, so each order's events are applied in arrival order even
+    with many workers. The row stays locked (SKIP LOCKED for other workers)
+    until the outcome is committed with it.
+    """
+    async with sessions() as session:
+        earlier = aliased(WebhookEvent)
+        event = (await session.execute(
+            select(WebhookEvent)
+            .where(
+                WebhookEvent.status == "pending",
+                WebhookEvent.next_attempt_at <= func.now(),
+                ~select(earlier.id).where(
+                    earlier.order_id == WebhookEvent.order_id,
+                    earlier.status == "pending",
+                    earlier.id < WebhookEvent.id,
+                ).exists(),
+            )
+            .order_by(WebhookEvent.next_attempt_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalars().first()
+        if event is None:
+            return False
+
+        event.attempts += 1
+        try:
+            handler = WEBHOOK_HANDLERS.get(event.provider)
+            if handler is None:
+                raise PermanentWebhookError(f"No handler for provider {event.provider}")
+            # A savepoint lets the failure be recorded in the same transaction
+            async with session.begin_nested():
+                await handler(session, event.payload, event.signature)
+            event.status = "done"
+            event.processed_at = func.now()
+            event.last_error = None
+        except Exception as e:
+            event.last_error = f"{type(e).__name__}: {e}"[:2000]
+            if isinstance(e, PermanentWebhookError) or event.attempts >= WEBHOOK_MAX_ATTEMPTS:
+                event.status = "dead"
+            else:
+                event.next_attempt_at = func.now() + timedelta(seconds=retry_delay(event.attempts))
+        await session.commit()
+        return True
+
+
+async def run_webhook_worker(sessions=AsyncSessionLocal) -> None:
+    """Background task started by the app lifespan (WEBHOOK_WORKERS of them)"""
+    while True:
+        _wakeup.clear()
+        try:
+            while await process_next(sessions):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Webhook worker failed: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), WEBHOOK_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def list_events(session: AsyncSession, status: str, limit: int) -> dict:
+    """Queue depth per status and the most recent events in one status (dead letters by default)"""
+    counts = dict((await session.execute(
+        select(WebhookEvent.status, func.count()).group_by(WebhookEvent.status)
+    )).all())
+    events = (await session.execute(
+        select(WebhookEvent).where(WebhookEvent.status == status).order_by(WebhookEvent.id.desc()).limit(limit)
+    )).scalars().all()
+    return {
+        "counts": counts,
+        "events": [
+            {
+                "id": e.id,
+                "provider": e.provider,
+                "event_id": e.event_id,
+                "order_id": e.order_id,
+                "status": e.status,
+                "attempts": e.attempts,
+                "last_error": e.last_error,
+                "received_at": e.received_at,
+                "next_attempt_at": e.next_attempt_at,
+                "processed_at": e.processed_at,
+            }
+            for e in events
+        ],
+    }
+
+
+async def requeue_event(session: AsyncSession, event_id: int) -> bool:
+    """Give a dead event a fresh set of attempts. Returns False if it is not dead. The caller commits."""
+    requeued = (await session.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id == event_id, WebhookEvent.status == "dead")
+        .values(status="pending", attempts=0, next_attempt_at=func.now(), last_error=None)
+        .returning(WebhookEvent.id, func.pg_notify(WEBHOOK_CHANNEL, cast(WebhookEvent.id, String)))
+    )).first()
+    return requeued is not None
+
+
+def _on_webhook_event(_payload: str | None) -> None:
+    _wakeup.set()
+
+
+on_notification(WEBHOOK_CHANNEL, _on_webhook_event)
@@ -0,0 +1,248 @@
+import hashlib
+import math
+import os
+import threading
+import uuid
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from app.process_pool import BoundedThreadPool
+
+# S3/MinIO object storage for uploaded CVs. Browsers upload straight to the
+# bucket with presigned requests; the API only signs and verifies.
+
+STORAGE_ENDPOINT = os.getenv("STORAGE_ENDPOINT", "http://127.0.0.1:9000")
+STORAGE_BUCKET = os.getenv("STORAGE_BUCKET", "cvs")
+STORAGE_ACCESS_KEY = os.getenv("STORAGE_ACCESS_KEY")
+STORAGE_SECRET_KEY = os.getenv("STORAGE_SECRET_KEY")
+STORAGE_REGION = os.getenv("STORAGE_REGION", "us-east-1")  # Default region for MinIO
+
+# Blocking boto3 calls run on their own bounded thread pool; the client's
+# connection pool matches it so a thread never waits for a connection
+STORAGE_MAX_WORKERS = int(os.getenv("STORAGE_MAX_WORKERS", 8))
+STORAGE_MAX_PENDING = int(os.getenv("STORAGE_MAX_PENDING", 64))
+STORAGE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("STORAGE_CONNECT_TIMEOUT_SECONDS", 3))
+STORAGE_READ_TIMEOUT_SECONDS = float(os.getenv("STORAGE_READ_TIMEOUT_SECONDS", 10))
+STORAGE_MAX_ATTEMPTS = int(os.getenv("STORAGE_MAX_ATTEMPTS", 3))
+
+CV_MAX_UPLOAD_BYTES = int(os.getenv("CV_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+# S3 requires at least 5 MiB for every part but the last
+CV_MULTIPART_PART_BYTES = max(int(os.getenv("CV_MULTIPART_PART_BYTES", 5 * 1024 * 1024)), 5 * 1024 * 1024)
+UPLOAD_URL_EXPIRES_SECONDS = int(os.getenv("UPLOAD_URL_EXPIRES_SECONDS", 3600))
+DOWNLOAD_URL_EXPIRES_SECONDS = 900
+# DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_MAX_KEYS = 1000
+
+ALLOWED_CV_MIME_TYPES = [
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+]
+
+storage_pool = BoundedThreadPool("storage", STORAGE_MAX_WORKERS, STORAGE_MAX_PENDING)
+
+
+def build_s3_client(endpoint: str = STORAGE_ENDPOINT, access_key: str | None = STORAGE_ACCESS_KEY,
+                    secret_key: str | None = STORAGE_SECRET_KEY):
+    # A private Session: boto3's default session is not safe to create clients
+    # from concurrently. The client itself is thread-safe once built.
+    return boto3.session.Session().client(
+        's3',
+        endpoint_url=endpoint,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=STORAGE_REGION,
+        # Presigned POST policies need SigV4; MinIO wants path-style bucket URLs
+        config=Config(
+            signature_version="s3v4",
+            s3={"addressing_style": "path"},
+            max_pool_connections=STORAGE_MAX_WORKERS,
+            connect_timeout=STORAGE_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=STORAGE_READ_TIMEOUT_SECONDS,
+            retries={"max_attempts": STORAGE_MAX_ATTEMPTS, "mode": "standard"},
+        ),
+    )
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Process-wide client, built on first use by whichever thread gets there first"""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = build_s3_client()
+    return _s3_client
+
+
+def set_s3_client(client) -> None:
+    """Swap the client (tests point it at a local S3 stand-in)"""
+    global _s3_client
+    _s3_client = client
+
+
+async def run(fn, *args):
+    """Run a blocking storage call on the storage pool (PoolSaturated when it is backed up)"""
+    return await storage_pool.run(fn, *args)
+
+
+def new_cv_key(user_id: int, filename: str) -> str:
+    """Object keys are namespaced by owner; confirm steps check this prefix"""
+    extension = filename.rsplit('.', 1)[-1] if '.' in filename else 'bin'
+    return f"{user_id}/{uuid.uuid4()}.{extension}"
+
+
+def owns_key(user_id: int, key: str) -> bool:
+    return key.startswith(f"{user_id}/") and ".." not in key
+
+
+def object_url(key: str) -> str:
+    return f"{STORAGE_ENDPOINT}/{STORAGE_BUCKET}/{key}"
+
+
+def key_from_url(storage_url: str) -> str | None:
+    # storage_url format: http://127.0.0.1:9000/cvs/user_id/uuid.pdf
+    parts = storage_url.split(f"{STORAGE_BUCKET}/", 1)
+    return parts[1] if len(parts) == 2 else None
+
+
+def presign_post(key: str, mime_type: str) -> dict:
+    """
+    Presigned POST whose policy pins the key and content type and makes the
+    storage service itself refuse bodies over CV_MAX_UPLOAD_BYTES.
+    Returns {"url", "fields"}; the file goes last in the multipart form.
+    """
+    return get_s3_client().generate_presigned_post(
+        Bucket=STORAGE_BUCKET,
+        Key=key,
+        Fields={"Content-Type": mime_type},
+        Conditions=[
+            {"Content-Type": mime_type},
+            ["content-length-range", 1, CV_MAX_UPLOAD_BYTES],
+        ],
+        ExpiresIn=UPLOAD_URL_EXPIRES_SECONDS,
+    )
+
+
+def part_sizes(size_bytes: int) -> list[int]:
+    count = max(1, math.ceil(size_bytes / CV_MULTIPART_PART_BYTES))
+    return [min(CV_MULTIPART_PART_BYTES, size_bytes - i * CV_MULTIPART_PART_BYTES) for i in range(count)]
+
+
+def start_multipart_upload(key: str, mime_type: str, size_bytes: int) -> dict:
+    """
+    Blocking. Start a multipart upload and presign one PUT per part. Each
+    part URL is signed for its exact Content-Length, so the parts cannot add
+    up to more than the declared size.
+    """
+    s3_client = get_s3_client()
+    upload_id = s3_client.create_multipart_upload(Bucket=STORAGE_BUCKET, Key=key, ContentType=mime_type)["UploadId"]
+    parts = [
+        {
+            "part_number": number,
+            "size_bytes": size,
+            "url": s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': STORAGE_BUCKET,
+                    'Key': key,
+                    'UploadId': upload_id,
+                    'PartNumber': number,
+                    'ContentLength': size,
+                },
+                ExpiresIn=UPLOAD_URL_EXPIRES_SECONDS,
+            ),
+        }
+        for number, size in enumerate(part_sizes(size_bytes), start=1)
+    ]
+    return {"upload_id": upload_id, "part_size": CV_MULTIPART_PART_BYTES, "parts": parts}
+
+
+def complete_multipart_upload(key: str, upload_id: str, parts: list[dict]) -> None:
+    """Blocking. parts: [{"PartNumber": n, "ETag": etag}, ...]"""
+    get_s3_client().complete_multipart_upload(
+        Bucket=STORAGE_BUCKET,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+    )
+
+
+def abort_multipart_upload(key: str, upload_id: str) -> None:
+    """Blocking. Frees the parts uploaded so far"""
+    get_s3_client().abort_multipart_upload(Bucket=STORAGE_BUCKET, Key=key, UploadId=upload_id)
+
+
+def head_object(key: str) -> dict | None:
+    """Blocking. The stored object's real size and content type, or None if it does not exist"""
+    try:
+        head = get_s3_client().head_object(Bucket=STORAGE_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return {"size_bytes": head["ContentLength"], "mime_type": head.get("ContentType")}
+
+
+def copy_object_to(key: str, out, max_bytes: int = CV_MAX_UPLOAD_BYTES, chunk_bytes: int = 64 * 1024,
+                   hasher=None) -> int | None:
+    """
+    Blocking. Stream an object into a writable file object (and/or a
+    hashlib hasher) chunk by chunk, never holding more than one chunk in
+    memory. Returns its size, or None if it does not exist; ValueError once
+    it exceeds max_bytes.
+    """
+    try:
+        body = get_s3_client().get_object(Bucket=STORAGE_BUCKET, Key=key)["Body"]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    size = 0
+    with body:
+        for chunk in body.iter_chunks(chunk_bytes):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"Object is larger than {max_bytes} bytes")
+            if hasher is not None:
+                hasher.update(chunk)
+            if out is not None:
+                out.write(chunk)
+    return size
+
+
+def hash_object(key: str) -> str | None:
+    """Blocking. Hex SHA-256 of an object, streamed; None if it does not exist"""
+    digest = hashlib.sha256()
+    if copy_object_to(key, None, hasher=digest) is None:
+        return None
+    return digest.hexdigest()
+
+
+def delete_object(key: str) -> None:
+    """Blocking"""
+    get_s3_client().delete_object(Bucket=STORAGE_BUCKET, Key=key)
+
+
+def delete_objects(keys: list[str]) -> dict[str, str]:
+    """
+    Blocking. Delete up to DELETE_BATCH_MAX_KEYS objects in one request.
+    Returns {key: error} for the keys that could not be deleted; keys that
+    are already gone count as deleted.
+    """
+    response = get_s3_client().delete_objects(
+        Bucket=STORAGE_BUCKET,
+        Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+    )
+    return {error["Key"]: f"{error.get('Code')}: {error.get('Message')}" for error in response.get("Errors", [])}
+
+
+def presign_download(key: str) -> str:
+    return get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': STORAGE_BUCKET, 'Key': key},
+        ExpiresIn=DOWNLOAD_URL_EXPIRES_SECONDS,
+    )
@@ -0,0 +1,70 @@
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.invalidation import notify, on_notification
+from app.models.user_model import User
+import os
+
+# Short-lived, per-process cache of authenticated users keyed by user id.
+# Entries are detached ORM rows: read their attributes, never add them back to a session.
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+# Serialized /me responses; dropped on change notifications, the TTL is a fallback
+USER_SNAPSHOT_TTL_SECONDS = int(os.getenv("USER_SNAPSHOT_TTL_SECONDS", 300))
+
+USER_CHANNEL = "user_changed"
+
+_users = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)  # TTL + LRU eviction
+_snapshots = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_SNAPSHOT_TTL_SECONDS)
+# Bumped on every invalidation so a load that raced with one is not cached
+_generation = 0
+
+
+def get_cached_user(user_id: int) -> User | None:
+    return _users.get(user_id)
+
+
+def cache_user(user: User) -> None:
+    _users[user.id] = user
+
+
+def get_cached_snapshot(user_id: int) -> bytes | None:
+    return _snapshots.get(user_id)
+
+
+def snapshot_generation() -> int:
+    """Take before loading a snapshot and pass to cache_snapshot"""
+    return _generation
+
+
+def cache_snapshot(user_id: int, body: bytes, generation: int) -> None:
+    if generation == _generation:
+        _snapshots[user_id] = body
+
+
+def invalidate_user(user_id: int) -> None:
+    global _generation
+    _generation += 1
+    _users.pop(user_id, None)
+    _snapshots.pop(user_id, None)
+
+
+async def notify_user_changed(session: AsyncSession, user_id: int) -> None:
+    """
+    Tell every API process to drop this user's cached entries once the
+    caller's transaction commits. Callers also call invalidate_user after
+    committing so their own process never serves the old snapshot.
+    """
+    await notify(session, USER_CHANNEL, str(user_id))
+
+
+def _on_user_changed(payload: str | None) -> None:
+    global _generation
+    if payload is None:
+        _generation += 1
+        _users.clear()
+        _snapshots.clear()
+    else:
+        invalidate_user(int(payload))
+
+
+on_notification(USER_CHANNEL, _on_user_changed)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Streaming interview load harness: many candidates hold a WebSocket (or the
+SSE fallback) open to their interview while answering every question.
+
+Start one API worker against a local Postgres with the stub question model
+(STUB_QUESTION_MODEL_LATENCY_MS / STUB_QUESTION_MODEL_TOKEN_MS simulate the
+model), then:
+    python benchmarks/bench_interview_streams.py --sessions 2000 --database-url postgresql://postgres@localhost/app \
+        --internal-token $INTERNAL_API_TOKEN --server-pid $(pgrep -f "uvicorn app.main:app")
+
+Candidates answer in chunks after --think-ms; a long think time keeps every
+session open at once. Reports outcomes, peak open streams, time from an
+answer to the first feedback token and from the feedback to the first token
+of the next question and, with --server-pid, the worker's resident memory
+per open session.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+from websockets.asyncio.client import connect
+
+from bench_interviews import percentile, prepare_database
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        email_prefix = f"bench-streams-{uuid.uuid4().hex[:8]}-"
+        tokens = []
+        for n in range(args.users):
+            response = await client.post(
+                "/api/v1/auth/register",
+                json={"name": "Bench User", "email": f"{email_prefix}{n}@example.com", "password": "benchpassword123"},
+            )
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+        prepare_database(args.database_url, email_prefix, -(-args.sessions // args.users) * 5)
+        role_id = (await client.get("/api/v1/roles")).json()[0]["id"]
+        ws_base = args.base_url.replace("http", "ws", 1)
+        answer = "I would start by measuring, then fix the biggest bottleneck first. "
+        chunks = [answer[i:i + 16] for i in range(0, len(answer), 16)]
+
+        first_feedback_ms: list[float] = []
+        next_question_ms: list[float] = []
+        outcomes: dict[str, int] = {}
+        baseline_rss = rss_bytes(args.server_pid) if args.server_pid else 0
+        peak = {"streams": 0, "rss": baseline_rss}
+        finished = asyncio.Event()
+
+        def count(outcome: str) -> None:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        async def over_websocket(interview_id: int, token: str) -> None:
+            async with connect(f"{ws_base}/api/v1/interviews/{interview_id}/ws?token={token}", max_queue=64) as ws:
+                answered_at = feedback_at = None
+                async for message in ws:
+                    event = json.loads(message)
+                    kind = event["type"]
+                    if kind == "feedback_delta" and answered_at:
+                        first_feedback_ms.append((time.perf_counter() - answered_at) * 1000)
+                        answered_at = None
+                    elif kind == "feedback":
+                        feedback_at = time.perf_counter()
+                    elif kind == "question_delta" and feedback_at:
+                        next_question_ms.append((time.perf_counter() - feedback_at) * 1000)
+                        feedback_at = None
+                    elif kind == "end":
+                        count(event["status"] if event["status"] == "done" else f"failed: {event['failure_reason']}")
+                        return
+                    if kind == "question" or (kind == "snapshot" and event["current_question"]):
+                        turn_index = event["turn_index"] if kind == "question" else event["turns"][-1]["turn_index"]
+                        await asyncio.sleep(args.think_ms / 1000)
+                        for chunk in chunks:
+                            await ws.send(json.dumps({"type": "answer_chunk", "turn_index": turn_index, "text": chunk}))
+                        await ws.send(json.dumps({"type": "answer_end", "turn_index": turn_index}))
+                        answered_at = time.perf_counter()
+                count("closed early")
+
+        async def over_sse(interview_id: int, token: str) -> None:
+            headers = {"Authorization": f"Bearer {token}"}
+            async with client.stream("GET", f"/api/v1/interviews/{interview_id}/events", headers=headers, timeout=None) as response:
+                answered_at = feedback_at = None
+                kind = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        kind = line[7:]
+                        continue
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if kind == "feedback_delta" and answered_at:
+                        first_feedback_ms.append((time.perf_counter() - answered_at) * 1000)
+                        answered_at = None
+                    elif kind == "feedback":
+                        feedback_at = time.perf_counter()
+                    elif kind == "question_delta" and feedback_at:
+                        next_question_ms.append((time.perf_counter() - feedback_at) * 1000)
+                        feedback_at = None
+                    elif kind == "end":
+                        count(event["status"] if event["status"] == "done" else f"failed: {event['failure_reason']}")
+                        return
+                    if kind == "question" or (kind == "snapshot" and event["current_question"]):
+                        await asyncio.sleep(args.think_ms / 1000)
+                        await client.post(
+                            f"/api/v1/interviews/{interview_id}/answer", json={"answer": answer}, headers=headers
+                        )
+                        answered_at = time.perf_counter()
+                count("closed early")
+
+        async def candidate(token: str) -> None:
+            r = await client.post(
+                "/api/v1/interviews/start", json={"role_id": role_id}, headers={"Authorization": f"Bearer {token}"}
+            )
+            if r.status_code != 200:
+                count(f"start {r.status_code}: {r.json().get('detail', '')[:60]}")
+                return
+            try:
+                if args.transport == "ws":
+                    await over_websocket(r.json()["id"], token)
+                else:
+                    await over_sse(r.json()["id"], token)
+            except Exception as e:
+                count(f"{type(e).__name__}: {str(e)[:60]}")
+
+        async def sample() -> None:
+            while not finished.is_set():
+                if args.internal_token:
+                    r = await client.get("/api/v1/internal/interviews", headers={"X-Internal-Token": args.internal_token})
+                    if r.status_code == 200:
+                        streams = r.json()["open_streams"]
+                        if streams > peak["streams"]:
+                            # Memory is measured when the most sessions are open together
+                            peak["streams"] = streams
+                            if args.server_pid:
+                                peak["rss"] = rss_bytes(args.server_pid)
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample())
+        began = time.perf_counter()
+        candidates = []
+        for n in range(args.sessions):
+            candidates.append(asyncio.create_task(candidate(tokens[n % args.users])))
+            if args.ramp_ms:
+                await asyncio.sleep(args.ramp_ms / 1000)
+        await asyncio.gather(*candidates)
+        elapsed = time.perf_counter() - began
+        finished.set()
+        await sampler
+
+    print(f"Sessions:           {args.sessions} over {args.transport} ({elapsed:.1f} s)")
+    print(f"Outcomes:           {outcomes}")
+    if args.internal_token:
+        print(f"Peak open streams:  {peak['streams']}")
+    if first_feedback_ms:
+        print(f"First feedback token p50/p99: {statistics.median(first_feedback_ms):.1f} / {percentile(first_feedback_ms, 0.99):.1f} ms")
+    if next_question_ms:
+        print(f"Next question token p50/p99:  {statistics.median(next_question_ms):.1f} / {percentile(next_question_ms, 0.99):.1f} ms")
+    if args.server_pid and peak["streams"]:
+        grown = peak["rss"] - baseline_rss
+        print(f"Worker RSS:         {baseline_rss / 2**20:.1f} MiB idle, {peak['rss'] / 2**20:.1f} MiB with {peak['streams']} open streams")
+        print(f"Memory per session: {grown / peak['streams'] / 1024:.1f} KiB (includes the worker's allocator growth)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database-url", required=True, help="to grant the bench users credits")
+    parser.add_argument("--internal-token", help="INTERNAL_API_TOKEN, to sample open streams")
+    parser.add_argument("--server-pid", type=int, help="API worker pid, to sample its resident memory")
+    parser.add_argument("--transport", choices=("ws", "sse"), default="ws")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=100, help="HTTP connections for starts and SSE answers")
+    parser.add_argument("--think-ms", type=float, default=5000)
+    parser.add_argument("--ramp-ms", type=float, default=2, help="delay between candidate starts")
+    args = parser.parse_args()
+    if args.transport == "sse":
+        # Every SSE stream holds one connection for the whole interview
+        args.connections = max(args.connections, args.sessions + 10)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
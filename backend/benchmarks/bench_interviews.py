@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Interview engine load harness: many concurrent candidates, each starting an
+interview and answering every question.
+
+Start the API against a local Postgres with the stub question model (add a
+simulated model round-trip with STUB_QUESTION_MODEL_LATENCY_MS=200), then:
+    python benchmarks/bench_interviews.py --sessions 2000 --database-url postgresql://postgres@localhost/app
+
+Registers throwaway users and grants them credits directly in the database
+(--database-url), since buying credits needs a payment; adds a role if there
+is none. Candidates poll for their next question every --poll-ms and answer
+after --think-ms. Reports start latency, time from an answer to the next question, outcomes
+and, with --internal-token, the peak number of live sessions on the server.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import create_engine, text
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[max(int(len(values) * p) - 1, 0)] if values else 0.0
+
+
+def prepare_database(database_url: str, email_prefix: str, credits: int) -> None:
+    """Grant the bench users credits, and add a role if the catalog is empty"""
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO wallets (user_id, balance_credits) SELECT id, :credits FROM users WHERE email LIKE :pattern "
+            "ON CONFLICT (user_id) DO UPDATE SET balance_credits = wallets.balance_credits + :credits"
+        ), {"credits": credits, "pattern": f"{email_prefix}%"})
+        conn.execute(text(
+            "INSERT INTO roles (title, description, tags, is_active) "
+            "SELECT 'Software Engineer', 'Benchmark role', '{}', true WHERE NOT EXISTS (SELECT 1 FROM roles WHERE is_active)"
+        ))
+    engine.dispose()
+
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        # Several users, so starts do not all queue on one wallet row
+        email_prefix = f"bench-interviews-{uuid.uuid4().hex[:8]}-"
+        users = []
+        for n in range(args.users):
+            response = await client.post(
+                "/api/v1/auth/register",
+                json={"name": "Bench User", "email": f"{email_prefix}{n}@example.com", "password": "benchpassword123"},
+            )
+            response.raise_for_status()
+            users.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+        prepare_database(args.database_url, email_prefix, -(-args.sessions // args.users) * 5)
+        role_id = (await client.get("/api/v1/roles")).json()[0]["id"]
+
+        start_ms: list[float] = []
+        turn_ms: list[float] = []
+        outcomes: dict[str, int] = {}
+        peak_live = 0
+        finished = asyncio.Event()
+
+        async def candidate(headers: dict) -> None:
+            began = time.perf_counter()
+            r = await client.post("/api/v1/interviews/start", json={"role_id": role_id}, headers=headers)
+            start_ms.append((time.perf_counter() - began) * 1000)
+            if r.status_code != 200:
+                outcomes[f"start {r.status_code}"] = outcomes.get(f"start {r.status_code}", 0) + 1
+                return
+            interview_id = r.json()["id"]
+            answered_at = time.perf_counter()
+            answered_turns = 0
+            while True:
+                state = (await client.get(f"/api/v1/interviews/{interview_id}", headers=headers)).json()
+                if state["status"] in ("done", "failed"):
+                    outcomes[state["status"]] = outcomes.get(state["status"], 0) + 1
+                    return
+                if state["current_question"] and len(state["turns"]) > answered_turns:
+                    turn_ms.append((time.perf_counter() - answered_at) * 1000)
+                    await asyncio.sleep(args.think_ms / 1000)
+                    await client.post(
+                        f"/api/v1/interviews/{interview_id}/answer",
+                        json={"answer": "I would start by measuring, then fix the biggest bottleneck first."},
+                        headers=headers,
+                    )
+                    answered_turns += 1
+                    answered_at = time.perf_counter()
+                await asyncio.sleep(args.poll_ms / 1000)
+
+        async def watch_live() -> None:
+            nonlocal peak_live
+            while not finished.is_set():
+                r = await client.get("/api/v1/internal/interviews", headers={"X-Internal-Token": args.internal_token})
+                if r.status_code == 200:
+                    peak_live = max(peak_live, r.json()["live_sessions"])
+                await asyncio.sleep(0.5)
+
+        watcher = asyncio.create_task(watch_live()) if args.internal_token else None
+        began = time.perf_counter()
+        candidates = []
+        for n in range(args.sessions):
+            candidates.append(asyncio.create_task(candidate(users[n % args.users])))
+            if args.ramp_ms:
+                await asyncio.sleep(args.ramp_ms / 1000)
+        await asyncio.gather(*candidates)
+        elapsed = time.perf_counter() - began
+        finished.set()
+        if watcher:
+            await watcher
+
+    print(f"Sessions:           {args.sessions} ({elapsed:.1f} s)")
+    print(f"Outcomes:           {outcomes}")
+    if watcher:
+        print(f"Peak live sessions: {peak_live}")
+    print(f"Start p50/p99:      {statistics.median(start_ms):.1f} / {percentile(start_ms, 0.99):.1f} ms")
+    if turn_ms:
+        print(f"Next question p50/p99: {statistics.median(turn_ms):.1f} / {percentile(turn_ms, 0.99):.1f} ms (includes poll interval)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database-url", required=True, help="to grant the bench user credits")
+    parser.add_argument("--internal-token", help="INTERNAL_API_TOKEN, to sample live sessions")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--think-ms", type=float, default=1000)
+    parser.add_argument("--poll-ms", type=float, default=250)
+    parser.add_argument("--ramp-ms", type=float, default=1, help="delay between candidate starts")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+GET /api/v1/me latency benchmark.
+
+Start the API against a local Postgres first, then:
+    python benchmarks/bench_me.py --requests 2000 --concurrency 10
+
+Registers a throwaway user, then reports p50/p99 latency and requests/sec.
+Run it on the old and the new revision to compare.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def run(base_url: str, total: int, concurrency: int) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        response = await client.post(
+            "/api/v1/auth/register",
+            json={"name": "Bench User", "email": f"bench-me-{uuid.uuid4().hex[:8]}@example.com", "password": "benchpassword123"},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> tuple[int, float]:
+            async with semaphore:
+                start = time.perf_counter()
+                r = await client.get("/api/v1/me", headers=headers)
+                return r.status_code, (time.perf_counter() - start) * 1000
+
+        # Warm up connections and caches
+        await asyncio.gather(*(one() for _ in range(concurrency * 5)))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"Requests:       {total} (concurrency {concurrency})")
+    print(f"Status codes:   {statuses}")
+    print(f"Throughput:     {total / elapsed:.1f} req/sec")
+    print(f"Latency p50:    {statistics.median(latencies):.2f} ms")
+    print(f"Latency p99:    {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Registration throughput benchmark.
+
+Start the API against a local Postgres first, then:
+    python benchmarks/bench_register.py --requests 500 --concurrency 20
+
+Run it once on the old revision and once on the new one to compare
+registrations/sec. Every run uses fresh email addresses, so it can be
+repeated against the same database.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def register(client: httpx.AsyncClient, email: str) -> tuple[int, float]:
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={"name": "Bench User", "email": email, "password": "benchpassword123"},
+    )
+    return response.status_code, (time.perf_counter() - start) * 1000
+
+
+async def run(base_url: str, total: int, concurrency: int) -> None:
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def one(i: int):
+            async with semaphore:
+                return await register(client, f"bench-{run_id}-{i}@example.com")
+
+        # Warm up connections and the password hashing pool
+        await asyncio.gather(*(one(-i - 1) for i in range(concurrency)))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    ok = statuses.get(200, 0)
+
+    print(f"Requests:       {total} (concurrency {concurrency})")
+    print(f"Status codes:   {statuses}")
+    print(f"Elapsed:        {elapsed:.2f}s")
+    print(f"Registrations:  {ok / elapsed:.1f}/sec")
+    print(f"Latency p50:    {statistics.median(latencies):.1f} ms")
+    print(f"Latency p99:    {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Fixtures shared by the test modules.
+
+s3 runs moto's server as the object store. schema gives a module a throwaway
+Postgres schema with every table (TEST_DATABASE_URL must point at a
+disposable database), and run/api_client drive async scenarios against it:
+
+    def test_something(run, api_client):
+        async def scenario(sessions):
+            async with api_client(sessions, {"/cvs": cv_routes.router}, lambda: user) as client:
+                ...
+
+        run(scenario)
+"""
+
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# The app builds its (lazy) engines at import; tests without a database never connect
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL or "postgresql://localhost/unused")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import storage
+from app.database import Base, _async_database_url, get_async_session
+from app.dependencies import get_curr_user
+
+
+@pytest.fixture(scope="module")
+def s3():
+    moto_server = pytest.importorskip("moto.server")
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    client = storage.build_s3_client(f"http://{host}:{port}", "test", "test")
+    client.create_bucket(Bucket=storage.STORAGE_BUCKET)
+    storage.set_s3_client(client)
+    try:
+        yield client
+    finally:
+        storage.set_s3_client(None)
+        server.stop()
+
+
+@pytest.fixture(scope="module")
+def schema(request):
+    """
+    Creates every table in a schema named after the test module and runs the
+    module's SEED statements in it; dropped when the module is done.
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    schema = f"{request.module.__name__.removeprefix('test_')}_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        Base.metadata.create_all(conn)
+        for statement in getattr(request.module, "SEED", ()):
+            conn.execute(text(statement))
+    try:
+        yield schema
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def run(schema):
+    """
+    run(scenario, **engine_options) awaits scenario(sessions) on a fresh event
+    loop, with sessions bound to the module's schema.
+    """
+    def run(scenario, **engine_options):
+        async def runner():
+            engine = create_async_engine(
+                _async_database_url(TEST_DATABASE_URL),
+                connect_args={"server_settings": {"search_path": schema}},
+                **engine_options,
+            )
+            try:
+                return await scenario(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(runner())
+
+    return run
+
+
+@pytest.fixture(scope="module")
+def api_client():
+    """
+    api_client(sessions, routers, current_user=None) opens an HTTP client on an
+    app with the given {prefix: router} mounted. Requests get a session from
+    sessions and are made as current_user(), which is called per request so a
+    scenario can switch users.
+    """
+    @asynccontextmanager
+    async def api_client(sessions, routers: dict, current_user=None):
+        async def session_override():
+            async with sessions() as session:
+                yield session
+
+        app = FastAPI()
+        for prefix, router in routers.items():
+            app.include_router(router, prefix=prefix)
+        app.dependency_overrides[get_async_session] = session_override
+        if current_user is not None:
+            app.dependency_overrides[get_curr_user] = current_user
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+            yield client
+
+    return api_client
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the catalog cache's handling of change notifications that race
+with a load: python -m pytest test_catalog_cache.py
+"""
+
+import asyncio
+import os
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+
+from app.catalog_cache import CatalogCache
+
+
+def test_a_change_notified_mid_load_is_not_cached_stale():
+    prices = {"starter": 100}
+    loads = []
+
+    async def loader(session):
+        snapshot = dict(prices)
+        loads.append(snapshot)
+        if len(loads) == 1:
+            # The price changes (and is notified) while the first load is running
+            prices["starter"] = 120
+            cache.invalidate()
+        return snapshot
+
+    cache = CatalogCache(f"packs-{id(loads)}", loader)
+
+    async def scenario():
+        first = await cache.get()
+        again = await cache.get()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert first.data == again.data == {"starter": 120}
+    assert again is first and cache.loads == 2
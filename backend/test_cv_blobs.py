@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for content-addressed CV storage: uploads are fingerprinted on
+confirm, identical files share one object with a reference count, and
+extracted text is cached by content hash so a repeat screening skips the
+download and the parser.
+
+Needs moto and a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_cv_blobs.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import hashlib
+import uuid
+
+import pytest
+from sqlalchemy import select, text
+
+from app import storage
+from app.models import CV, CVBlob, StorageOrphan, User
+from app.routes import cv_routes
+from app.services import screening_queue
+from app.services.cv_screening import DOCX_MIME_TYPE
+from app.services.wallet_ledger import post_entry
+from test_cv_screening import CV_LINES, make_docx
+
+ROLE_ID = 1
+
+SEED = [
+    "INSERT INTO users (name, email, password, token_version) VALUES ('Owner', 'owner@example.com', 'x', 0)",
+    "INSERT INTO roles (id, title, description, tags, is_active) "
+    "VALUES (1, 'Backend Engineer', 'Build APIs', '{Python,PostgreSQL}', true)",
+]
+
+
+@pytest.fixture(scope="module")
+def run(run, api_client):
+    """Runs scenario(client, sessions) with the CV routes, as the owner"""
+    def run_as_owner(scenario):
+        async def with_app(sessions):
+            current_user = lambda: User(id=1, name="Owner", email="owner@example.com")
+            async with api_client(sessions, {"/cvs": cv_routes.router}, current_user) as client:
+                return await scenario(client, sessions)
+
+        return run(with_app)
+
+    return run_as_owner
+
+
+async def inline(fn, jobs):
+    return await asyncio.to_thread(fn, jobs)
+
+
+async def upload(s3, client, body: bytes) -> dict:
+    key = storage.new_cv_key(1, "cv.docx")
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=body, ContentType=DOCX_MIME_TYPE)
+    response = await client.post("/cvs/confirm", json={"filename": "cv.docx", "storage_filename": key})
+    assert response.status_code == 200
+    return {"key": key, **response.json()}
+
+
+async def blob(sessions, sha256: str) -> CVBlob | None:
+    async with sessions() as session:
+        return await session.get(CVBlob, sha256)
+
+
+async def orphan_keys(sessions) -> set[str]:
+    async with sessions() as session:
+        return set((await session.execute(select(StorageOrphan.key))).scalars())
+
+
+async def screen(sessions, cv_id: int, runner=inline) -> dict:
+    async with sessions() as session:
+        await post_entry(session, 1, 1, type="adjust")
+        screening = await screening_queue.enqueue_screening(session, 1, cv_id, ROLE_ID)
+        await session.commit()
+    jobs = [job for job in await screening_queue.claim_batch(sessions) if job["id"] == screening.id]
+    await screening_queue.screen_claimed(sessions, jobs, runner=runner)
+    async with sessions() as session:
+        return (await session.execute(text("SELECT status, score FROM screenings WHERE id = :id"), {"id": screening.id})).one()
+
+
+def test_identical_uploads_share_one_object_until_the_last_delete(s3, run):
+    async def scenario(client, sessions):
+        body = make_docx(CV_LINES + [uuid.uuid4().hex])
+        sha256 = hashlib.sha256(body).hexdigest()
+        first = await upload(s3, client, body)
+        second = await upload(s3, client, body)
+        other = await upload(s3, client, make_docx([uuid.uuid4().hex]))
+
+        # The second upload points at the first object and its own is queued for deletion
+        assert second["storage_url"] == first["storage_url"] == storage.object_url(first["key"])
+        assert other["storage_url"] == storage.object_url(other["key"])
+        assert (await blob(sessions, sha256)).ref_count == 2
+        assert await orphan_keys(sessions) == {second["key"]}
+
+        assert (await client.delete(f"/cvs/{first['id']}")).status_code == 200
+        assert (await blob(sessions, sha256)).ref_count == 1
+        assert first["key"] not in await orphan_keys(sessions)
+
+        assert (await client.delete(f"/cvs/{second['id']}")).status_code == 200
+        assert await blob(sessions, sha256) is None
+        assert first["key"] in await orphan_keys(sessions)
+
+    run(scenario)
+
+
+def test_repeat_screening_of_the_same_content_skips_download(s3, run, monkeypatch):
+    async def no_storage(fn, jobs):
+        monkeypatch.setattr(storage, "copy_object_to", lambda *args, **kwargs: pytest.fail("downloaded a cached CV"))
+        try:
+            return fn(jobs)
+        finally:
+            monkeypatch.undo()
+
+    async def scenario(client, sessions):
+        body = make_docx(CV_LINES + [uuid.uuid4().hex])
+        sha256 = hashlib.sha256(body).hexdigest()
+        first = await upload(s3, client, body)
+        assert (await screen(sessions, first["id"])).status == "done"
+        cached = await blob(sessions, sha256)
+        assert cached.extracted_at and "State University" in cached.text
+        assert cached.features["sections"] == ["education", "experience", "skills"]
+
+        # Another upload of the same file is scored from the cache
+        second = await upload(s3, client, body)
+        repeat = await screen(sessions, second["id"], runner=no_storage)
+        assert repeat.status == "done" and repeat.score > 0
+
+    run(scenario)
+
+
+def test_screening_fingerprints_cvs_uploaded_before_hashing(s3, run):
+    async def scenario(client, sessions):
+        body = make_docx(CV_LINES + [uuid.uuid4().hex])
+        sha256 = hashlib.sha256(body).hexdigest()
+        shared = await upload(s3, client, body)
+
+        # A CV row from before fingerprinting, with its own copy of the file
+        legacy_key = storage.new_cv_key(1, "old.docx")
+        s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=legacy_key, Body=body)
+        legacy = CV(user_id=1, filename="old.docx", mime_type=DOCX_MIME_TYPE, size_bytes=len(body),
+                    storage_url=storage.object_url(legacy_key))
+        async with sessions() as session:
+            session.add(legacy)
+            await session.commit()
+
+        assert (await screen(sessions, legacy.id)).status == "done"
+        async with sessions() as session:
+            legacy = await session.get(CV, legacy.id)
+        assert legacy.content_sha256 == sha256
+        assert legacy.storage_url == shared["storage_url"]
+        assert (await blob(sessions, sha256)).ref_count == 2
+        assert legacy_key in await orphan_keys(sessions)
+
+    run(scenario)
+
+
+def test_rejected_upload_is_left_to_the_reaper(s3, run):
+    async def scenario(client, sessions):
+        key = storage.new_cv_key(1, "cv.txt")
+        s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=b"not a cv", ContentType="text/plain")
+        response = await client.post("/cvs/confirm", json={"filename": "cv.txt", "storage_filename": key})
+        assert response.status_code == 400
+
+        # The object stays until the reaper gets to it
+        assert await storage.run(storage.head_object, key) is not None
+        assert key in await orphan_keys(sessions)
+
+    run(scenario)
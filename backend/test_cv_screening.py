@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tests for the worker side of CV screening: text extraction from PDF and
+DOCX files, scoring against a role, and a batch screened from an in-process
+S3 stand-in (moto). No database needed.
+"""
+
+import io
+import zipfile
+
+import pytest
+
+from app import storage
+from app.services.cv_screening import (
+    DOCX_MIME_TYPE,
+    PDF_MIME_TYPE,
+    RoleIndex,
+    ScreeningError,
+    iter_docx_text,
+    iter_pdf_text,
+    read_text,
+    score_cv,
+    screen_batch,
+    text_features,
+)
+
+ROLE = {
+    "title": "Backend Engineer",
+    "description": "Build and operate APIs and data pipelines.",
+    "tags": ["Python", "PostgreSQL", "Machine Learning", "Kubernetes"],
+}
+
+CV_LINES = [
+    "Jane Doe - Backend Engineer",
+    "Experience",
+    "Built APIs in Python and PostgreSQL; ran machine learning pipelines.",
+    "Education",
+    "BSc Computer Science, State University",
+    "Skills",
+    "Python, PostgreSQL, Docker",
+]
+
+
+def make_pdf(pages: list[list[str]]) -> bytes:
+    """A minimal PDF with one Helvetica text line per entry"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = b"BT /F1 11 Tf 14 TL 50 750 Td " + b" ".join(b"(" + line.encode() + b") Tj T*" for line in lines) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(ops), ops))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(paragraphs: list[str]) -> bytes:
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", document)
+    return out.getvalue()
+
+
+def test_pdf_text_is_read_page_by_page():
+    pdf = make_pdf([CV_LINES[:3], CV_LINES[3:]])
+    pages = list(iter_pdf_text(io.BytesIO(pdf)))
+    assert len(pages) == 2
+    assert "Python and PostgreSQL" in pages[0]
+    assert "State University" in pages[1]
+
+
+def test_docx_text_is_read_paragraph_by_paragraph():
+    assert list(iter_docx_text(io.BytesIO(make_docx(CV_LINES)))) == CV_LINES
+
+
+def test_unreadable_files_raise_screening_error():
+    with pytest.raises(ScreeningError):
+        list(iter_pdf_text(io.BytesIO(b"not a pdf at all")))
+    with pytest.raises(ScreeningError):
+        list(iter_docx_text(io.BytesIO(b"not a zip")))
+
+
+def score_lines(lines: list[str]) -> dict:
+    text, truncated = read_text(iter(lines))
+    return score_cv(text, text_features(text, truncated), RoleIndex(ROLE))
+
+
+def test_score_reports_matched_and_missing_skills():
+    result = score_lines(CV_LINES)
+    assert result["matched_skills"] == ["Machine Learning", "PostgreSQL", "Python"]
+    assert result["missing_skills"] == ["Kubernetes"]
+    assert result["sections"] == ["education", "experience", "skills"]
+    assert 0 < result["score"] < 100
+    assert "missing Kubernetes" in result["summary"]
+
+    # A CV about something else scores lower
+    unrelated = score_lines(["Pastry chef", "Experience", "Croissants and bread"])
+    assert unrelated["score"] < result["score"]
+
+
+def test_empty_text_cannot_be_scored():
+    with pytest.raises(ScreeningError):
+        score_lines(["", "  "])
+
+
+def test_text_stops_at_the_limit(monkeypatch):
+    monkeypatch.setattr("app.services.cv_screening.SCREENING_MAX_TEXT_CHARS", 40)
+
+    def chunks():
+        yield "Python developer with PostgreSQL skills"
+        yield "Kubernetes"
+        raise AssertionError("read past the limit")
+
+    text, truncated = read_text(chunks())
+    assert truncated and len(text) <= 41
+    result = score_cv(text, text_features(text, truncated), RoleIndex(ROLE))
+    assert result["truncated"]
+    assert "Kubernetes" in result["missing_skills"]
+
+
+def test_batch_screens_each_cv_and_reports_failures(s3, monkeypatch):
+    # Force the PDF to spill from memory to disk
+    monkeypatch.setattr("app.services.cv_screening.SCREENING_SPOOL_BYTES", 128)
+    files = {
+        "cvs/1/a.pdf": make_pdf([CV_LINES]),
+        "cvs/1/b.docx": make_docx(CV_LINES),
+        "cvs/1/broken.pdf": b"%PDF-1.4 truncated",
+    }
+    for key, body in files.items():
+        s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=body)
+    jobs = [
+        {"id": 1, "key": "cvs/1/a.pdf", "mime_type": PDF_MIME_TYPE, "role_id": 7, "role": ROLE},
+        {"id": 2, "key": "cvs/1/b.docx", "mime_type": DOCX_MIME_TYPE, "role_id": 7, "role": ROLE},
+        {"id": 3, "key": "cvs/1/broken.pdf", "mime_type": PDF_MIME_TYPE, "role_id": 7, "role": ROLE},
+        {"id": 4, "key": "cvs/1/gone.pdf", "mime_type": PDF_MIME_TYPE, "role_id": 7, "role": ROLE},
+    ]
+    results = {r["id"]: r for r in screen_batch(jobs)}
+
+    assert results[1]["score"] == results[2]["score"] > 0
+    assert results[1]["result"]["matched_skills"] == ["Machine Learning", "PostgreSQL", "Python"]
+    assert "error" in results[3]
+    assert results[4] == {"id": 4, "error": "The CV file is missing from storage"}
+    # Extracted text comes back for caching, keyed by the content hash
+    assert results[1]["extracted"]["sha256"] == storage.hash_object("cvs/1/a.pdf")
+    assert "State University" in results[2]["extracted"]["text"]
+
+
+def test_cached_text_skips_storage_and_each_document_is_parsed_once(s3, monkeypatch):
+    key = "cvs/1/shared.docx"
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=make_docx(CV_LINES))
+    downloads = []
+    original = storage.copy_object_to
+
+    def counting_copy(*args, **kwargs):
+        downloads.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(storage, "copy_object_to", counting_copy)
+    text, truncated = read_text(iter(CV_LINES))
+    cached = {"text": text, "features": text_features(text, truncated)}
+    other_role = {"title": "Data Engineer", "tags": ["Python", "Spark"]}
+    jobs = [
+        {"id": 1, "key": "cvs/1/gone.docx", "mime_type": DOCX_MIME_TYPE, "sha256": "a" * 64, "role_id": 7, "role": ROLE, **cached},
+        {"id": 2, "key": key, "mime_type": DOCX_MIME_TYPE, "sha256": "b" * 64, "text": None, "features": None, "role_id": 7, "role": ROLE},
+        {"id": 3, "key": key, "mime_type": DOCX_MIME_TYPE, "sha256": "b" * 64, "text": None, "features": None, "role_id": 8, "role": other_role},
+    ]
+    results = {r["id"]: r for r in screen_batch(jobs)}
+
+    assert downloads == [key]
+    assert "extracted" not in results[1] and results[1]["score"] > 0
+    assert results[3]["result"]["missing_skills"] == ["Spark"]
+    assert results[2]["extracted"] is results[3]["extracted"]
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Tests for the interview engine: credit reservation, the session state
+machine, refunds on failure, the stale-session sweep, streamed events with
+their per-connection limits and batched turn writes, with the local stub
+question model.
+
+Needs a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_interview_engine.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from starlette.websockets import WebSocketDisconnect
+
+from app.database import _async_database_url
+from app.models import Interview, InterviewTurn, Transaction, User
+from app.process_pool import PoolSaturated
+from app.routes import interview_routes
+from app.services import interview_engine
+from app.services.interview_engine import (
+    AnswerRejected, InterviewEngine, TooManyStreams, reserve_interview, set_interview_engine, sweep_stale_interviews
+)
+from app.services.question_model import InterviewContext, StubQuestionModel
+from app.services.wallet_ledger import InsufficientCredits, get_balance, post_entry
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+SEED = [
+    "INSERT INTO roles (title, description, tags, is_active) VALUES ('Backend Engineer', 'APIs', '{python}', true)",
+]
+
+
+async def new_user(sessions, credits: int) -> int:
+    async with sessions() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (name, email, password, token_version) VALUES ('Candidate', :email, 'x', 0) RETURNING id"
+        ), {"email": f"{uuid.uuid4().hex[:10]}@example.com"})).scalar_one()
+        if credits:
+            await post_entry(session, user_id, credits, type="adjust")
+        await session.commit()
+    return user_id
+
+
+async def start(engine: InterviewEngine, sessions, user_id: int):
+    engine.admit()
+    async with sessions() as session:
+        interview = await reserve_interview(session, user_id, 1, None)
+        await session.commit()
+    return engine.start(interview.id, user_id, InterviewContext(role_title="Backend Engineer"))
+
+
+async def wait_for(predicate, timeout: float = 5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+async def balance(sessions, user_id: int) -> int:
+    async with sessions() as session:
+        return await get_balance(session, user_id)
+
+
+async def fetch(sessions, interview_id: int) -> Interview:
+    async with sessions() as session:
+        return await session.get(Interview, interview_id)
+
+
+def test_completed_interview_keeps_its_credits_and_transcript(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 12)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=3)
+        live = await start(engine, sessions, user_id)
+        assert await balance(sessions, user_id) == 7
+
+        for _ in range(3):
+            await wait_for(lambda: live.awaiting_answer)
+            assert live.status == "in_progress"
+            live.submit_answer("I designed the retry logic for our payment queue and cut failures by half.")
+        await wait_for(lambda: live.interview_id not in engine.live)
+
+        interview = await fetch(sessions, live.interview_id)
+        assert interview.status == "done" and interview.started_at and interview.ended_at
+        async with sessions() as session:
+            turns = (await session.execute(
+                select(InterviewTurn).where(InterviewTurn.interview_id == live.interview_id).order_by(InterviewTurn.turn_index)
+            )).scalars().all()
+        assert [t.turn_index for t in turns] == [0, 1, 2]
+        assert all(t.answer and t.feedback for t in turns)
+        assert await balance(sessions, user_id) == 7
+
+    run(scenario)
+
+
+def test_reservation_needs_enough_credits(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 4)
+        async with sessions() as session:
+            with pytest.raises(InsufficientCredits):
+                await reserve_interview(session, user_id, 1, None)
+            await session.rollback()
+            assert (await session.execute(
+                select(func.count()).select_from(Interview).where(Interview.user_id == user_id)
+            )).scalar_one() == 0
+        assert await balance(sessions, user_id) == 4
+
+    run(scenario)
+
+
+def test_unanswered_interview_fails_and_is_refunded_once(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 5)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=2, answer_timeout=0.05)
+        live = await start(engine, sessions, user_id)
+        assert await balance(sessions, user_id) == 0
+        await wait_for(lambda: live.interview_id not in engine.live)
+
+        interview = await fetch(sessions, live.interview_id)
+        assert interview.status == "failed" and "No answer" in interview.failure_reason
+        assert await balance(sessions, user_id) == 5
+        # A later sweep finds nothing to refund
+        assert await sweep_stale_interviews(sessions) == 0
+        async with sessions() as session:
+            refunds = (await session.execute(
+                select(func.count()).where(Transaction.external_ref == f"interview:{live.interview_id}", Transaction.type == "refund")
+            )).scalar_one()
+        assert refunds == 1
+
+    run(scenario)
+
+
+def test_stale_sessions_are_swept_and_the_live_task_stops(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 5)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=2)
+        live = await start(engine, sessions, user_id)
+        await wait_for(lambda: live.awaiting_answer)
+
+        # The node stopped heartbeating this session
+        async with sessions() as session:
+            await session.execute(
+                update(Interview).where(Interview.id == live.interview_id)
+                .values(heartbeat_at=datetime.now(timezone.utc) - timedelta(hours=1))
+            )
+            await session.commit()
+        assert await sweep_stale_interviews(sessions) >= 1
+        assert await balance(sessions, user_id) == 5
+
+        await engine.heartbeat()
+        await wait_for(lambda: live.interview_id not in engine.live)
+        interview = await fetch(sessions, live.interview_id)
+        assert interview.status == "failed" and interview.failure_reason == "Interview session was lost"
+        # Not refunded a second time by the session's own failure path
+        assert await balance(sessions, user_id) == 5
+
+    run(scenario)
+
+
+def test_admission_is_bounded(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 5)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), max_sessions=1)
+        live = await start(engine, sessions, user_id)
+        with pytest.raises(PoolSaturated):
+            engine.admit()
+        assert engine.stats()["rejected"] == 1
+        await engine.shutdown()
+        # Shutdown fails and refunds what was still running
+        assert (await fetch(sessions, live.interview_id)).status == "failed"
+        assert await balance(sessions, user_id) == 5
+
+    run(scenario)
+
+
+def test_many_concurrent_sessions(run, monkeypatch):
+    monkeypatch.setattr(interview_engine, "INTERVIEW_CREDITS", 1)
+
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 200)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(latency_ms=5), questions=2, model_concurrency=16)
+        lives = [await start(engine, sessions, user_id) for _ in range(200)]
+
+        async def candidate(live):
+            for _ in range(2):
+                await wait_for(lambda: live.awaiting_answer, timeout=30)
+                live.submit_answer("An answer.")
+
+        await asyncio.gather(*(candidate(live) for live in lives))
+        await wait_for(lambda: not engine.live, timeout=30)
+        assert engine.stats()["completed"] == 200
+        async with sessions() as session:
+            done = (await session.execute(
+                select(func.count()).select_from(Interview)
+                .where(Interview.user_id == user_id, Interview.status == "done")
+            )).scalar_one()
+        assert done == 200
+
+    run(scenario)
+
+
+async def drain(subscription) -> list[dict]:
+    events = []
+    while (event := await subscription.next()) is not None:
+        events.append(event)
+    return events
+
+
+def test_streams_carry_question_and_feedback_pieces(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 5)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=1)
+        live = await start(engine, sessions, user_id)
+        subscription = engine.subscribe(live)
+        collector = asyncio.create_task(drain(subscription))
+
+        await wait_for(lambda: live.awaiting_answer)
+        live.add_answer_chunk(0, "I led the migration ")
+        live.add_answer_chunk(0, "to the new ledger.")
+        assert live.finish_answer(0) == 0
+        events = await collector
+
+        kinds = [e["type"] for e in events]
+        assert kinds[0] == "snapshot" and kinds[-1] == "end"
+        question = "".join(e["text"] for e in events if e["type"] == "question_delta")
+        assert question and question == next(e["text"] for e in events if e["type"] == "question")
+        feedback = "".join(e["text"] for e in events if e["type"] == "feedback_delta")
+        assert feedback == next(e["text"] for e in events if e["type"] == "feedback")
+        assert kinds.index("question") < kinds.index("answer_received") < kinds.index("feedback")
+        assert events[-1]["status"] == "done"
+        assert live.turns[0].answer == "I led the migration to the new ledger."
+
+    run(scenario)
+
+
+def test_answer_chunks_are_checked(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 5)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=1)
+        live = await start(engine, sessions, user_id)
+        await wait_for(lambda: live.awaiting_answer)
+
+        with pytest.raises(AnswerRejected):
+            live.add_answer_chunk(3, "for another turn")
+        with pytest.raises(AnswerRejected):
+            live.finish_answer(0)
+        with pytest.raises(AnswerRejected):
+            live.add_answer_chunk(0, "x" * (interview_engine.MAX_ANSWER_CHARS + 1))
+        live.add_answer_chunk(0, "Fine.")
+        live.finish_answer(0)
+        with pytest.raises(AnswerRejected):
+            live.add_answer_chunk(0, "too late")
+        await engine.shutdown()
+
+    run(scenario)
+
+
+def test_slow_streams_get_a_snapshot_instead_of_a_backlog(run, monkeypatch):
+    monkeypatch.setattr(interview_engine, "INTERVIEW_STREAM_MAX_QUEUED_EVENTS", 3)
+    monkeypatch.setattr(interview_engine, "INTERVIEW_STREAM_MAX_PER_SESSION", 2)
+
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 5)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=1)
+        live = await start(engine, sessions, user_id)
+        slow = engine.subscribe(live)
+        engine.subscribe(live)
+        with pytest.raises(TooManyStreams):
+            engine.subscribe(live)
+
+        # Not read while the question streams word by word
+        await wait_for(lambda: live.awaiting_answer)
+        assert len(slow.events) <= 3
+        assert engine.stats()["stream_resyncs"] >= 1
+        caught_up = await slow.next()
+        assert caught_up["type"] == "snapshot" and caught_up["current_question"] == live.current_question
+        await engine.shutdown()
+        assert (await drain(slow))[-1] == {"type": "end", "status": "failed", "failure_reason": "Interrupted by server shutdown"}
+
+    run(scenario)
+
+
+def test_answered_turns_are_written_in_batches(run):
+    async def scenario(sessions):
+        user_id = await new_user(sessions, 15)
+        engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=2)
+        lives = [await start(engine, sessions, user_id) for _ in range(3)]
+        for live in lives:
+            await wait_for(lambda: live.awaiting_answer)
+            live.submit_answer("First answer.")
+        await wait_for(lambda: all(live.awaiting_answer and len(live.turns) == 2 for live in lives))
+
+        assert await engine.flush_turns() == 3
+        assert engine.stats()["turn_flushes"] == 1
+        async with sessions() as session:
+            written = (await session.execute(
+                select(func.count()).select_from(InterviewTurn)
+                .where(InterviewTurn.interview_id.in_([live.interview_id for live in lives]))
+            )).scalar_one()
+        assert written == 3
+
+        # Finishing writes the rest; turns already flushed are not duplicated
+        for live in lives:
+            live.submit_answer("Second answer.")
+        await wait_for(lambda: not engine.live)
+        assert await engine.flush_turns() == 0
+        async with sessions() as session:
+            written = (await session.execute(
+                select(func.count()).select_from(InterviewTurn)
+                .where(InterviewTurn.interview_id.in_([live.interview_id for live in lives]))
+            )).scalar_one()
+        assert written == 6
+
+    run(scenario)
+
+
+@pytest.fixture
+def stream_client(schema, monkeypatch):
+    """The interview routes on a test app, with a token "good" for a fresh user with 10 credits"""
+    # No pooled connections: the app runs on the test client's own event loop
+    engine = create_async_engine(
+        _async_database_url(TEST_DATABASE_URL),
+        poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": schema}},
+    )
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    user_id = asyncio.run(new_user(sessions, 10))
+
+    async def authenticate(token, session):
+        if token != "good":
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return User(id=user_id, name="Candidate", email="c@example.com")
+
+    monkeypatch.setattr(interview_routes, "get_curr_user", authenticate)
+    app = FastAPI()
+    app.include_router(interview_routes.router, prefix="/interviews")
+    with TestClient(app) as client:
+        yield client, sessions, user_id
+    set_interview_engine(None)
+    asyncio.run(engine.dispose())
+
+
+def test_websocket_streams_and_takes_chunked_answers(stream_client):
+    client, sessions, user_id = stream_client
+    engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=2)
+    set_interview_engine(engine)
+    live = client.portal.call(start, engine, sessions, user_id)
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/interviews/{live.interview_id}/ws?token=bad") as ws:
+            ws.receive_text()
+    assert closed.value.code == 4401
+
+    kinds = []
+    with client.websocket_connect(f"/interviews/{live.interview_id}/ws?token=good") as ws:
+        ws.send_text("not json")
+        while True:
+            event = json.loads(ws.receive_text())
+            kinds.append(event["type"])
+            if event["type"] == "question" or (event["type"] == "snapshot" and event["current_question"]):
+                turn_index = event["turn_index"] if event["type"] == "question" else event["turns"][-1]["turn_index"]
+                ws.send_text(json.dumps({"type": "answer_chunk", "turn_index": turn_index, "text": "We sharded "}))
+                ws.send_text(json.dumps({"type": "answer_end", "turn_index": turn_index, "text": "the queue."}))
+            if event["type"] == "end":
+                break
+    assert event["status"] == "done"
+    assert "error" in kinds and kinds.count("feedback") == 2
+    assert [turn.answer for turn in live.turns] == ["We sharded the queue."] * 2
+
+
+def test_sse_fallback_streams_until_the_session_ends(stream_client):
+    client, sessions, user_id = stream_client
+    engine = InterviewEngine(sessions, model=StubQuestionModel(), questions=1, answer_timeout=0.2)
+    set_interview_engine(engine)
+    live = client.portal.call(start, engine, sessions, user_id)
+
+    assert client.get(f"/interviews/{live.interview_id}/events").status_code == 401
+    # Unanswered, so the session fails and the stream ends
+    response = client.get(f"/interviews/{live.interview_id}/events", headers={"Authorization": "Bearer good"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    kinds = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert kinds[0] == "snapshot" and kinds[-1] == "end"
+    assert client.get(f"/interviews/{live.interview_id}/events", headers={"Authorization": "Bearer good"}).status_code == 409
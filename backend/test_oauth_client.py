@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared OAuth HTTP client, discovery cache and id_token verification.
+Runs entirely against a local fake OpenID provider: python -m pytest test_oauth_client.py
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import rsa
+from fastapi import FastAPI, Form
+from jose import jwk, jwt
+
+from app import oidc
+from app.http_client import set_http_client
+from app.services.oauth_providers import OAuthError, OAuthProvider
+
+ISSUER = "https://fake-oauth.test"
+DISCOVERY_URL = f"{ISSUER}/.well-known/openid-configuration"
+CLIENT_ID = "test-client"
+
+
+class FakeProvider:
+    """Minimal OpenID provider: discovery, JWKS, token and userinfo endpoints"""
+
+    def __init__(self):
+        self.calls = {"discovery": 0, "jwks": 0, "token": 0, "userinfo": 0}
+        self.rotate_key()
+        self.app = FastAPI()
+
+        @self.app.get("/.well-known/openid-configuration")
+        def discovery():
+            self.calls["discovery"] += 1
+            return {
+                "issuer": ISSUER,
+                "token_endpoint": f"{ISSUER}/token",
+                "userinfo_endpoint": f"{ISSUER}/userinfo",
+                "jwks_uri": f"{ISSUER}/jwks",
+                "id_token_signing_alg_values_supported": ["RS256"],
+            }
+
+        @self.app.get("/jwks")
+        def jwks():
+            self.calls["jwks"] += 1
+            return {"keys": [self.public_jwk]}
+
+        @self.app.post("/token")
+        def token(code: str = Form(...)):
+            self.calls["token"] += 1
+            if code == "no-id-token":
+                return {"access_token": f"at-{code}"}
+            return {"access_token": f"at-{code}", "id_token": self.id_token()}
+
+        @self.app.get("/userinfo")
+        def userinfo():
+            self.calls["userinfo"] += 1
+            return {"email": "student@example.com", "name": "Test Student"}
+
+    def rotate_key(self):
+        self.kid = f"key-{time.monotonic_ns()}"
+        public_key, private_key = rsa.newkeys(1024)
+        self.private_pem = private_key.save_pkcs1().decode()
+        self.public_jwk = {**jwk.construct(public_key.save_pkcs1().decode(), "RS256").to_dict(), "kid": self.kid, "use": "sig"}
+
+    def id_token(self, audience: str = CLIENT_ID) -> str:
+        claims = {
+            "iss": ISSUER,
+            "aud": audience,
+            "sub": "123",
+            "email": "student@example.com",
+            "name": "Test Student",
+            "iat": int(time.time()),
+            "exp": int(time.time()) + 300,
+        }
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+
+class FakeOAuthProvider(OAuthProvider):
+    name = "fake"
+    display_name = "Fake"
+    discovery_url = DISCOVERY_URL
+    client_id = CLIENT_ID
+    client_secret = "secret"
+    redirect_uri = "http://localhost:8000/api/v1/auth/fake-login"
+
+
+def run_with_provider(coro_fn):
+    provider = FakeProvider()
+    oidc.discovery_cache.clear()
+    oidc.jwks_cache.clear()
+
+    async def runner():
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=provider.app))
+        set_http_client(client)
+        try:
+            return await coro_fn(provider)
+        finally:
+            set_http_client(None)
+            await client.aclose()
+
+    return asyncio.run(runner())
+
+
+def test_discovery_document_is_cached():
+    async def scenario(provider):
+        first = await oidc.get_discovery(DISCOVERY_URL)
+        second = await oidc.get_discovery(DISCOVERY_URL)
+        assert first["token_endpoint"] == f"{ISSUER}/token"
+        assert first is second
+        assert provider.calls["discovery"] == 1
+
+    run_with_provider(scenario)
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def scenario(provider):
+        await asyncio.gather(*(oidc.get_discovery(DISCOVERY_URL) for _ in range(20)))
+        assert provider.calls["discovery"] == 1
+
+    run_with_provider(scenario)
+
+
+def test_id_token_verified_against_cached_jwks():
+    async def scenario(provider):
+        for _ in range(3):
+            claims = await oidc.verify_id_token(provider.id_token(), DISCOVERY_URL, CLIENT_ID)
+            assert claims["email"] == "student@example.com"
+        assert provider.calls["jwks"] == 1
+        assert provider.calls["userinfo"] == 0
+
+    run_with_provider(scenario)
+
+
+def test_id_token_for_another_client_is_rejected():
+    async def scenario(provider):
+        claims = await oidc.verify_id_token(provider.id_token(audience="someone-else"), DISCOVERY_URL, CLIENT_ID)
+        assert claims is None
+
+    run_with_provider(scenario)
+
+
+def test_unknown_key_id_refetches_jwks(monkeypatch):
+    monkeypatch.setattr(oidc, "JWKS_MIN_REFRESH_SECONDS", 0)
+
+    async def scenario(provider):
+        assert await oidc.verify_id_token(provider.id_token(), DISCOVERY_URL, CLIENT_ID)
+        provider.rotate_key()
+        claims = await oidc.verify_id_token(provider.id_token(), DISCOVERY_URL, CLIENT_ID)
+        assert claims["sub"] == "123"
+        assert provider.calls["jwks"] == 2
+
+    run_with_provider(scenario)
+
+
+def test_token_exchange_reuses_pooled_client():
+    async def scenario(provider):
+        from app.http_client import get_http_client
+
+        discovery = await oidc.get_discovery(DISCOVERY_URL)
+        client = get_http_client()
+        for code in ("a", "b"):
+            response = await client.post(discovery["token_endpoint"], data={"code": code})
+            assert response.json()["access_token"] == f"at-{code}"
+        assert get_http_client() is client
+        assert provider.calls["token"] == 2
+
+    run_with_provider(scenario)
+
+
+def test_provider_identity_from_id_token_skips_userinfo():
+    async def scenario(provider):
+        identity = await FakeOAuthProvider().authenticate("abc")
+        assert identity.email == "student@example.com"
+        assert identity.name == "Test Student"
+        assert provider.calls["userinfo"] == 0
+
+    run_with_provider(scenario)
+
+
+def test_provider_falls_back_to_userinfo():
+    async def scenario(provider):
+        identity = await FakeOAuthProvider().authenticate("no-id-token")
+        assert identity.email == "student@example.com"
+        assert provider.calls["userinfo"] == 1
+
+    run_with_provider(scenario)
+
+
+def test_provider_rejects_failed_token_exchange():
+    async def scenario(provider):
+        provider.app.router.routes = [r for r in provider.app.router.routes if getattr(r, "path", None) != "/token"]
+        with pytest.raises(OAuthError, match="Token exchange failed"):
+            await FakeOAuthProvider().authenticate("abc")
+
+    run_with_provider(scenario)
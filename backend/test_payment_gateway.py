@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the payment gateway client and its circuit breaker, against a local
+fake of the Razorpay Orders API: python -m pytest test_payment_gateway.py
+"""
+
+import asyncio
+import base64
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.http_client import set_http_client
+from app.services.payment_gateway import (
+    CircuitBreaker, GatewayUnavailable, PaymentGatewayError, RazorpayGateway, StubGateway,
+)
+
+BASE_URL = "https://fake-razorpay.test/v1"
+
+
+class FakeRazorpay:
+    """Orders endpoint whose behaviour the test switches between ok, error and reject"""
+
+    def __init__(self):
+        self.mode = "ok"
+        self.calls = 0
+        self.authorization = None
+        self.app = FastAPI()
+
+        @self.app.post("/v1/orders")
+        async def create_order(request: Request):
+            self.calls += 1
+            self.authorization = request.headers.get("authorization")
+            body = await request.json()
+            if self.mode == "error":
+                return JSONResponse({"error": "server"}, status_code=502)
+            if self.mode == "reject":
+                return JSONResponse({"error": {"description": "amount too small"}}, status_code=400)
+            return {"id": f"order_fake{self.calls}", "amount": body["amount"], "currency": body["currency"], "receipt": body["receipt"]}
+
+
+def run_with_gateway(scenario):
+    fake = FakeRazorpay()
+
+    async def runner():
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app))
+        set_http_client(client)
+        try:
+            return await scenario(fake, RazorpayGateway("rzp_key", "rzp_secret", base_url=BASE_URL))
+        finally:
+            set_http_client(None)
+            await client.aclose()
+
+    return asyncio.run(runner())
+
+
+async def order(gateway):
+    return await gateway.create_order(10000, "INR", "rcpt_1", {"order_type": "credit_purchase"})
+
+
+def test_order_is_created_with_basic_auth():
+    async def scenario(fake, gateway):
+        created = await order(gateway)
+        assert created.id == "order_fake1" and created.amount_paise == 10000
+        assert fake.authorization == "Basic " + base64.b64encode(b"rzp_key:rzp_secret").decode()
+
+    run_with_gateway(scenario)
+
+
+def test_circuit_opens_after_repeated_failures():
+    async def scenario(fake, gateway):
+        fake.mode = "error"
+        for _ in range(gateway.breaker.failure_threshold):
+            with pytest.raises(GatewayUnavailable):
+                await order(gateway)
+        calls = fake.calls
+        # Open: refused without touching the gateway
+        with pytest.raises(GatewayUnavailable, match="circuit is open"):
+            await order(gateway)
+        assert fake.calls == calls
+        assert gateway.stats()["circuit"]["state"] == "open"
+
+    run_with_gateway(scenario)
+
+
+def test_half_open_trial_closes_the_circuit():
+    async def scenario(fake, gateway):
+        gateway.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        fake.mode = "error"
+        with pytest.raises(GatewayUnavailable):
+            await order(gateway)
+        assert gateway.breaker.state == "open"
+        await asyncio.sleep(0.06)
+        fake.mode = "ok"
+        assert (await order(gateway)).id.startswith("order_fake")
+        assert gateway.breaker.state == "closed"
+
+    run_with_gateway(scenario)
+
+
+def test_rejection_does_not_trip_the_breaker():
+    async def scenario(fake, gateway):
+        fake.mode = "reject"
+        for _ in range(gateway.breaker.failure_threshold + 1):
+            with pytest.raises(PaymentGatewayError) as error:
+                await order(gateway)
+            assert not isinstance(error.value, GatewayUnavailable)
+        assert gateway.breaker.state == "closed"
+
+    run_with_gateway(scenario)
+
+
+def test_timeout_counts_as_unavailable():
+    def timing_out(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(timing_out))
+        set_http_client(client)
+        try:
+            gateway = RazorpayGateway("rzp_key", "rzp_secret", base_url=BASE_URL)
+            with pytest.raises(GatewayUnavailable, match="ReadTimeout"):
+                await order(gateway)
+            assert gateway.breaker.failures == 1
+        finally:
+            set_http_client(None)
+            await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_stub_gateway_needs_no_network():
+    created = asyncio.run(StubGateway(latency_ms=1).create_order(22500, "INR", "rcpt_2", {}))
+    assert created.id.startswith("order_") and created.amount_paise == 22500
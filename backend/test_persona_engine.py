@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Tests for the persona engine: a persona built from a user's CVs, role
+selections, screenings and interviews; recomputes that only process the
+sources changed since the last one; debounced and coalesced recomputes;
+and /personas/current served from the materialized row and its cache.
+
+Needs moto and a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_persona_engine.py
+Tests that need the database are skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import json
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app import storage
+from app.models import User
+from app.process_pool import PoolSaturated
+from app.routes import cv_routes, persona_routes
+from app.services import persona_engine
+from app.services.cv_screening import DOCX_MIME_TYPE
+from app.services.persona_engine import PersonaEngine, get_cached_persona, set_persona_engine
+from test_cv_screening import CV_LINES, make_docx
+
+SEED = [
+    "INSERT INTO roles (id, title, description, tags, is_active) VALUES "
+    "(1, 'Backend Engineer', 'Build APIs', '{Python,PostgreSQL,Kubernetes}', true), "
+    "(2, 'Data Engineer', 'Pipelines', '{Python,Spark,Machine Learning}', true)",
+]
+
+
+class Recorder:
+    """Runs profile_cvs in a thread and remembers which CVs it was given"""
+
+    def __init__(self):
+        self.cv_ids = []
+
+    async def __call__(self, fn, jobs, vocabulary):
+        self.cv_ids.append(sorted(job["cv_id"] for job in jobs))
+        return await asyncio.to_thread(fn, jobs, vocabulary)
+
+
+@pytest.fixture(scope="module")
+def run(run, api_client):
+    """Runs scenario(client, sessions, personas, user_id) as a new user with a persona engine of its own"""
+    def run_as_new_user(scenario):
+        async def with_app(sessions):
+            async with sessions() as session:
+                user_id = (await session.execute(text(
+                    "INSERT INTO users (name, email, password, token_version) VALUES ('Candidate', :email, 'x', 0) RETURNING id"
+                ), {"email": f"{uuid.uuid4().hex}@example.com"})).scalar_one()
+                await session.commit()
+
+            routers = {"/cvs": cv_routes.router, "/personas": persona_routes.router}
+            current_user = lambda: User(id=user_id, name="Candidate", email="c@example.com")
+            personas = PersonaEngine(sessions=sessions, runner=Recorder())
+            set_persona_engine(personas)
+            try:
+                async with api_client(sessions, routers, current_user) as client:
+                    return await scenario(client, sessions, personas, user_id)
+            finally:
+                personas.shutdown()
+                set_persona_engine(None)
+
+        return run(with_app)
+
+    return run_as_new_user
+
+
+async def upload(s3, client, user_id: int, lines: list[str]) -> int:
+    key = storage.new_cv_key(user_id, "cv.docx")
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=make_docx(lines + [uuid.uuid4().hex]),
+                  ContentType=DOCX_MIME_TYPE)
+    response = await client.post("/cvs/confirm", json={"filename": "cv.docx", "storage_filename": key})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+async def execute(sessions, sql: str, **params):
+    async with sessions() as session:
+        result = await session.execute(text(sql), params)
+        await session.commit()
+        return result
+
+
+async def add_screening(sessions, user_id: int, role_id: int, score: int, matched: list, missing: list) -> int:
+    return (await execute(
+        sessions,
+        "INSERT INTO screenings (user_id, role_id, status, credits_used, score, result, completed_at) "
+        "VALUES (:user_id, :role_id, 'done', 1, :score, CAST(:result AS json), now()) RETURNING id",
+        user_id=user_id, role_id=role_id, score=score,
+        result=json.dumps({"matched_skills": matched, "missing_skills": missing}),
+    )).scalar_one()
+
+
+async def add_interview(sessions, user_id: int, role_id: int, answered: int) -> int:
+    interview_id = (await execute(
+        sessions,
+        "INSERT INTO interviews (user_id, role_id, status, credits_used, started_at, ended_at) "
+        "VALUES (:user_id, :role_id, 'done', 5, now(), now()) RETURNING id",
+        user_id=user_id, role_id=role_id,
+    )).scalar_one()
+    for index in range(answered + 1):
+        await execute(
+            sessions,
+            "INSERT INTO interview_turns (interview_id, turn_index, question, answer, asked_at) "
+            "VALUES (:id, :index, 'Why?', :answer, now())",
+            id=interview_id, index=index, answer="Because" if index < answered else None,
+        )
+    return interview_id
+
+
+def test_persona_is_built_from_every_source_and_served_from_cache(s3, run):
+    async def scenario(client, sessions, personas, user_id):
+        assert (await client.get("/personas/current")).status_code == 404
+
+        await upload(s3, client, user_id, CV_LINES)
+        await execute(sessions, "INSERT INTO user_role_selection (user_id, role_id) VALUES (:u, 1), (:u, 2)", u=user_id)
+        await add_screening(sessions, user_id, 1, 72, ["Python"], ["Kubernetes"])
+        await add_interview(sessions, user_id, 1, answered=3)
+
+        response = await client.post("/personas/compute")
+        assert response.status_code == 200
+        persona = response.json()
+        # Python is on the CV and matched in a screening, so it ranks first
+        assert persona["skills"] == ["Python", "Machine Learning", "PostgreSQL"]
+        summary = persona["summary"]
+        assert summary["target_roles"] == ["Backend Engineer", "Data Engineer"]
+        assert summary["stats"] == {
+            "cvs": 1, "screenings": 1, "average_score": 72, "best_score": 72,
+            "interviews": 1, "answered_questions": 3,
+        }
+        assert "Best screening score 72 for Backend Engineer" in summary["strengths"]
+        assert summary["areas_for_improvement"][0] == "Kubernetes: missing in 1 screening"
+        assert any(area.startswith("Spark:") for area in summary["areas_for_improvement"])
+
+        current = await client.get("/personas/current")
+        assert current.json() == persona
+        assert get_cached_persona(user_id) == current.content
+
+        # The extraction is cached for screenings of the same file
+        cached = (await execute(sessions, "SELECT count(*) FROM cv_blobs WHERE extracted_at IS NOT NULL")).scalar_one()
+        assert cached >= 1
+
+    run(scenario)
+
+
+def test_recompute_processes_only_changed_sources(s3, run):
+    async def scenario(client, sessions, personas, user_id):
+        first = await upload(s3, client, user_id, CV_LINES)
+        await add_screening(sessions, user_id, 1, 60, ["Python"], ["Kubernetes"])
+        await personas.compute(user_id)
+        assert personas.runner.cv_ids == [[first]]
+        assert personas.sources_processed == 2
+
+        # Nothing new: no CV is profiled again, only the overlap window is reread
+        await personas.compute(user_id)
+        assert personas.runner.cv_ids == [[first]]
+
+        second = await upload(s3, client, user_id, ["Spark and Kubernetes on weekends"])
+        persona = await personas.compute(user_id)
+        assert personas.runner.cv_ids == [[first], [second]]
+        assert "Spark" in persona["skills"] and persona["summary"]["stats"]["cvs"] == 2
+
+        assert (await client.delete(f"/cvs/{first}")).status_code == 200
+        persona = await personas.compute(user_id)
+        assert persona["summary"]["stats"]["cvs"] == 1
+        assert "PostgreSQL" not in persona["skills"]
+        assert personas.full_recomputes == 1
+
+        # A new tag in the catalog means every CV is profiled again
+        await execute(sessions, "UPDATE roles SET tags = '{Python,Spark,Machine Learning,Docker}' WHERE id = 2")
+        try:
+            await personas.compute(user_id)
+        finally:
+            await execute(sessions, "UPDATE roles SET tags = '{Python,Spark,Machine Learning}' WHERE id = 2")
+        assert personas.runner.cv_ids[-1] == [second]
+        assert personas.full_recomputes == 2
+
+    run(scenario)
+
+
+def test_changes_are_debounced_and_concurrent_computes_coalesce(s3, run, monkeypatch):
+    monkeypatch.setattr(persona_engine, "PERSONA_DEBOUNCE_MS", 50)
+
+    async def scenario(client, sessions, personas, user_id):
+        # No persona yet: a change alone does not create one
+        personas.changed(user_id)
+        await asyncio.sleep(0.2)
+        assert personas.debounced_runs == 1 and personas.recomputes == 0
+
+        results = await asyncio.gather(*(personas.compute(user_id) for _ in range(3)))
+        assert personas.recomputes == 1 and personas.coalesced == 2
+        assert len({r["id"] for r in results}) == 1
+        assert (await client.get("/personas/current")).status_code == 200
+
+        # Uploads in a burst are folded into one recompute; the cache is dropped
+        for _ in range(3):
+            await upload(s3, client, user_id, CV_LINES)
+        assert personas.stats()["pending"] == 1
+        await asyncio.sleep(0.3)
+        assert personas.debounced_runs == 2 and personas.recomputes == 2
+        assert get_cached_persona(user_id) is None
+        assert (await client.get("/personas/current")).json()["summary"]["stats"]["cvs"] == 3
+
+    run(scenario)
+
+
+def test_compute_after_a_change_does_not_join_a_run_that_missed_it():
+    async def scenario():
+        personas = PersonaEngine(sessions=None, runner=None)
+        inputs = {"version": 1}
+        runs = []
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def recompute(user_id, create):
+            runs.append(inputs["version"])
+            started.set()
+            await release.wait()
+            return {"saw_version": runs[-1]}
+
+        personas._recompute = recompute
+        personas._fire(7)
+        await started.wait()
+        # A change lands while the background run is past reading its inputs
+        inputs["version"] = 2
+        personas.changed(7)
+        compute = asyncio.create_task(personas.compute(7))
+        await asyncio.sleep(0)
+        release.set()
+        assert await compute == {"saw_version": 2}
+        assert runs == [1, 2] and personas.stats()["pending"] == 0
+        personas.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_background_recompute_retries_when_the_pool_is_saturated(s3, run, monkeypatch):
+    monkeypatch.setattr(persona_engine, "PERSONA_DEBOUNCE_MS", 50)
+    monkeypatch.setattr(persona_engine, "PERSONA_RETRY_SECONDS", 0.1)
+    # Personas have a pool of their own, apart from the screening dispatcher's
+    assert PersonaEngine().runner == persona_engine.persona_pool.run
+
+    async def scenario(client, sessions, personas, user_id):
+        await personas.compute(user_id)
+        recorder = personas.runner
+        saturated = []
+
+        async def busy_then_free(fn, jobs, vocabulary):
+            if len(saturated) < 2:
+                saturated.append(jobs)
+                raise PoolSaturated("persona")
+            return await recorder(fn, jobs, vocabulary)
+
+        personas.runner = busy_then_free
+        await upload(s3, client, user_id, CV_LINES)
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if personas.recomputes == 2:
+                break
+        # The change is applied once the pool has room, not dropped
+        stats = personas.stats()
+        assert len(saturated) == 2 and stats["retries"] == 2
+        assert stats["recomputes"] == 2 and stats["retrying"] == 0
+        assert stats["last_error"] == "PoolSaturated: persona pool is saturated"
+        assert (await client.get("/personas/current")).json()["summary"]["stats"]["cvs"] == 1
+
+    run(scenario)
+
+
+def test_cvs_that_fail_to_profile_are_retried(s3, run, monkeypatch):
+    monkeypatch.setattr(persona_engine, "PERSONA_RETRY_SECONDS", 0.1)
+
+    async def scenario(client, sessions, personas, user_id):
+        recorder = personas.runner
+        timeouts = []
+
+        async def storage_timeout_once(fn, jobs, vocabulary):
+            if not timeouts:
+                timeouts.append(jobs)
+                return [{"cv_id": job["cv_id"], "retry": "ReadTimeoutError: storage timed out"} for job in jobs]
+            return await recorder(fn, jobs, vocabulary)
+
+        personas.runner = storage_timeout_once
+        cv_id = await upload(s3, client, user_id, CV_LINES)
+        # The rest of the persona is saved; the CV is profiled again shortly
+        persona = await personas.compute(user_id)
+        assert persona["summary"]["stats"]["cvs"] == 0
+        assert personas.stats()["pending"] == 1 and "storage timed out" in personas.stats()["last_error"]
+
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if personas.recomputes == 2:
+                break
+        assert recorder.cv_ids == [[cv_id]]
+        assert personas.stats()["retrying"] == 0
+        assert (await client.get("/personas/current")).json()["summary"]["stats"]["cvs"] == 1
+
+    run(scenario)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for UPI QR rendering, signed QR tokens and the render cache: python -m pytest test_qr_codes.py
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import qr_codes
+
+LINK = "upi://pay?pa=merchant@upi&pn=InterviewCredits&tn=order_0123456789abcdef&am=100.00&cu=INR"
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setattr(qr_codes, "QR_TOKEN_SECRET", b"test-qr-secret")
+
+
+def test_token_round_trips_and_rejects_tampering(secret):
+    token = qr_codes.qr_token(LINK)
+    assert qr_codes.link_from_token(token) == LINK
+    encoded, _, signature = token.partition(".")
+    other = qr_codes.qr_token(LINK.replace("100.00", "1.00")).partition(".")[0]
+    assert qr_codes.link_from_token(f"{other}.{signature}") is None
+    assert qr_codes.link_from_token(encoded) is None
+
+
+def test_no_tokens_are_issued_or_accepted_without_a_secret(monkeypatch):
+    monkeypatch.setattr(qr_codes, "QR_TOKEN_SECRET", b"")
+    assert qr_codes.qr_token(LINK) is None
+    # What an empty HMAC key would have produced
+    encoded = qr_codes._b64(LINK.encode())
+    assert qr_codes.link_from_token(f"{encoded}.{qr_codes._signature(encoded)}") is None
+
+
+def test_svg_is_compact_and_square():
+    svg = qr_codes.render_qr_svg(LINK)
+    assert svg.startswith(b"<svg") and svg.endswith(b"</svg>")
+    assert b'viewBox="0 0 ' in svg
+    assert len(svg) < 10_000
+
+
+def test_concurrent_misses_share_one_render(monkeypatch):
+    calls = []
+
+    async def fake_run(fn, *args):
+        calls.append(args)
+        await asyncio.sleep(0.01)
+        return fn(*args)
+
+    monkeypatch.setattr(qr_codes.qr_pool, "run", fake_run)
+    monkeypatch.setattr(qr_codes, "_svgs", {})
+
+    async def scenario():
+        results = await asyncio.gather(*(qr_codes.get_qr_svg(LINK) for _ in range(10)))
+        assert len({etag for _svg, etag in results}) == 1
+        await qr_codes.get_qr_svg(LINK)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests: hot queries must keep using their indexes.
+
+Needs a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_query_plans.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL not set", allow_module_level=True)
+
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import Base
+from app.pagination import encode_cursor, keyset_page
+from app.models import CV, Activity, Payment, RefreshSession, Transaction, User, UserRoleSelection
+
+USERS = 500
+ROWS_PER_USER = 40
+
+
+@pytest.fixture(scope="module")
+def connection():
+    schema = f"query_plans_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        Base.metadata.create_all(conn)
+        seed(conn)
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+            conn.commit()
+    engine.dispose()
+
+
+def seed(conn):
+    conn.execute(text("""
+        INSERT INTO users (name, email, password, token_version)
+        SELECT 'User ' || u, 'user' || u || '@example.com', 'x', 0 FROM generate_series(1, :users) u
+    """), {"users": USERS})
+    conn.execute(text("""
+        INSERT INTO roles (title, description, is_active)
+        SELECT 'Role ' || r, 'Role', true FROM generate_series(1, 50) r
+    """))
+    conn.execute(text("""
+        INSERT INTO transactions (user_id, type, credits, status, created_at)
+        SELECT u, 'purchase', 10, 'success', now() - (i || ' minutes')::interval
+        FROM generate_series(1, :users) u, generate_series(1, :rows) i
+    """), {"users": USERS, "rows": ROWS_PER_USER})
+    conn.execute(text("""
+        INSERT INTO cvs (user_id, filename, mime_type, size_bytes, storage_url, status, created_at)
+        SELECT u, 'cv.pdf', 'application/pdf', 1000, 's3://cvs/' || u || '/' || i, 'uploaded', now() - (i || ' minutes')::interval
+        FROM generate_series(1, :users) u, generate_series(1, :rows) i
+    """), {"users": USERS, "rows": ROWS_PER_USER})
+    conn.execute(text("""
+        INSERT INTO activities (user_id, kind, ref_id, created_at)
+        SELECT u, 'login', NULL, now() - (i || ' minutes')::interval
+        FROM generate_series(1, :users) u, generate_series(1, :rows) i
+    """), {"users": USERS, "rows": ROWS_PER_USER})
+    conn.execute(text("""
+        INSERT INTO payments (user_id, order_id, amount_inr, currency, status, method)
+        SELECT u, 'order_' || u || '_' || i, 100, 'INR', 'created', 'UPI'
+        FROM generate_series(1, :users) u, generate_series(1, :rows) i
+    """), {"users": USERS, "rows": ROWS_PER_USER})
+    conn.execute(text("""
+        INSERT INTO user_role_selection (user_id, role_id)
+        SELECT u, r FROM generate_series(1, :users) u, generate_series(1, 10) r
+    """), {"users": USERS})
+    conn.execute(text("""
+        INSERT INTO refresh_sessions (user_id, family_id, token_hash, expires_at)
+        SELECT u, md5(u::text), md5(u::text || '-' || i), now() + interval '7 days'
+        FROM generate_series(1, :users) u, generate_series(1, 10) i
+    """), {"users": USERS})
+    for table in ("users", "roles", "transactions", "cvs", "activities", "payments", "user_role_selection", "refresh_sessions"):
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def plan_nodes(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+    nodes, stack = [], [plan]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+
+def assert_uses_index(conn, stmt, table: str, index: str):
+    nodes = plan_nodes(conn, stmt)
+    summary = [(n["Node Type"], n.get("Relation Name"), n.get("Index Name")) for n in nodes]
+    seq_scans = [n for n in nodes if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == table]
+    assert not seq_scans, f"sequential scan on {table}: {summary}"
+    used = {n.get("Index Name") for n in nodes}
+    assert index in used, f"expected {index}: {summary}"
+
+
+def test_transactions_page_uses_user_created_index(connection):
+    stmt = select(Transaction).where(Transaction.user_id == 42).order_by(Transaction.created_at.desc()).limit(10)
+    assert_uses_index(connection, stmt, "transactions", "ix_transactions_user_id_created_at")
+
+
+def test_wallet_recent_transactions_use_user_created_index(connection):
+    stmt = select(Transaction).where(Transaction.user_id == 42).order_by(Transaction.created_at.desc()).limit(5)
+    assert_uses_index(connection, stmt, "transactions", "ix_transactions_user_id_created_at")
+
+
+def test_transactions_cursor_page_uses_user_created_index(connection):
+    cursor = encode_cursor(datetime.now(timezone.utc) - timedelta(minutes=20), 10**9)
+    stmt = keyset_page(select(Transaction).where(Transaction.user_id == 42), Transaction.created_at, Transaction.id, cursor, 10)
+    assert_uses_index(connection, stmt, "transactions", "ix_transactions_user_id_created_at")
+
+
+def test_transactions_count_uses_index(connection):
+    stmt = select(func.count()).select_from(Transaction).where(Transaction.user_id == 42)
+    assert_uses_index(connection, stmt, "transactions", "ix_transactions_user_id_created_at")
+
+
+def test_cvs_page_uses_user_created_index(connection):
+    stmt = select(CV).where(CV.user_id == 42).order_by(CV.created_at.desc()).limit(10)
+    assert_uses_index(connection, stmt, "cvs", "ix_cvs_user_id_created_at")
+
+
+def test_activities_by_user_use_user_created_index(connection):
+    stmt = select(Activity).where(Activity.user_id == 42).order_by(Activity.created_at.desc()).limit(20)
+    assert_uses_index(connection, stmt, "activities", "ix_activities_user_id_created_at")
+
+
+def test_payment_lookup_by_order_id(connection):
+    stmt = select(Payment).where(Payment.order_id == "order_42_7")
+    assert_uses_index(connection, stmt, "payments", "ix_payments_order_id")
+
+
+def test_role_selections_by_user(connection):
+    stmt = select(UserRoleSelection).where(UserRoleSelection.user_id == 42)
+    assert_uses_index(connection, stmt, "user_role_selection", "uq_user_role_selection_user_role")
+
+
+def test_user_lookup_by_email(connection):
+    stmt = select(User).where(User.email == "user42@example.com")
+    assert_uses_index(connection, stmt, "users", "ix_users_email")
+
+
+def test_refresh_session_lookup_by_token_hash(connection):
+    stmt = select(RefreshSession.user_id, RefreshSession.family_id).where(RefreshSession.token_hash == "abc")
+    assert_uses_index(connection, stmt, "refresh_sessions", "ix_refresh_sessions_token_hash")
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Tests for the CV screening queue: POST /screenings/run reserves a credit and
+queues a row, dispatchers claim batches with SKIP LOCKED and screen them
+from an in-process S3 stand-in, and failures are retried or refunded.
+
+Needs moto and a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_screening_queue.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from sqlalchemy import func, text, update
+
+from app import storage
+from app.catalog_cache import CachedCatalog
+from app.models import CV, Screening, User
+from app.process_pool import PoolSaturated
+from app.routes import screening_routes
+from app.services import screening_queue
+from app.services.cv_screening import DOCX_MIME_TYPE
+from app.services.wallet_ledger import get_balance, post_entry
+from test_cv_screening import CV_LINES, make_docx
+
+ROLE_ID = 1
+
+SEED = [
+    "INSERT INTO roles (id, title, description, tags, is_active) "
+    "VALUES (1, 'Backend Engineer', 'Build APIs', '{Python,PostgreSQL,Kubernetes}', true)",
+]
+
+
+@pytest.fixture(autouse=True)
+def active_roles(monkeypatch):
+    catalog = CachedCatalog(data=[{"id": ROLE_ID, "title": "Backend Engineer"}], body=b"", etag="", loaded_at=0)
+
+    async def get():
+        return catalog
+
+    monkeypatch.setattr(screening_routes.roles_catalog, "get", get)
+
+
+@pytest.fixture(scope="module")
+def run(run, api_client):
+    """
+    Runs scenario(client, sessions) with the screening routes, as the user
+    whose id is in current_user["user_id"] when each request is made.
+    """
+    def run_as(scenario, current_user: dict | None = None):
+        current_user = current_user if current_user is not None else {"user_id": 0}
+
+        async def with_app(sessions):
+            routers = {"/screenings": screening_routes.router}
+            as_current_user = lambda: User(id=current_user["user_id"], name="Candidate", email="c@example.com")
+            async with api_client(sessions, routers, as_current_user) as client:
+                return await scenario(client, sessions)
+
+        return run(with_app)
+
+    return run_as
+
+
+async def inline(fn, jobs):
+    """Runs a batch in a thread instead of a worker process"""
+    return await asyncio.to_thread(fn, jobs)
+
+
+async def new_user(sessions, credits: int) -> int:
+    async with sessions() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (name, email, password, token_version) VALUES ('Candidate', :email, 'x', 0) RETURNING id"
+        ), {"email": f"{uuid.uuid4().hex[:10]}@example.com"})).scalar_one()
+        if credits:
+            await post_entry(session, user_id, credits, type="adjust")
+        await session.commit()
+    return user_id
+
+
+async def stored_cv(s3, sessions, user_id: int, body: bytes | None = None, role_id: int | None = ROLE_ID) -> int:
+    key = storage.new_cv_key(user_id, "cv.docx")
+    body = make_docx(CV_LINES) if body is None else body
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=body)
+    cv = CV(user_id=user_id, role_id=role_id, filename="cv.docx", mime_type=DOCX_MIME_TYPE,
+            size_bytes=len(body), storage_url=storage.object_url(key))
+    async with sessions() as session:
+        session.add(cv)
+        await session.commit()
+    return cv.id
+
+
+async def queue(sessions, user_id: int, cv_id: int) -> int:
+    async with sessions() as session:
+        screening = await screening_queue.enqueue_screening(session, user_id, cv_id, ROLE_ID)
+        await session.commit()
+    return screening.id
+
+
+async def fetch(sessions, screening_id: int) -> Screening:
+    async with sessions() as session:
+        return await session.get(Screening, screening_id)
+
+
+async def statuses(sessions, ids: list[int]) -> set[str]:
+    return {(await fetch(sessions, screening_id)).status for screening_id in ids}
+
+
+async def balance(sessions, user_id: int) -> int:
+    async with sessions() as session:
+        return await get_balance(session, user_id)
+
+
+async def clear_queue(sessions) -> None:
+    # Earlier tests may leave pending rows that would be claimed alongside
+    async with sessions() as session:
+        await session.execute(update(Screening).where(Screening.status == "pending").values(status="failed"))
+        await session.commit()
+
+
+def test_run_reserves_a_credit_and_poll_reports_pending(s3, run):
+    async def scenario(client, sessions):
+        user_id = await new_user(sessions, 2)
+        current_user["user_id"] = user_id
+        cv_id = await stored_cv(s3, sessions, user_id)
+
+        response = await client.post("/screenings/run", json={"cv_id": cv_id})
+        assert response.status_code == 202
+        assert response.headers["retry-after"] == str(screening_queue.SCREENING_CLIENT_POLL_SECONDS)
+        body = response.json()
+        assert body["status"] == "pending" and body["role_id"] == ROLE_ID and body["credits_used"] == 1
+        assert await balance(sessions, user_id) == 1
+
+        polled = await client.get(f"/screenings/{body['id']}")
+        assert polled.status_code == 200 and polled.json()["status"] == "pending"
+        assert "retry-after" in polled.headers
+
+        # The second screening spends the last credit; the third is refused
+        assert (await client.post("/screenings/run", json={"cv_id": cv_id})).status_code == 202
+        refused = await client.post("/screenings/run", json={"cv_id": cv_id})
+        assert refused.status_code == 402
+        assert await balance(sessions, user_id) == 0
+
+        # Another user's CV and screening are not found
+        other_id = await new_user(sessions, 5)
+        current_user["user_id"] = other_id
+        assert (await client.post("/screenings/run", json={"cv_id": cv_id})).status_code == 404
+        assert (await client.get(f"/screenings/{body['id']}")).status_code == 404
+
+        # No role on the request, the CV or the user's selections
+        roleless = await stored_cv(s3, sessions, other_id, role_id=None)
+        assert (await client.post("/screenings/run", json={"cv_id": roleless})).status_code == 400
+        assert await balance(sessions, other_id) == 5
+
+    current_user = {}
+    run(scenario, current_user)
+
+
+def test_claimed_batch_is_screened_and_failures_refunded(s3, run):
+    async def scenario(client, sessions):
+        await clear_queue(sessions)
+        user_id = await new_user(sessions, 3)
+        good = [await queue(sessions, user_id, await stored_cv(s3, sessions, user_id)) for _ in range(2)]
+        broken = await queue(sessions, user_id, await stored_cv(s3, sessions, user_id, body=b"not a docx"))
+        assert await balance(sessions, user_id) == 0
+
+        jobs = await screening_queue.claim_batch(sessions)
+        assert sorted(job["id"] for job in jobs) == sorted(good + [broken])
+        # Leased: a second dispatcher finds nothing to claim
+        assert await screening_queue.claim_batch(sessions) == []
+
+        outcome = await screening_queue.screen_claimed(sessions, jobs, runner=inline)
+        assert outcome == {"done": 2, "failed": 1, "retry": 0, "deferred": 0}
+
+        for screening_id in good:
+            screening = await fetch(sessions, screening_id)
+            assert screening.status == "done" and screening.score > 0 and screening.completed_at
+            assert screening.result["matched_skills"] == ["PostgreSQL", "Python"]
+        failed = await fetch(sessions, broken)
+        assert failed.status == "failed" and "DOCX" in failed.failure_reason
+        # Only the failed screening's credit comes back
+        assert await balance(sessions, user_id) == 1
+
+    run(scenario)
+
+
+def test_transient_failures_retry_then_fail_with_one_refund(s3, run, monkeypatch):
+    monkeypatch.setattr(screening_queue, "SCREENING_MAX_ATTEMPTS", 2)
+
+    async def unavailable(fn, jobs):
+        raise ConnectionError("storage is down")
+
+    async def scenario(client, sessions):
+        await clear_queue(sessions)
+        user_id = await new_user(sessions, 1)
+        screening_id = await queue(sessions, user_id, await stored_cv(s3, sessions, user_id))
+
+        jobs = await screening_queue.claim_batch(sessions)
+        assert await screening_queue.screen_claimed(sessions, jobs, runner=unavailable) == {"done": 0, "failed": 0, "retry": 1, "deferred": 0}
+        screening = await fetch(sessions, screening_id)
+        assert screening.status == "pending" and "storage is down" in screening.failure_reason
+        # Not due again until the retry delay passes
+        assert await screening_queue.claim_batch(sessions) == []
+
+        async with sessions() as session:
+            await session.execute(update(Screening).values(leased_until=func.now()))
+            await session.commit()
+        jobs = await screening_queue.claim_batch(sessions)
+        assert jobs[0]["attempts"] == 2
+        assert await screening_queue.screen_claimed(sessions, jobs, runner=unavailable) == {"done": 0, "failed": 1, "retry": 0, "deferred": 0}
+        assert (await fetch(sessions, screening_id)).status == "failed"
+        assert await balance(sessions, user_id) == 1
+
+        # Recording the failure again does not refund twice
+        await screening_queue.record_results(sessions, jobs, [{"id": screening_id, "error": "again"}])
+        assert await balance(sessions, user_id) == 1
+
+    run(scenario)
+
+
+def test_a_saturated_pool_does_not_use_up_attempts(s3, run, monkeypatch):
+    monkeypatch.setattr(screening_queue, "SCREENING_MAX_ATTEMPTS", 2)
+
+    async def saturated(fn, jobs):
+        raise PoolSaturated("screening")
+
+    async def scenario(client, sessions):
+        await clear_queue(sessions)
+        user_id = await new_user(sessions, 1)
+        screening_id = await queue(sessions, user_id, await stored_cv(s3, sessions, user_id))
+
+        for _ in range(screening_queue.SCREENING_MAX_ATTEMPTS + 2):
+            jobs = await screening_queue.claim_batch(sessions)
+            assert jobs[0]["attempts"] == 1
+            assert await screening_queue.screen_claimed(sessions, jobs, runner=saturated) == {"done": 0, "failed": 0, "retry": 0, "deferred": 1}
+            # Put back with a delay, like a retry
+            assert await screening_queue.claim_batch(sessions) == []
+            async with sessions() as session:
+                await session.execute(update(Screening).values(leased_until=func.now()))
+                await session.commit()
+
+        screening = await fetch(sessions, screening_id)
+        assert screening.status == "pending" and screening.attempts == 0 and screening.failure_reason is None
+        assert await balance(sessions, user_id) == 0
+
+        # Once a worker is free it is screened as usual
+        jobs = await screening_queue.claim_batch(sessions)
+        assert await screening_queue.screen_claimed(sessions, jobs, runner=inline) == {"done": 1, "failed": 0, "retry": 0, "deferred": 0}
+
+    run(scenario)
+
+
+def test_deleting_the_cv_fails_its_pending_screening_with_a_refund(s3, run):
+    async def scenario(client, sessions):
+        await clear_queue(sessions)
+        user_id = await new_user(sessions, 1)
+        cv_id = await stored_cv(s3, sessions, user_id)
+        screening_id = await queue(sessions, user_id, cv_id)
+        async with sessions() as session:
+            await session.delete(await session.get(CV, cv_id))
+            await session.commit()
+
+        jobs = await screening_queue.claim_batch(sessions)
+        assert await screening_queue.screen_claimed(sessions, jobs, runner=inline) == {"done": 0, "failed": 1, "retry": 0, "deferred": 0}
+        screening = await fetch(sessions, screening_id)
+        assert screening.status == "failed" and screening.cv_id is None
+        assert await balance(sessions, user_id) == 1
+
+    run(scenario)
+
+
+def test_dispatcher_screens_a_burst_in_one_batch(s3, run):
+    async def scenario(client, sessions):
+        await clear_queue(sessions)
+        user_id = await new_user(sessions, 5)
+        ids = [await queue(sessions, user_id, await stored_cv(s3, sessions, user_id)) for _ in range(5)]
+        batches_before = screening_queue.batch_stats["batches"]
+
+        dispatcher = asyncio.create_task(screening_queue.run_screening_dispatcher(sessions, runner=inline))
+        try:
+            deadline = time.monotonic() + 10
+            while "pending" in await statuses(sessions, ids):
+                assert time.monotonic() < deadline, "timed out"
+                await asyncio.sleep(0.05)
+        finally:
+            dispatcher.cancel()
+        assert await statuses(sessions, ids) == {"done"}
+        assert screening_queue.batch_stats["batches"] == batches_before + 1
+        assert await balance(sessions, user_id) == 0
+
+    run(scenario)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for direct-to-storage CV uploads against an in-process S3 stand-in
+(moto's server): python -m pytest test_storage.py
+Skipped when moto is not installed.
+"""
+
+import base64
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.database import get_async_session
+from app.dependencies import get_curr_user
+from app.models.user_model import User
+from app.routes import cv_routes
+
+PDF = "application/pdf"
+
+
+class RejectionSession:
+    """Every request below is rejected before a row is written; only the reaper queue is used"""
+
+    def __init__(self):
+        self.orphans = []
+        self.committed = []
+
+    async def commit(self):
+        self.committed, self.orphans = self.committed + self.orphans, []
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = RejectionSession()
+
+    async def enqueue_orphan(_, key):
+        session.orphans.append(key)
+
+    monkeypatch.setattr(cv_routes, "enqueue_orphan", enqueue_orphan)
+    return session
+
+
+@pytest.fixture
+def api(s3, session):
+    app = FastAPI()
+    app.include_router(cv_routes.router, prefix="/cvs")
+    app.dependency_overrides[get_curr_user] = lambda: User(id=7, name="Uploader", email="u@example.com")
+    app.dependency_overrides[get_async_session] = lambda: session
+    with TestClient(app) as client:
+        yield client
+
+
+def test_presigned_post_policy_caps_size_and_pins_type(s3):
+    post = storage.presign_post("7/cv.pdf", PDF)
+    policy = json.loads(base64.b64decode(post["fields"]["policy"]))
+    assert ["content-length-range", 1, storage.CV_MAX_UPLOAD_BYTES] in policy["conditions"]
+    assert {"Content-Type": PDF} in policy["conditions"]
+
+    response = httpx.post(post["url"], data=post["fields"], files={"file": ("cv.pdf", b"%PDF-1.4 cv", PDF)})
+    assert response.status_code in (200, 204)
+    assert storage.head_object("7/cv.pdf") == {"size_bytes": 11, "mime_type": PDF}
+
+
+def test_multipart_parts_upload_in_any_order_and_complete(s3):
+    size = storage.CV_MULTIPART_PART_BYTES + 1024
+    upload = storage.start_multipart_upload("7/large.pdf", PDF, size)
+    assert [part["size_bytes"] for part in upload["parts"]] == [storage.CV_MULTIPART_PART_BYTES, 1024]
+
+    completed = []
+    for part in reversed(upload["parts"]):
+        response = httpx.put(part["url"], content=b"x" * part["size_bytes"])
+        assert response.status_code == 200
+        completed.append({"PartNumber": part["part_number"], "ETag": response.headers["etag"]})
+    storage.complete_multipart_upload("7/large.pdf", upload["upload_id"], completed)
+
+    assert storage.head_object("7/large.pdf") == {"size_bytes": size, "mime_type": PDF}
+    assert storage.head_object("7/missing.pdf") is None
+
+
+def test_confirm_queues_oversized_object_for_deletion(s3, api, session):
+    key = "7/oversized.pdf"
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=b"x" * (storage.CV_MAX_UPLOAD_BYTES + 1), ContentType=PDF)
+    # The claimed size is ignored
+    response = api.post("/cvs/confirm", json={"filename": "cv.pdf", "storage_filename": key, "size_bytes": 10})
+    assert response.status_code == 400 and "10MB" in response.json()["detail"]
+    assert session.committed == [key]
+
+
+def test_confirm_rejects_wrong_content_type_and_missing_object(s3, api, session):
+    key = "7/script.pdf"
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=b"#!/bin/sh", ContentType="text/x-shellscript")
+    response = api.post("/cvs/confirm", json={"filename": "cv.pdf", "storage_filename": key})
+    assert response.status_code == 400 and "file type" in response.json()["detail"]
+    assert session.committed == [key]
+
+    response = api.post("/cvs/confirm", json={"filename": "cv.pdf", "storage_filename": "7/never-uploaded.pdf"})
+    assert response.status_code == 400
+    assert session.committed == [key]
+
+
+def test_keys_of_other_users_are_refused(s3, api):
+    response = api.post("/cvs/confirm", json={"filename": "cv.pdf", "storage_filename": "8/theirs.pdf"})
+    assert response.status_code == 403
+    response = api.post("/cvs/multipart/abort", json={"storage_filename": "7/../8/theirs.pdf", "upload_id": "x"})
+    assert response.status_code == 403
+
+
+def test_multipart_start_refuses_files_over_the_limit(s3, api):
+    response = api.post("/cvs/multipart", json={
+        "filename": "cv.pdf", "mime_type": PDF, "size_bytes": storage.CV_MAX_UPLOAD_BYTES + 1,
+    })
+    assert response.status_code == 400
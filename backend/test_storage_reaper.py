@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for deferred object deletes: DELETE /cvs/{id} only queues the key and
+the storage reaper removes objects in batches from an in-process S3 stand-in.
+
+Needs moto and a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_storage_reaper.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app import storage
+from app.models import CV, StorageOrphan, User
+from app.routes import cv_routes
+from app.services import storage_reaper
+
+SEED = [
+    "INSERT INTO users (name, email, password, token_version) VALUES ('Owner', 'owner@example.com', 'x', 0)",
+]
+
+
+@pytest.fixture(scope="module")
+def run(run, api_client):
+    """Runs scenario(client, sessions) with the CV routes, as the owner"""
+    def run_as_owner(scenario):
+        async def with_app(sessions):
+            current_user = lambda: User(id=1, name="Owner", email="owner@example.com")
+            async with api_client(sessions, {"/cvs": cv_routes.router}, current_user) as client:
+                return await scenario(client, sessions)
+
+        return run(with_app)
+
+    return run_as_owner
+
+
+async def stored_cv(s3, sessions) -> CV:
+    key = storage.new_cv_key(1, "cv.pdf")
+    s3.put_object(Bucket=storage.STORAGE_BUCKET, Key=key, Body=b"%PDF-1.4", ContentType="application/pdf")
+    cv = CV(user_id=1, filename="cv.pdf", mime_type="application/pdf", size_bytes=8, storage_url=storage.object_url(key))
+    async with sessions() as session:
+        session.add(cv)
+        await session.commit()
+    return cv
+
+
+async def orphan_keys(sessions) -> list[str]:
+    async with sessions() as session:
+        return list((await session.execute(select(StorageOrphan.key))).scalars())
+
+
+def test_delete_queues_the_object_and_reaper_removes_it_in_one_batch(s3, run, monkeypatch):
+    calls = []
+    original = storage.delete_objects
+
+    def counting_delete(batch):
+        calls.append(len(batch))
+        return original(batch)
+
+    async def scenario(client, sessions):
+        cvs = [await stored_cv(s3, sessions) for _ in range(3)]
+        keys = [storage.key_from_url(cv.storage_url) for cv in cvs]
+        for cv in cvs:
+            response = await client.delete(f"/cvs/{cv.id}")
+            assert response.status_code == 200
+        # The request only recorded the keys
+        assert sorted(await orphan_keys(sessions)) == sorted(keys)
+        assert all(storage.head_object(key) for key in keys)
+
+        monkeypatch.setattr(storage, "delete_objects", counting_delete)
+        assert await storage_reaper.reap_batch(sessions) == 3
+        assert calls == [3]
+        assert await orphan_keys(sessions) == []
+        assert not any(storage.head_object(key) for key in keys)
+
+    run(scenario)
+
+
+def test_failed_deletes_back_off(s3, run, monkeypatch):
+    def unavailable(keys):
+        raise ConnectionError("storage is down")
+
+    async def scenario(client, sessions):
+        cv = await stored_cv(s3, sessions)
+        assert (await client.delete(f"/cvs/{cv.id}")).status_code == 200
+
+        monkeypatch.setattr(storage, "delete_objects", unavailable)
+        assert await storage_reaper.reap_batch(sessions) == 1
+        async with sessions() as session:
+            orphan = (await session.execute(select(StorageOrphan))).scalars().one()
+            assert orphan.attempts == 1 and "storage is down" in orphan.last_error
+        # Not due again yet
+        assert await storage_reaper.reap_batch(sessions) == 0
+        monkeypatch.undo()
+
+        async with sessions() as session:
+            await session.execute(update(StorageOrphan).values(next_attempt_at=func.now()))
+            await session.commit()
+        assert await storage_reaper.reap_batch(sessions) == 1
+        assert await orphan_keys(sessions) == []
+
+    run(scenario)
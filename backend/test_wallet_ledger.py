@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Concurrency tests for the wallet ledger: hundreds of parallel credits and
+debits must leave balance == sum(transactions.credits), never below zero.
+
+Needs a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_wallet_ledger.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import random
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import Transaction, User, Wallet
+from app.services.wallet_ledger import InsufficientCredits, get_balance, post_entry
+
+USERS = 3
+OPERATIONS = 600
+WORKERS = 40
+
+SEED = [f"""
+    INSERT INTO users (name, email, password, token_version)
+    SELECT 'User ' || u, 'user' || u || '@example.com', 'x', 0 FROM generate_series(1, {USERS}) u
+"""]
+
+
+@pytest.fixture(scope="module")
+def run(run):
+    """One pooled connection per worker, so the operations really run in parallel"""
+    return lambda scenario: run(scenario, pool_size=WORKERS, max_overflow=0)
+
+
+async def apply(sessions, user_id, credits, **kwargs):
+    async with sessions() as session:
+        try:
+            entry = await post_entry(session, user_id, credits, type="purchase" if credits > 0 else "deduct", **kwargs)
+        except InsufficientCredits:
+            await session.rollback()
+            return None
+        await session.commit()
+        return entry
+
+
+async def totals(sessions, user_id):
+    async with sessions() as session:
+        ledger = (await session.execute(
+            select(func.coalesce(func.sum(Transaction.credits), 0)).where(Transaction.user_id == user_id)
+        )).scalar_one()
+        return await get_balance(session, user_id), ledger
+
+
+def test_parallel_credits_and_debits_balance_with_ledger(run):
+    rng = random.Random(7)
+    operations = [(rng.randint(1, USERS), rng.choice([5, 10, -3, -7, -20])) for _ in range(OPERATIONS)]
+
+    async def scenario(sessions):
+        limit = asyncio.Semaphore(WORKERS)
+
+        async def one(user_id, credits):
+            async with limit:
+                return await apply(sessions, user_id, credits)
+
+        results = await asyncio.gather(*(one(user_id, credits) for user_id, credits in operations))
+        assert any(result is None for result in results), "expected some debits to be refused"
+        for user_id in range(1, USERS + 1):
+            balance, ledger = await totals(sessions, user_id)
+            assert balance == ledger
+            assert balance >= 0
+            applied = sum(credits for (uid, credits), result in zip(operations, results) if uid == user_id and result)
+            assert balance == applied
+
+    run(scenario)
+
+
+def test_idempotency_key_applies_once_under_concurrency(run):
+    async def scenario(sessions):
+        before, _ = await totals(sessions, 1)
+        results = await asyncio.gather(*(
+            apply(sessions, 1, 50, idempotency_key="razorpay:pay_123", external_ref="pay_123") for _ in range(25)
+        ))
+        assert sum(result.applied for result in results) == 1
+        assert len({result.transaction_id for result in results}) == 1
+        balance, ledger = await totals(sessions, 1)
+        assert balance == before + 50
+        assert balance == ledger
+
+    run(scenario)
+
+
+def test_refused_debit_leaves_nothing_behind(run):
+    async def scenario(sessions):
+        async with sessions() as session:
+            user_id = (await session.execute(
+                User.__table__.insert().values(name="Empty", email=f"{uuid.uuid4().hex}@example.com", password="x", token_version=0).returning(User.id)
+            )).scalar_one()
+            with pytest.raises(InsufficientCredits):
+                await post_entry(session, user_id, -1, type="deduct")
+            # The caller's transaction is still usable and holds no ledger row
+            assert (await session.execute(select(func.count()).where(Transaction.user_id == user_id))).scalar_one() == 0
+            assert (await session.execute(select(Wallet).where(Wallet.user_id == user_id))).first() is None
+            entry = await post_entry(session, user_id, -5, type="adjust", allow_negative=True)
+            assert entry.balance_credits == -5
+            await session.rollback()
+
+    run(scenario)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tests for queued payment webhooks: a local fake gateway signs and (re)delivers
+events to the webhook endpoint, and the queue workers apply them.
+
+Needs a disposable Postgres database (tables are created in a throwaway schema):
+    TEST_DATABASE_URL=postgresql://postgres@localhost/scratch python -m pytest test_webhook_queue.py
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import uuid
+from decimal import Decimal
+
+import httpx
+import pytest
+from sqlalchemy import func, select, text, update
+
+from app.models import Payment, Transaction, Wallet, WebhookEvent
+from app.routes import payment_routes
+from app.services import webhook_queue
+
+WEBHOOK_SECRET = "whsec_test"
+
+SEED = [
+    "INSERT INTO users (name, email, password, token_version) VALUES ('Buyer', 'buyer@example.com', 'x', 0)",
+]
+
+
+class FakeGateway:
+    """Signs Razorpay-style payment events and delivers them, optionally more than once"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+
+    def event(self, order_id: str, status: str, payment_id: str | None = None) -> tuple[str, bytes]:
+        body = json.dumps({
+            "event": f"payment.{status}",
+            "payload": {"payment": {"entity": {
+                "id": payment_id or f"pay_{uuid.uuid4().hex[:12]}",
+                "order_id": order_id,
+                "status": status,
+                "amount": 10000,
+            }}},
+        }).encode()
+        return f"evt_{uuid.uuid4().hex[:16]}", body
+
+    async def deliver(self, event_id: str, body: bytes, secret: str = WEBHOOK_SECRET) -> httpx.Response:
+        signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return await self.client.post(
+            "/payments/webhook",
+            content=body,
+            headers={"X-Razorpay-Signature": signature, "X-Razorpay-Event-Id": event_id},
+        )
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(monkeypatch):
+    monkeypatch.setattr(payment_routes, "RAZORPAY_SECRET", WEBHOOK_SECRET)
+
+
+@pytest.fixture(scope="module")
+def run(run, api_client):
+    """Runs scenario(gateway, sessions) with the payment routes"""
+    def run_with_gateway(scenario):
+        async def with_app(sessions):
+            async with api_client(sessions, {"": payment_routes.router}) as client:
+                return await scenario(FakeGateway(client), sessions)
+
+        return run(with_app)
+
+    return run_with_gateway
+
+
+async def create_order(sessions, credits: int = 10) -> str:
+    order_id = f"order_{uuid.uuid4().hex[:16]}"
+    async with sessions() as session:
+        session.add(Payment(
+            user_id=1, order_id=order_id, amount_inr=Decimal("100.00"), currency="INR",
+            status="created", method="UPI", payload_json={"pack_id": 1, "credits": credits},
+        ))
+        await session.commit()
+    return order_id
+
+
+async def drain(sessions) -> int:
+    processed = 0
+    while await webhook_queue.process_next(sessions):
+        processed += 1
+    return processed
+
+
+async def fetch_event(sessions, event_id: str) -> WebhookEvent:
+    async with sessions() as session:
+        return (await session.execute(select(WebhookEvent).where(WebhookEvent.event_id == event_id))).scalars().one()
+
+
+async def balance(sessions) -> int:
+    async with sessions() as session:
+        return (await session.execute(select(Wallet.balance_credits).where(Wallet.user_id == 1))).scalar() or 0
+
+
+def test_redelivered_event_is_queued_and_credited_once(run):
+    async def scenario(gateway, sessions):
+        order_id = await create_order(sessions)
+        before = await balance(sessions)
+        event_id, body = gateway.event(order_id, "captured")
+
+        first = await gateway.deliver(event_id, body)
+        second = await gateway.deliver(event_id, body)
+        assert first.status_code == 200 and first.json()["message"] == "Event accepted"
+        assert second.json()["message"] == "Event already received"
+        # Nothing is applied inside the request
+        assert await balance(sessions) == before
+
+        assert await drain(sessions) == 1
+        assert await balance(sessions) == before + 10
+        event = await fetch_event(sessions, event_id)
+        assert event.status == "done" and event.attempts == 1
+
+    run(scenario)
+
+
+def test_bad_signature_is_rejected(run):
+    async def scenario(gateway, sessions):
+        event_id, body = gateway.event("order_x", "captured")
+        response = await gateway.deliver(event_id, body, secret="wrong")
+        assert response.status_code == 400
+        async with sessions() as session:
+            assert (await session.execute(
+                select(func.count()).where(WebhookEvent.event_id == event_id)
+            )).scalar_one() == 0
+
+    run(scenario)
+
+
+def test_events_for_one_order_apply_in_arrival_order(run):
+    async def scenario(gateway, sessions):
+        order_id = await create_order(sessions)
+        authorized_id, authorized = gateway.event(order_id, "authorized", payment_id="pay_ordered")
+        captured_id, captured = gateway.event(order_id, "captured", payment_id="pay_ordered")
+        await gateway.deliver(authorized_id, authorized)
+        await gateway.deliver(captured_id, captured)
+
+        # While a worker holds the first event, the second is not claimable either
+        async with sessions() as holder:
+            await holder.execute(
+                select(WebhookEvent).where(WebhookEvent.event_id == authorized_id).with_for_update()
+            )
+            assert await webhook_queue.process_next(sessions) is False
+
+        await asyncio.gather(*(drain(sessions) for _ in range(4)))
+        first = await fetch_event(sessions, authorized_id)
+        second = await fetch_event(sessions, captured_id)
+        assert first.processed_at <= second.processed_at
+        async with sessions() as session:
+            payment = (await session.execute(select(Payment).where(Payment.order_id == order_id))).scalars().one()
+            assert payment.status == "captured"
+            credited = (await session.execute(
+                select(func.count()).where(Transaction.external_ref == "pay_ordered")
+            )).scalar_one()
+            assert credited == 1
+
+    run(scenario)
+
+
+def test_failing_event_backs_off_then_dead_letters_and_requeues(run, monkeypatch):
+    monkeypatch.setattr(webhook_queue, "WEBHOOK_MAX_ATTEMPTS", 2)
+
+    async def scenario(gateway, sessions):
+        event_id, body = gateway.event("order_missing", "captured")
+        await gateway.deliver(event_id, body)
+
+        assert await webhook_queue.process_next(sessions)
+        event = await fetch_event(sessions, event_id)
+        assert event.status == "pending" and event.attempts == 1
+        assert "not found" in event.last_error
+        # Backing off: not due yet
+        assert await webhook_queue.process_next(sessions) is False
+
+        async with sessions() as session:
+            await session.execute(
+                update(WebhookEvent).where(WebhookEvent.id == event.id).values(next_attempt_at=func.now())
+            )
+            await session.commit()
+        assert await webhook_queue.process_next(sessions)
+        assert (await fetch_event(sessions, event_id)).status == "dead"
+
+        async with sessions() as session:
+            dead = await webhook_queue.list_events(session, "dead", 10)
+            assert event.id in [e["id"] for e in dead["events"]]
+            assert await webhook_queue.requeue_event(session, event.id)
+            await session.commit()
+        requeued = await fetch_event(sessions, event_id)
+        assert requeued.status == "pending" and requeued.attempts == 0
+
+    run(scenario)
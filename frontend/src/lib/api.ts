@@ -1,5 +1,6 @@
 import axios from 'axios'
 import toast from 'react-hot-toast'
+import type { CreditPack, Persona, Screening } from '@/types'
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
@@ -104,6 +105,11 @@ export const rolesAPI = {
   getRoles: () => api.get('/api/v1/roles'),
   getUserRoles: () => api.get('/api/v1/my/roles'),
   addRoleSelection: (roleIds: number[]) => api.post('/api/v1/my/roles', { role_ids: roleIds }),
+  removeRoleSelections: (roleIds: number[]) => {
+    const params = new URLSearchParams()
+    roleIds.forEach((id) => params.append('role_ids', String(id)))
+    return api.delete('/api/v1/my/roles', { params })
+  },
 }
 
 // CV API
@@ -111,11 +117,27 @@ export const cvsAPI = {
   presignUpload: (data: { filename: string; mime_type: string; role_id?: number }) =>
     api.post('/api/v1/cvs/presign', data),
   
-  confirmUpload: (data: { filename: string; storage_filename: string; role_id?: number; size_bytes: number }) =>
+  confirmUpload: (data: { filename: string; storage_filename: string; role_id?: number }) =>
     api.post('/api/v1/cvs/confirm', data),
   
-  getUserCVs: (skip = 0, limit = 10) =>
-    api.get(`/api/v1/cvs?skip=${skip}&limit=${limit}`),
+  // Large files: one presigned PUT per part, uploaded in parallel
+  startMultipartUpload: (data: { filename: string; mime_type: string; size_bytes: number; role_id?: number }) =>
+    api.post('/api/v1/cvs/multipart', data),
+  
+  completeMultipartUpload: (data: {
+    filename: string
+    storage_filename: string
+    upload_id: string
+    parts: { part_number: number; etag: string }[]
+    role_id?: number
+  }) => api.post('/api/v1/cvs/multipart/complete', data),
+  
+  abortMultipartUpload: (data: { storage_filename: string; upload_id: string }) =>
+    api.post('/api/v1/cvs/multipart/abort', data),
+  
+  // Newest first; pass the previous response's next_cursor for the following page
+  getUserCVs: (limit = 10, cursor?: string) =>
+    api.get('/api/v1/cvs', { params: { limit, cursor } }),
   
   deleteCV: (cvId: number) =>
     api.delete(`/api/v1/cvs/${cvId}`),
@@ -127,8 +149,9 @@ export const cvsAPI = {
 // Payment & Wallet API
 export const walletAPI = {
   getWallet: () => api.get('/api/v1/wallet'),
-  getTransactions: (skip = 0, limit = 10) =>
-    api.get(`/api/v1/transactions?skip=${skip}&limit=${limit}`),
+  getTransactions: (limit = 10, cursor?: string) =>
+    api.get('/api/v1/transactions', { params: { limit, cursor } }),
+  getCreditPacks: () => api.get<CreditPack[]>('/api/v1/payments/packs'),
   createPaymentOrder: (packId: number) => api.post('/api/v1/payments/order', { pack_id: packId }),
 }
 
@@ -142,10 +165,13 @@ export const interviewAPI = {
 export const screeningAPI = {
   runScreening: (cv_id: number) => 
     api.post('/api/v1/screenings/run', { cv_id }),
+  // Poll while pending; the Retry-After header gives the interval
+  getScreening: (id: number) =>
+    api.get<Screening>(`/api/v1/screenings/${id}`),
 }
 
-// Persona API (placeholder for future implementation)
+// Persona API: current is kept up to date as CVs, roles, screenings and interviews change
 export const personaAPI = {
-  getPersona: () => api.get('/api/v1/personas/current'),
-  computePersona: () => api.post('/api/v1/personas/compute'),
+  getPersona: () => api.get<Persona>('/api/v1/personas/current'),
+  computePersona: () => api.post<Persona>('/api/v1/personas/compute'),
 }
@@ -57,7 +57,7 @@ const Dashboard = () => {
   // Fetch user CVs
   const { data: userCVs, isLoading: cvsLoading } = useQuery({
     queryKey: ['userCVs'],
-    queryFn: () => cvsAPI.getUserCVs(0, 5),
+    queryFn: () => cvsAPI.getUserCVs(5),
   });
 
   const handleLogout = async () => {
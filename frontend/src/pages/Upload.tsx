@@ -30,6 +30,10 @@ import {
 } from 'lucide-react';
 import toast from 'react-hot-toast';
 
+// Files above one part (S3's 5 MiB minimum) are uploaded in parallel parts
+const MULTIPART_THRESHOLD_BYTES = 5 * 1024 * 1024;
+const MULTIPART_RETRIES = 3;
+
 interface UploadedFile {
   file: File;
   id: string;
@@ -60,7 +64,7 @@ const Upload = () => {
   // Fetch user's CVs
   const { data: userCVs, isLoading: cvsLoading } = useQuery({
     queryKey: ['userCVs'],
-    queryFn: () => cvsAPI.getUserCVs(0, 10),
+    queryFn: () => cvsAPI.getUserCVs(10),
   });
 
   // Delete CV mutation
@@ -116,40 +120,93 @@ const Upload = () => {
     }
   }, [selectedRole]);
 
-  const uploadFileToServer = async (uploadFile: UploadedFile) => {
-    try {
-      // Step 1: Get presigned URL
-      const presignResponse = await cvsAPI.presignUpload({
-        filename: uploadFile.file.name,
-        mime_type: uploadFile.file.type,
-        role_id: selectedRole ? parseInt(selectedRole) : undefined,
-      });
+  const setFileProgress = (fileId: string, progress: number) => {
+    setUploadedFiles(prev => prev.map(f => (f.id === fileId ? { ...f, progress } : f)));
+  };
 
-      const { url, fields } = presignResponse.data;
+  // Single presigned POST; the policy caps the size at 10MB on the storage side
+  const uploadWithPresignedPost = async (uploadFile: UploadedFile, roleId?: number) => {
+    const presignResponse = await cvsAPI.presignUpload({
+      filename: uploadFile.file.name,
+      mime_type: uploadFile.file.type,
+      role_id: roleId,
+    });
 
-      // Step 2: Upload to storage
-      const formData = new FormData();
-      Object.entries(fields).forEach(([key, value]) => {
-        formData.append(key, value as string);
-      });
-      formData.append('file', uploadFile.file);
+    const { url, fields, storage_filename } = presignResponse.data;
 
-      const uploadResponse = await fetch(url, {
-        method: 'POST',
-        body: formData,
-      });
+    const formData = new FormData();
+    Object.entries(fields).forEach(([key, value]) => {
+      formData.append(key, value as string);
+    });
+    formData.append('file', uploadFile.file);
+
+    const uploadResponse = await fetch(url, {
+      method: 'POST',
+      body: formData,
+    });
 
-      if (!uploadResponse.ok) {
-        throw new Error('Upload failed');
+    if (!uploadResponse.ok) {
+      throw new Error('Upload failed');
+    }
+
+    return cvsAPI.confirmUpload({
+      filename: uploadFile.file.name,
+      storage_filename,
+      role_id: roleId,
+    });
+  };
+
+  // Parts go up in parallel and each is retried on its own, so a flaky
+  // mobile connection only repeats the part that failed
+  const uploadWithMultipart = async (uploadFile: UploadedFile, roleId?: number) => {
+    const startResponse = await cvsAPI.startMultipartUpload({
+      filename: uploadFile.file.name,
+      mime_type: uploadFile.file.type,
+      size_bytes: uploadFile.file.size,
+      role_id: roleId,
+    });
+    const { storage_filename, upload_id, part_size, parts } = startResponse.data;
+    let uploadedBytes = 0;
+
+    const uploadPart = async (part: { part_number: number; size_bytes: number; url: string }) => {
+      const start = (part.part_number - 1) * part_size;
+      const body = uploadFile.file.slice(start, start + part.size_bytes);
+      for (let attempt = 1; ; attempt++) {
+        try {
+          const response = await fetch(part.url, { method: 'PUT', body });
+          const etag = response.headers.get('ETag');
+          if (!response.ok || !etag) throw new Error(`Part ${part.part_number} failed`);
+          uploadedBytes += part.size_bytes;
+          setFileProgress(uploadFile.id, Math.round((uploadedBytes / uploadFile.file.size) * 90));
+          return { part_number: part.part_number, etag };
+        } catch (error) {
+          if (attempt >= MULTIPART_RETRIES) throw error;
+          await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+        }
       }
+    };
 
-      // Step 3: Confirm upload
-      const confirmResponse = await cvsAPI.confirmUpload({
+    try {
+      const completed = await Promise.all(parts.map(uploadPart));
+      return await cvsAPI.completeMultipartUpload({
         filename: uploadFile.file.name,
-        storage_filename: fields.filename,
-        role_id: selectedRole ? parseInt(selectedRole) : undefined,
-        size_bytes: uploadFile.file.size,
+        storage_filename,
+        upload_id,
+        parts: completed,
+        role_id: roleId,
       });
+    } catch (error) {
+      cvsAPI.abortMultipartUpload({ storage_filename, upload_id }).catch(() => undefined);
+      throw error;
+    }
+  };
+
+  const uploadFileToServer = async (uploadFile: UploadedFile) => {
+    try {
+      const roleId = selectedRole ? parseInt(selectedRole) : undefined;
+      const confirmResponse = uploadFile.file.size > MULTIPART_THRESHOLD_BYTES
+        ? await uploadWithMultipart(uploadFile, roleId)
+        : await uploadWithPresignedPost(uploadFile, roleId);
 
       // Update file status
       setUploadedFiles(prev => prev.map(f => 
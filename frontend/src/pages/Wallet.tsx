@@ -54,7 +54,14 @@ const Wallet = () => {
   // Fetch transactions
   const { data: transactions, isLoading: transactionsLoading } = useQuery({
     queryKey: ['transactions'],
-    queryFn: () => walletAPI.getTransactions(0, 20),
+    queryFn: () => walletAPI.getTransactions(20),
+  });
+
+  // Prices and availability come from the server catalog
+  const { data: packCatalog } = useQuery({
+    queryKey: ['credit-packs'],
+    queryFn: walletAPI.getCreditPacks,
+    staleTime: 5 * 60 * 1000,
   });
 
   // Create payment order mutation
@@ -70,7 +77,7 @@ const Wallet = () => {
     },
   });
 
-  const creditPacks = [
+  const packDisplay = [
     {
       id: 1,
       credits: 10,
@@ -113,6 +120,16 @@ const Wallet = () => {
     }
   ];
 
+  const serverPacks = new Map((packCatalog?.data ?? []).map((pack) => [pack.id, pack]));
+  const creditPacks = packDisplay
+    .filter((pack) => !packCatalog || serverPacks.has(pack.id))
+    .map((pack) => {
+      const serverPack = serverPacks.get(pack.id);
+      return serverPack
+        ? { ...pack, credits: serverPack.credits, price: Number(serverPack.amount_inr) }
+        : pack;
+    });
+
   const handlePurchase = (packId: number) => {
     setSelectedPack(packId);
     createOrderMutation.mutate(packId);
@@ -421,7 +438,7 @@ const Wallet = () => {
                       <img 
                         src={paymentData.qr_code} 
                         alt="UPI QR Code" 
-                        className="mx-auto border rounded-lg"
+                        className="mx-auto w-48 h-48 border rounded-lg"
                       />
                       <p className="text-sm text-slate-600 mt-2">
                         Scan QR code with your UPI app
@@ -62,11 +62,26 @@ export interface Payment {
   created_at: string
 }
 
+export interface PersonaSummary {
+  professional_summary: string
+  strengths: string[]
+  areas_for_improvement: string[]
+  target_roles: string[]
+  stats: {
+    cvs: number
+    screenings: number
+    average_score?: number
+    best_score?: number
+    interviews: number
+    answered_questions: number
+  }
+}
+
 export interface Persona {
   id: string
   user_id: string
-  summary: Record<string, any>
-  skills: string[]
+  summary?: PersonaSummary
+  skills: string[]  // ranked by how many CVs and screenings back them
   updated_at: string
 }
 
@@ -80,19 +95,34 @@ export interface Interview {
   created_at: string
 }
 
+export interface ScreeningResult {
+  matched_skills: string[]
+  missing_skills: string[]
+  matched_keywords: string[]
+  sections: string[]
+  word_count: number
+  truncated: boolean
+  summary: string
+}
+
 export interface Screening {
   id: string
   user_id: string
-  cv_id: string
+  cv_id?: string
+  role_id?: string
   status: 'pending' | 'done' | 'failed'
   credits_used: number
+  score?: number
+  result?: ScreeningResult
+  failure_reason?: string
+  completed_at?: string
   created_at: string
 }
 
 export interface CreditPack {
-  id: string
-  name: string
+  id: number
   credits: number
-  price_inr: number
+  amount_inr: string
   description: string
+  is_active: boolean
 }